@@ -0,0 +1,289 @@
+""" Time svgpipe operations on synthetic documents.
+
+    python benchmarks/run.py [--elements N] [--depth D] [--layers L]
+                             [--points P] [--repeat R] [--only NAME ...]
+                             [--output results.json] [--compare old.json]
+
+Measures the time (best of `--repeat` runs) and the peak memory
+(Python allocations, via `tracemalloc`) of each benchmark on a
+document from `synthetic.py`. Allocations of the C parts of
+`lxml` are not included in the peak memory.
+
+The benchmarks use the API common to all versions of svgpipe,
+so the results of the svgpipe found on `sys.path` (e.g. set
+`PYTHONPATH` to another checkout) can be compared across versions:
+with `--compare`, each result is shown relative to an earlier
+`--output` file, and the exit status is 1 if any benchmark is
+slower or needs more memory than `--tolerance` allows. Versions
+before the `lxml` backend always use `etree`, the default.
+
+With several `--backend`s, each benchmark runs once per backend,
+and the results are named `<benchmark>[<backend>]`.
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import synthetic
+
+### timed repetitions of each benchmark
+REPEAT = 5
+### relative slowdown (or memory growth) reported as regression
+TOLERANCE = 0.2
+### element lookups per run of `lookup`
+LOOKUPS = 1000
+### insertions per run of `inject_points_at`
+INSERTS = 100
+
+def _svgpipe():
+    import svgpipe
+    import svgpipe.inject
+    import svgpipe.transfer
+    return svgpipe
+
+def _docinj(src):
+    svgpipe = _svgpipe()
+    return svgpipe.inject.SVGDocInj(io.StringIO(src))
+
+def _flush(doc):
+    ### newer versions buffer point data until saving
+    if hasattr(doc, 'flush_points'):
+        doc.flush_points()
+
+def _rect_ids(args):
+    step = max(args.elements // LOOKUPS, 1)
+    return ["R_%d" % i for i in range(0, args.elements, step)][:LOOKUPS]
+
+def bench_parse(src, args):
+    svgpipe = _svgpipe()
+    return lambda: svgpipe.SVGDoc(io.StringIO(src))
+
+def bench_lookup(src, args):
+    doc = _svgpipe().SVGDoc(io.StringIO(src))
+    ids = _rect_ids(args)
+
+    def run():
+        for id in ids:
+            doc.get_svg_element('rect', id)
+    return run
+
+def bench_inject_points(src, args):
+    doc = _docinj(src)
+    injp = doc.get_poly_injectpoint('polyline', "P_0")
+    trafo = doc.trafo_from_rect("Frame", (0, synthetic.WIDTH),
+                                (0, synthetic.HEIGHT))
+    pts = synthetic.polyline_points(args.points)
+
+    def run():
+        injp.inject_points(pts, trafo=trafo)
+        _flush(doc)
+    return run
+
+def bench_inject_points_at(src, args):
+    doc = _docinj(src)
+    injp = doc.get_poly_injectpoint('polyline', "P_0")
+    pts = synthetic.polyline_points(10)
+
+    def run():
+        for i in range(INSERTS):
+            injp.inject_points_at(pts, index=args.points // 2 + i)
+        _flush(doc)
+    return run
+
+def _fmtpts():
+    svgpipe = _svgpipe()
+    fmtpts = getattr(svgpipe.inject.InjectPoint, '_fmtpts', None)
+    if fmtpts is None:
+        ### replaced by `svgpipe.fmt` in later versions
+        import svgpipe.fmt
+        fmtpts = svgpipe.fmt.DEFAULT.format_points
+    return fmtpts
+
+def bench_format_points(src, args):
+    ### a list of float tuples, formatted without numpy
+    pts = synthetic.polyline_points(args.points)
+    fmtpts = _fmtpts()
+    return lambda: fmtpts(pts)
+
+def bench_format_int_points(src, args):
+    pts = [(int(x), int(y)) for x, y in
+           synthetic.polyline_points(args.points)]
+    fmtpts = _fmtpts()
+    return lambda: fmtpts(pts)
+
+def bench_apply_attribs(src, args):
+    svgpipe = _svgpipe()
+    doc = svgpipe.SVGDoc(io.StringIO(src))
+    proto = doc.get_svg_element('rect', "Proto")
+    targets = list(doc.root.iter("{%s}rect" % synthetic.SVG_NS))
+    return lambda: svgpipe.transfer.apply_attribs(targets, proto)
+
+def _save_cached(doc, file):
+    ### versions before `cached` write the whole document
+    try:
+        doc.save(file, cached=True)
+    except TypeError:
+        doc.save(file)
+
+def bench_save_cached(src, args):
+    doc = _docinj(src)
+    injp = doc.get_poly_injectpoint('polyline', "P_0")
+    pts = synthetic.polyline_points(10)
+    _save_cached(doc, io.BytesIO())
+
+    def run():
+        ### one layer changes between saves
+        injp.inject_points(pts)
+        _save_cached(doc, io.BytesIO())
+    return run
+
+def bench_save(src, args):
+    doc = _docinj(src)
+    for layer in range(args.layers):
+        injp = doc.get_poly_injectpoint('polyline', "P_%d" % layer)
+        injp.inject_points(synthetic.polyline_points(args.points))
+    return lambda: doc.save(io.BytesIO())
+
+BENCHMARKS = {
+    'parse': bench_parse,
+    'lookup': bench_lookup,
+    'inject_points': bench_inject_points,
+    'inject_points_at': bench_inject_points_at,
+    'format_points': bench_format_points,
+    'format_int_points': bench_format_int_points,
+    'apply_attribs': bench_apply_attribs,
+    'save': bench_save,
+    'save_cached': bench_save_cached}
+
+def measure(setup, src, args):
+    """ Best time and peak memory of the function made by `setup`."""
+    times = []
+    for _ in range(args.repeat):
+        run = setup(src, args)
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    run = setup(src, args)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': min(times), 'peak_bytes': peak}
+
+def _version(path):
+    """ `git describe` of a checkout, the installed version otherwise."""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"],
+                              cwd=path, capture_output=True, check=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    try:
+        from importlib.metadata import version
+        return version('svgpipe')
+    except Exception:
+        return None
+
+def run_all(args, names):
+    src = synthetic.synthetic_svg(args.elements, args.depth,
+                                  args.layers, args.points)
+    svgpipe = _svgpipe()
+    backend = getattr(svgpipe, 'backend', None)
+    backends = [None]
+    if args.backend and len(args.backend) > 1:
+        backends = args.backend
+    results = {}
+    for be in backends:
+        if be is not None:
+            backend.use(be)
+        for name in names:
+            key = name if be is None else "%s[%s]" % (name, be)
+            results[key] = measure(BENCHMARKS[name], src, args)
+            print("%-24s %10.4f s %12d B" % (key, results[key]['seconds'],
+                                             results[key]['peak_bytes']),
+                  file=sys.stderr)
+    path = os.path.dirname(svgpipe.__file__)
+    if be is None:
+        used = backend and backend.get().name
+    else:
+        used = args.backend
+    return {'svgpipe': {'version': _version(path), 'path': path,
+                        'backend': used},
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'params': {'elements': args.elements, 'depth': args.depth,
+                       'layers': args.layers, 'points': args.points,
+                       'repeat': args.repeat},
+            'results': results}
+
+def compare(old, new, tolerance):
+    """ Print `new` relative to `old`; the number of regressions."""
+    if old['params'] != new['params']:
+        print("warning: different parameters: %s vs. %s"
+              % (old['params'], new['params']), file=sys.stderr)
+    regressions = 0
+    print("%-24s %10s %10s %7s %7s" % ("benchmark", "old s", "new s",
+                                       "time", "memory"))
+    for name, res in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            print("%-24s %10s %10.4f" % (name, "-", res['seconds']))
+            continue
+        t = res['seconds'] / before['seconds']
+        m = res['peak_bytes'] / max(before['peak_bytes'], 1)
+        flag = ""
+        if t > 1 + tolerance or m > 1 + tolerance:
+            regressions += 1
+            flag = "  REGRESSION"
+        print("%-24s %10.4f %10.4f %6.2fx %6.2fx%s"
+              % (name, before['seconds'], res['seconds'], t, m, flag))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark svgpipe on"
+                                     " synthetic documents.")
+    synthetic.add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help="timed runs per benchmark, the best counts"
+                        " (default: %(default)s)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS),
+                        help="run only these benchmarks")
+    parser.add_argument("--backend", nargs="+",
+                        choices=['auto', 'etree', 'lxml'],
+                        help="XML backend(s) of svgpipe (default: the"
+                        " SVGPIPE_BACKEND environment variable)")
+    parser.add_argument("--output", "-o",
+                        help="write the results to this JSON file")
+    parser.add_argument("--compare",
+                        help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="relative slowdown reported as regression"
+                        " (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.backend:
+        ### read when svgpipe is imported, cf. `_svgpipe`
+        os.environ['SVGPIPE_BACKEND'] = args.backend[0]
+    new = run_all(args, args.only or list(BENCHMARKS))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(new, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(old, new, args.tolerance):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
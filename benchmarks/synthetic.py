@@ -0,0 +1,75 @@
+""" Generate synthetic SVG documents of a given size and shape.
+
+    python synthetic.py [--elements N] [--depth D] [--layers L]
+                        [--points P] > document.svg
+
+The document has `layers` layers (`<g id="Layer_i">`), each with
+`depth` levels of nested groups. The innermost group of each layer
+holds its share of `elements` rects (`id="R_<n>"`) and one polyline
+(`id="P_<i>"`) with `points` points. A rect `Frame` spans the
+`viewBox`, a rect `Proto` carries styles for `svgpipe.transfer`.
+"""
+
+import argparse
+import sys
+
+SVG_NS = "http://www.w3.org/2000/svg"
+WIDTH = 1000
+HEIGHT = 500
+
+def polyline_points(n, offset=0):
+    """ `n` points of a zigzag line across the document."""
+    return [(WIDTH * i / max(n - 1, 1), (37 * (i + offset)) % HEIGHT)
+            for i in range(n)]
+
+def synthetic_svg(elements=10000, depth=3, layers=10, points=1000):
+    """ The text of a synthetic SVG document, cf. module docstring."""
+    parts = ['<?xml version="1.0" encoding="utf-8"?>\n'
+             '<svg xmlns="%s" version="1.1" viewBox="0 0 %d %d"'
+             ' width="%d" height="%d">\n' % (SVG_NS, WIDTH, HEIGHT,
+                                             WIDTH, HEIGHT),
+             '<rect id="Frame" x="0" y="0" width="%d" height="%d"'
+             ' fill="none"/>\n' % (WIDTH, HEIGHT),
+             '<rect id="Proto" x="0" y="0" width="1" height="1"'
+             ' fill="#c03030" stroke="#000000" stroke-width="0.5"/>\n']
+    n = 0
+    for layer in range(layers):
+        parts.append('<g id="Layer_%d">' % layer)
+        for level in range(depth):
+            parts.append('<g id="G_%d_%d">' % (layer, level))
+        count = (elements // layers
+                 + (1 if layer < elements % layers else 0))
+        for _ in range(count):
+            parts.append('<rect id="R_%d" x="%d" y="%d" width="4"'
+                         ' height="4" fill="#3030c0" stroke="none"'
+                         ' stroke-width="1"/>\n'
+                         % (n, n % WIDTH, (n // WIDTH) % HEIGHT))
+            n += 1
+        parts.append('<polyline id="P_%d" fill="none" stroke="#000000"'
+                     ' points="%s"/>\n' % (layer, " ".join(
+                        "%g,%g" % p for p in polyline_points(points, layer))))
+        parts.append('</g>' * depth)
+        parts.append('</g>\n')
+    parts.append('</svg>\n')
+    return "".join(parts)
+
+def add_arguments(parser):
+    parser.add_argument("--elements", type=int, default=10000,
+                        help="number of rects (default: %(default)s)")
+    parser.add_argument("--depth", type=int, default=3,
+                        help="nested groups per layer (default: %(default)s)")
+    parser.add_argument("--layers", type=int, default=10,
+                        help="number of layers (default: %(default)s)")
+    parser.add_argument("--points", type=int, default=1000,
+                        help="points per polyline (default: %(default)s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic SVG"
+                                     " document to stdout.")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    sys.stdout.write(synthetic_svg(args.elements, args.depth,
+                                   args.layers, args.points))
+
+if __name__ == '__main__':
+    main()
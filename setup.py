@@ -13,6 +13,11 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/broesamle/svgpipe",
     packages=setuptools.find_packages(),
+    entry_points={
+        "console_scripts": ["svgpipe = svgpipe.cli:main"]},
+    extras_require={
+        "numpy": ["numpy"],
+        "lxml": ["lxml"]},
     keywords=["svg",
               "vector graphics",
               "scalable vector graphics",
@@ -1,9 +1,33 @@
 import re
 import xml.etree.ElementTree as ET
 
-### This affects all modules also using ET :(
-ET.register_namespace('',"http://www.w3.org/2000/svg")
-ET.register_namespace('xlink',"http://www.w3.org/1999/xlink")
+### namespace prefixes used for writing, by uri, cf. `register_namespace`;
+### the initial ones are those `ET` knows by default
+NAMESPACES = {
+    "http://www.w3.org/XML/1998/namespace": "xml",
+    "http://www.w3.org/1999/xhtml": "html",
+    "http://www.w3.org/1999/02/22-rdf-syntax-ns#": "rdf",
+    "http://schemas.xmlsoap.org/wsdl/": "wsdl",
+    "http://www.w3.org/2001/XMLSchema": "xs",
+    "http://www.w3.org/2001/XMLSchema-instance": "xsi",
+    "http://purl.org/dc/elements/1.1/": "dc"}
+
+def register_namespace(prefix, uri):
+    """ Write the namespace `uri` with `prefix` ('' for the default
+    namespace). Replaces earlier registrations of `prefix`.
+
+    The prefix is registered with `ET` as well, which is used by
+    `save` for the `etree` backend. This affects all modules also
+    using ET :(
+    """
+    ET.register_namespace(prefix, uri)
+    for u, p in list(NAMESPACES.items()):
+        if p == prefix:
+            del NAMESPACES[u]
+    NAMESPACES[uri] = prefix
+
+register_namespace('', "http://www.w3.org/2000/svg")
+register_namespace('xlink', "http://www.w3.org/1999/xlink")
 
 class ParseError(Exception):
     def __init__(self, *args, **kwargs):
@@ -13,6 +37,18 @@ class NotFoundError(Exception):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+def _lookup_error(missing, duplicates):
+    """ One error reporting all `missing` and `duplicates` lookups."""
+    parts = []
+    if missing:
+        parts.append("Not found: %s" % ", ".join(map(str, missing)))
+    if duplicates:
+        parts.append("Not unique: %s" % ", ".join(map(str, duplicates)))
+    err = (NotFoundError if missing else ParseError)("; ".join(parts))
+    err.missing = missing
+    err.duplicates = duplicates
+    return err
+
 class SVGDoc(object):
     """ An existing SVG document.
 
@@ -20,11 +56,142 @@ class SVGDoc(object):
     `xml.etree.ElementTree.Element` or string.
     """
 
-    _NS = {'svg' :'http://www.w3.org/2000/svg'}
+    _NS = {'svg' :'http://www.w3.org/2000/svg',
+           'xlink': 'http://www.w3.org/1999/xlink'}
+
+    def __init__(self, filename, only=None, backend=None):
+        """ Parse the SVG document in `filename` (name or file object).
+
+        `only` (optional): Ids of the elements (e.g. layers) to be
+            loaded. All other content is not parsed but copied
+            unchanged from the source when saving, cf.
+            `svgpipe.partial`.
+
+        `backend` (optional): The XML backend, 'etree' or 'lxml'
+            (cf. `svgpipe.backend`). Partial documents always use
+            'etree'.
+        """
+        from svgpipe import backend as _backend
+        if only is None:
+            backend = _backend.get(backend)
+            self._init_tree(backend, backend.parse(filename))
+        else:
+            from svgpipe.partial import parse_partial
+            self.backend = _backend.get('etree')
+            (self.root, self._raw, self._nsdecls,
+             self._prolog, self._epilog) = parse_partial(filename, only)
+            self.tree = ET.ElementTree(self.root)
+            self._ids = None
+            self._parents = None
+
+    @classmethod
+    async def aopen(cls, filename, **kwargs):
+        """ Like the constructor, without blocking the event loop.
+
+        `filename` can also be an asyncio stream, cf. `svgpipe.aio`.
+        """
+        from svgpipe import aio
+        return await aio.open_doc(cls, filename, **kwargs)
+
+    def _init_tree(self, backend, tree):
+        """ Take over an already parsed (complete) `tree`."""
+        self.backend = backend
+        self.tree = tree
+        self.root = tree.getroot()
+        self._raw = None
+        self._nsdecls = {}
+        ### lazily built by `_build_index`, cf. `invalidate_index`
+        self._ids = None
+        self._parents = None
+
+    def _build_index(self):
+        """ Build the id index and the child-->parent map.
 
-    def __init__(self, filename):
-        self.tree = ET.parse(filename)
-        self.root = self.tree.getroot()
+        Elements with the same id are listed in document order.
+        The root element is not part of the id index, following
+        the semantics of a `.//` search starting at the root.
+        Backends with parent pointers need no parent map.
+        """
+        ids = {}
+        root = self.root
+        for el in root.iter():
+            id = el.get('id')
+            if id is not None and el is not root:
+                ids.setdefault(id, []).append(el)
+        self._ids = ids
+        ### ids whose lists are not in document order, cf. `_by_id`
+        self._unordered = set()
+        if self.backend.parent_pointers:
+            return
+        parents = {}
+        for parent in root.iter():
+            for child in parent:
+                parents[child] = parent
+        self._parents = parents
+
+    def _by_id(self, id):
+        """ The elements with the given `id`, in document order."""
+        if self._ids is None:
+            self._build_index()
+        if id in self._unordered:
+            ### restore the order after `register_subtree`
+            order = {el: i for i, el in enumerate(self.root.iter())}
+            for u in self._unordered:
+                self._ids[u].sort(key=lambda el: order.get(el, len(order)))
+            self._unordered.clear()
+        return self._ids.get(id, ())
+
+    def invalidate_index(self):
+        """ Drop the id index and the parent map.
+
+        Both will be rebuilt on the next lookup. Call this after
+        changing the tree by other means than the methods and
+        injectpoints provided by `svgpipe`.
+        """
+        self._ids = None
+        self._parents = None
+
+    def register_subtree(self, element, parent):
+        """ Add `element` (appended to `parent`) to the index.
+
+        Keeps the index valid without a full rebuild. Nothing
+        is done as long as no index has been built yet.
+        """
+        if self._ids is None:
+            return
+        if self._parents is not None:
+            self._parents[element] = parent
+            for el in element.iter():
+                for child in el:
+                    self._parents[child] = el
+        for el in element.iter():
+            id = el.get('id')
+            if id is not None:
+                els = self._ids.setdefault(id, [])
+                if els:
+                    self._unordered.add(id)
+                els.append(el)
+
+    def _forget_subtree(self, element):
+        """ Remove the descendants of `element` from the index."""
+        if self._ids is None:
+            return
+        for el in element.iter():
+            if el is element:
+                continue
+            if self._parents is not None:
+                self._parents.pop(el, None)
+            id = el.get('id')
+            if id is not None and el in self._ids.get(id, ()):
+                self._ids[id].remove(el)
+
+    def get_parent(self, element):
+        """ Return the parent of `element` or `None` for the root."""
+        if self.backend.parent_pointers:
+            return self.backend.getparent(element)
+        if self._parents is None:
+            self._build_index()
+        return self._parents.get(element)
 
     def get_viewbox(self):
         """ Get the `viewBox` of the toplevel (root) SVG element.
@@ -64,6 +231,7 @@ class SVGDoc(object):
         be in the dict.
         """
         xpath = "svg:g[@id]"
+        ids = set(ids)
         result = {}
         for el in self.root.findall(xpath,
                                     SVGDoc._NS):
@@ -80,9 +248,59 @@ class SVGDoc(object):
         `tag` is the local svg tagname as a `str`, without
         any namespace prefixes. Examples: 'rect', 'g'.
         """
-        xpath = ".//svg:%s[@id='%s']" % (tag,id)
-        svgel = self.root.find(xpath, SVGDoc._NS)
-        if svgel is None:
-            raise NotFoundError("No '%s' element with id '%s' found."
-                                % (tag,id))
-        return svgel
+        qtag = "{%s}%s" % (SVGDoc._NS['svg'], tag)
+        for svgel in self._by_id(id):
+            if svgel.tag == qtag:
+                return svgel
+        raise NotFoundError("No '%s' element with id '%s' found."
+                            % (tag,id))
+
+    def get_svg_elements(self, pairs):
+        """ Look up several elements at once.
+
+        `pairs`: `(tag, id)` pairs, cf. `get_svg_element`.
+
+        Returns a dict mapping each pair to its element. Pairs
+        without an element, or with several ones, are reported
+        together in one `NotFoundError` (or `ParseError`, if all
+        are found), with the lists `missing` and `duplicates`.
+        """
+        if self._ids is None:
+            self._build_index()
+        result = {}
+        missing = []
+        duplicates = []
+        for tag, id in pairs:
+            qtag = "{%s}%s" % (SVGDoc._NS['svg'], tag)
+            found = [el for el in self._by_id(id) if el.tag == qtag]
+            if not found:
+                missing.append((tag, id))
+            elif len(found) > 1:
+                duplicates.append((tag, id))
+            else:
+                result[(tag, id)] = found[0]
+        if missing or duplicates:
+            raise _lookup_error(missing, duplicates)
+        return result
+
+    def select(self, selectors, unique=False):
+        """ Find the elements matching several selectors in one pass.
+
+        `selectors`: Selector strings, e.g. `'rect.bar'` or
+            `'g#Panel_1'`, cf. `svgpipe.query`.
+
+        `unique` (optional): Expect exactly one element per
+            selector, reporting violations as `get_svg_elements`.
+
+        Returns a dict mapping each selector to the list of its
+        elements, or to its element if `unique`.
+        """
+        from svgpipe import query
+        found = query.select(self.root, selectors)
+        if not unique:
+            return found
+        missing = [s for s, els in found.items() if not els]
+        duplicates = [s for s, els in found.items() if len(els) > 1]
+        if missing or duplicates:
+            raise _lookup_error(missing, duplicates)
+        return {s: els[0] for s, els in found.items()}
@@ -0,0 +1,129 @@
+""" Load and save documents without blocking an asyncio event loop.
+
+`SVGDoc.aopen` and `SVGDocInj.asave` run parsing and serialising
+in an executor (by default the loop's default thread pool, cf.
+`configure`), at most `LIMIT` at a time per event loop.
+
+Besides file names and ordinary file objects, both accept asyncio
+streams: objects with a coroutine `read`, and objects with a
+coroutine `write` or with `write` and `drain` (like
+`asyncio.StreamWriter`). These are read and written chunk by
+chunk on the loop; when saving, the serialising thread waits for
+the stream to keep up.
+"""
+
+import asyncio
+import functools
+import io
+import threading
+import weakref
+
+### size of the chunks read from or written to async streams
+CHUNKSIZE = 1 << 16
+### documents parsed or serialised at the same time, per event loop
+LIMIT = 4
+
+_executor = None
+_semaphores = weakref.WeakKeyDictionary()
+
+def configure(executor=None, limit=None):
+    """ Set the executor and the concurrency limit.
+
+    `executor` (optional): A `concurrent.futures.ThreadPoolExecutor`
+        for parsing and serialising. `None` selects the default
+        executor of the event loop. Process pools are not suited,
+        documents are not shared between processes.
+
+    `limit` (optional): New value for `LIMIT`.
+    """
+    global _executor, LIMIT
+    _executor = executor
+    if limit is not None:
+        LIMIT = limit
+        _semaphores.clear()
+
+def _semaphore():
+    loop = asyncio.get_running_loop()
+    sem = _semaphores.get(loop)
+    if sem is None:
+        sem = _semaphores[loop] = asyncio.Semaphore(LIMIT)
+    return sem
+
+async def _run(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    async with _semaphore():
+        return await loop.run_in_executor(
+                        _executor, functools.partial(func, *args, **kwargs))
+
+def _is_async(obj, name):
+    return asyncio.iscoroutinefunction(getattr(obj, name, None))
+
+async def open_doc(cls, source, **kwargs):
+    """ `cls(source, **kwargs)` off the event loop, cf. `SVGDoc.aopen`."""
+    if _is_async(source, 'read'):
+        chunks = []
+        while True:
+            chunk = await source.read(CHUNKSIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        if chunks and isinstance(chunks[0], str):
+            source = io.StringIO("".join(chunks))
+        else:
+            source = io.BytesIO(b"".join(chunks))
+    return await _run(cls, source, **kwargs)
+
+async def save_doc(doc, file):
+    """ `doc.save(file)` off the event loop, cf. `SVGDocInj.asave`."""
+    if _is_async(file, 'write') or hasattr(file, 'drain'):
+        await _save_to_stream(doc, file)
+    else:
+        await _run(doc.save, file)
+
+class _Pipe(object):
+    """ Binary file object passing the written data to the loop."""
+
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        self.aborted = threading.Event()
+
+    def write(self, data):
+        if self.aborted.is_set():
+            raise IOError("Output stream failed.")
+        asyncio.run_coroutine_threadsafe(self.queue.put(data),
+                                         self.loop).result()
+
+async def _save_to_stream(doc, file):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=2)
+    pipe = _Pipe(loop, queue)
+
+    def produce():
+        try:
+            doc.save_streaming(pipe, CHUNKSIZE)
+        finally:
+            if not pipe.aborted.is_set():
+                ### end of data
+                pipe.write(None)
+
+    async with _semaphore():
+        done = loop.run_in_executor(_executor, produce)
+        try:
+            while True:
+                data = await queue.get()
+                if data is None:
+                    break
+                if hasattr(file, 'drain'):
+                    file.write(data)
+                    await file.drain()
+                else:
+                    await file.write(data)
+        except BaseException:
+            ### unblock and stop the serialising thread
+            pipe.aborted.set()
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.gather(done, return_exceptions=True)
+            raise
+        await done
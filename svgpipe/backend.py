@@ -0,0 +1,253 @@
+""" XML backends for the element trees of SVG documents.
+
+`svgpipe` works on `xml.etree.ElementTree` (stdlib, always
+available) or `lxml.etree` (optional, faster parsing and
+serialisation, native parent pointers). Both are wrapped by a
+`Backend` with a common interface.
+
+The default backend is `etree`, whose output is the one of
+earlier versions. `lxml` (or 'auto': `lxml` when installed)
+can be chosen via the environment variable `SVGPIPE_BACKEND` or
+`use`, and per document (cf. `SVGDoc`).
+"""
+
+import io
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import svgpipe
+
+_ENCODING = re.compile(r"""^<\?xml[^>]*encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+
+class Backend(object):
+    """ Common interface of the XML backends.
+
+    `name`: 'etree' or 'lxml'
+    `Comment`, `ProcessingInstruction`: Factories, and at the same
+        time the tags of comment and processing instruction nodes.
+    `errors`: Exceptions raised for invalid XML input.
+    `parent_pointers`: Whether elements know their parent
+        (cf. `getparent`).
+    """
+
+    def parse(self, source):
+        """ Parse a file (name or file object) into an element tree."""
+        raise NotImplementedError()
+
+    def fromstring(self, text):
+        """ Parse an XML fragment into an element."""
+        raise NotImplementedError()
+
+    def Element(self, tag, attrib={}):
+        raise NotImplementedError()
+
+    def ElementTree(self, root):
+        raise NotImplementedError()
+
+    def iselement(self, obj):
+        raise NotImplementedError()
+
+    def write(self, tree, file):
+        """ Serialise `tree` as UTF-8 (with XML declaration)."""
+        raise NotImplementedError()
+
+    def namespaces(self, root):
+        """ Qualified names and namespace declarations for the root.
+
+        Returns `(qnames, decls)`: a dict of precomputed
+        `{'{uri}local': 'prefix:local'}` and a dict `{uri: prefix}`
+        of the namespaces to be declared on `root`.
+        """
+        raise NotImplementedError()
+
+    def toplevel(self, tree):
+        """ The nodes of `tree` outside of the root element.
+
+        Returns `(doctype, before, after)`: the document type
+        declaration (or None), and the comments and processing
+        instructions before and after the root.
+        """
+        raise NotImplementedError()
+
+    def getparent(self, element):
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return "<svgpipe backend %s>" % self.name
+
+class ETreeBackend(Backend):
+    """ `xml.etree.ElementTree` from the standard library."""
+
+    name = 'etree'
+    errors = (ET.ParseError, TypeError)
+    parent_pointers = False
+
+    def __init__(self):
+        self.Comment = ET.Comment
+        self.ProcessingInstruction = ET.ProcessingInstruction
+
+    def parse(self, source):
+        return ET.parse(source)
+
+    def fromstring(self, text):
+        return ET.fromstring(text)
+
+    def Element(self, tag, attrib={}):
+        return ET.Element(tag, attrib)
+
+    def ElementTree(self, root):
+        return ET.ElementTree(root)
+
+    def iselement(self, obj):
+        return isinstance(obj, ET.Element)
+
+    def write(self, tree, file):
+        tree.write(file, encoding="utf8")
+
+    def namespaces(self, root):
+        ### as ET assigns them when writing, with the prefixes
+        ### registered via `svgpipe.register_namespace`
+        qnames = {None: None}
+        decls = {}
+
+        def add(qname):
+            if qname[:1] != '{':
+                qnames[qname] = qname
+                return
+            uri, local = qname[1:].rsplit('}', 1)
+            prefix = decls.get(uri)
+            if prefix is None:
+                prefix = svgpipe.NAMESPACES.get(uri)
+                if prefix is None:
+                    prefix = "ns%d" % len(decls)
+                if prefix != 'xml':
+                    decls[uri] = prefix
+            qnames[qname] = "%s:%s" % (prefix, local) if prefix else local
+
+        for elem in root.iter():
+            tag = elem.tag
+            if isinstance(tag, str) and tag not in qnames:
+                add(tag)
+            for key in elem.keys():
+                if key not in qnames:
+                    add(key)
+        return qnames, decls
+
+    def toplevel(self, tree):
+        ### not kept by the parser of ET
+        return None, [], []
+
+class LxmlBackend(Backend):
+    """ `lxml.etree`, if installed."""
+
+    name = 'lxml'
+    parent_pointers = True
+
+    def __init__(self):
+        from lxml import etree
+        self.etree = etree
+        self.Comment = etree.Comment
+        self.ProcessingInstruction = etree.ProcessingInstruction
+        self.errors = (etree.XMLSyntaxError, TypeError, ValueError)
+        self._parser = etree.XMLParser(huge_tree=True)
+
+    def parse(self, source):
+        if hasattr(source, 'read'):
+            data = source.read()
+            if isinstance(data, str):
+                ### lxml refuses text with an encoding declaration
+                match = _ENCODING.match(data[:200])
+                data = data.encode(match.group(1) if match else 'utf-8')
+            source = io.BytesIO(data)
+        return self.etree.parse(source, self._parser)
+
+    def fromstring(self, text):
+        return self.etree.fromstring(text, self._parser)
+
+    def Element(self, tag, attrib={}):
+        ### declare registered prefixes (e.g. `xlink`) of attributes,
+        ### rather than letting lxml invent `ns0`
+        nsmap = {}
+        for name in attrib:
+            if name[:1] == '{':
+                uri = name[1:].split('}', 1)[0]
+                prefix = svgpipe.NAMESPACES.get(uri)
+                if prefix:
+                    nsmap[prefix] = uri
+        return self.etree.Element(tag, attrib, nsmap=nsmap or None)
+
+    def ElementTree(self, root):
+        return self.etree.ElementTree(root)
+
+    def iselement(self, obj):
+        return isinstance(obj, self.etree._Element)
+
+    def _hoist(self, tree):
+        """ Declare registered prefixes in use on the root only."""
+        self.etree.cleanup_namespaces(tree, top_nsmap={
+                prefix: uri for uri, prefix in svgpipe.NAMESPACES.items()
+                if prefix and prefix != 'xml'})
+
+    def write(self, tree, file):
+        self._hoist(tree)
+        tree.write(file, encoding="utf8", xml_declaration=True)
+
+    def namespaces(self, root):
+        self._hoist(root)
+        return ({None: None},
+                {uri: prefix or '' for prefix, uri in root.nsmap.items()})
+
+    def toplevel(self, tree):
+        root = tree.getroot()
+        before = []
+        node = root.getprevious()
+        while node is not None:
+            before.append(node)
+            node = node.getprevious()
+        after = []
+        node = root.getnext()
+        while node is not None:
+            after.append(node)
+            node = node.getnext()
+        return tree.docinfo.doctype or None, before[::-1], after
+
+    def getparent(self, element):
+        return element.getparent()
+
+_BACKENDS = {'etree': ETreeBackend, 'lxml': LxmlBackend}
+_instances = {}
+_default = None
+
+def get(name=None):
+    """ The backend called `name` ('etree', 'lxml' or 'auto').
+
+    'auto' is `lxml` when it is installed, `etree` otherwise.
+    Without `name`, the default backend. `Backend` instances are
+    passed through.
+    """
+    if isinstance(name, Backend):
+        return name
+    if name is None:
+        if _default is None:
+            use(os.environ.get('SVGPIPE_BACKEND', 'etree'))
+        return _default
+    if name == 'auto':
+        try:
+            return get('lxml')
+        except ImportError:
+            return get('etree')
+    if name not in _instances:
+        try:
+            cls = _BACKENDS[name]
+        except KeyError:
+            raise ValueError("Unknown backend: %s" % name)
+        _instances[name] = cls()
+    return _instances[name]
+
+def use(name):
+    """ Set the default backend. Returns the previous default."""
+    global _default
+    previous = _default
+    _default = get(name)
+    return previous
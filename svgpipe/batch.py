@@ -0,0 +1,234 @@
+""" Render many documents from one template in parallel.
+
+A `Job` describes one output document: which layers, rects and
+polygons/polylines of the template get which content. `render_batch`
+renders a sequence of jobs on a `ProcessPoolExecutor`. Each worker
+process keeps a `svgpipe.template.TemplateCache`, so the template
+is parsed once per process rather than once per job. `run_jobs`
+is the underlying windowed loop for other kinds of jobs (cf.
+`svgpipe.cli`).
+
+Jobs are sent to the worker processes, so their content must be
+picklable (strings, numbers, lists, `numpy` arrays, module-level
+functions).
+"""
+
+import collections
+import concurrent.futures
+import functools
+import io
+
+from svgpipe.inject import INJ_POS_AFTER
+from svgpipe.template import TemplateCache
+
+### jobs submitted per worker ahead of the results
+WINDOW = 4
+
+class Job(object):
+    """ Specification of one output document.
+
+    `output` (optional): File name of the document. Without it,
+        the rendered document is returned as `bytes`.
+
+    Content is added in the order of the calls of `layer`, `rect`
+    and `points`.
+    """
+
+    def __init__(self, output=None):
+        self.output = output
+        self.steps = []
+
+    def layer(self, id, hrange, vrange, content=(), group=None,
+              **delta_hv):
+        """ Inject `content` into the layer `id`.
+
+        `content`: A sequence of SVG strings or of functions
+            `f(injectpoint)` called with the `ScaledInjectPoint`.
+
+        `hrange`, `vrange`, `group`, `flip_y`, `delta_h`, `delta_v`:
+            cf. `SVGDocInj.get_layer_injectpoint`.
+        """
+        self.steps.append(('layer', (id, hrange, vrange),
+                           dict(delta_hv, group=group), content))
+        return self
+
+    def rect(self, id, hrange, vrange, content=(), **delta_hv):
+        """ Inject `content` into the area of the rect `id`.
+
+        cf. `layer` and `SVGDocInj.get_rect_injectpoint`.
+        """
+        self.steps.append(('rect', (id, hrange, vrange),
+                           delta_hv, content))
+        return self
+
+    def points(self, tag, id, pts, trafo=None, pos=INJ_POS_AFTER):
+        """ Inject point data into the polygon/polyline `id`.
+
+        `pts`, `pos`: cf. `InjectPoint.inject_points`.
+
+        `trafo` (optional): `(rect_id, hrange, vrange)` or
+            `(rect_id, hrange, vrange, flip_y)`, cf.
+            `SVGDocInj.trafo_from_rect`.
+        """
+        self.steps.append(('points', (tag, id),
+                           {'trafo': trafo, 'pos': pos}, pts))
+        return self
+
+class Result(object):
+    """ Outcome of a job.
+
+    `index`: Position of the job in the batch.
+    `value`: The output file name or the document as `bytes`.
+    `error`: The exception raised by the job, or `None`.
+    """
+
+    __slots__ = ('index', 'job', 'value', 'error')
+
+    def __init__(self, index, job, value=None, error=None):
+        self.index = index
+        self.job = job
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return "<Result %d: %s>" % (self.index,
+            "ok" if self.ok else "%s: %s" % (type(self.error).__name__,
+                                            self.error))
+
+### per process, cf. `render`
+_cache = None
+
+def render(template, job, cache=None):
+    """ Render a single `job` in this process.
+
+    `template`: File name of the template, or its content
+        as `bytes`.
+
+    `cache` (optional): The `TemplateCache` to be used; by
+        default one per process.
+    """
+    global _cache
+    if cache is None:
+        if _cache is None:
+            _cache = TemplateCache()
+        cache = _cache
+    if isinstance(template, bytes):
+        template = io.BytesIO(template)
+    doc = cache.load(template)
+    for kind, args, kw, data in job.steps:
+        if kind == 'points':
+            trafo = kw['trafo']
+            if trafo is not None:
+                trafo = doc.trafo_from_rect(*trafo)
+            injp = doc.get_poly_injectpoint(*args)
+            injp.inject_points(data, kw['pos'], trafo)
+            continue
+        if kind == 'layer':
+            injp = doc.get_layer_injectpoint(*args, **kw)
+        else:
+            injp = doc.get_rect_injectpoint(*args, **kw)
+        for content in data:
+            if callable(content):
+                content(injp)
+            else:
+                injp.inject(content)
+    if job.output is None:
+        out = io.BytesIO()
+        doc.save(out)
+        return out.getvalue()
+    doc.save(job.output)
+    return job.output
+
+def render_batch(template, jobs, max_workers=None, ordered=True,
+                 executor=None):
+    """ Render `jobs` in parallel, yields a `Result` per job.
+
+    `template`: cf. `render`.
+
+    `jobs`: An iterable of `Job`s; consumed as the workers
+        proceed, at most `WINDOW` jobs per worker ahead.
+
+    `max_workers` (optional): Number of processes, by default
+        one per CPU.
+
+    `ordered` (optional): Yield results in the order of `jobs`,
+        or (if `False`) as they are completed.
+
+    `executor` (optional): A `concurrent.futures.Executor` to be
+        used instead of a new process pool. It is not shut down.
+
+    A failing job does not stop the batch: its exception is
+    returned as `Result.error`.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers)
+    try:
+        yield from run_jobs(executor, functools.partial(render, template),
+                            jobs, ordered, max_workers)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+def run_jobs(executor, func, jobs, ordered=True, max_workers=None):
+    """ Call `func(job)` for each of `jobs`, yields a `Result` per job.
+
+    `executor`: The `concurrent.futures.Executor` running the
+        calls, at most `WINDOW` per worker ahead of the results.
+        With `None`, the calls are made in this process.
+
+    `ordered`: cf. `render_batch`.
+
+    `max_workers` (optional): Number of workers of `executor`,
+        if it cannot be determined from `executor`.
+
+    Calls not yet started are cancelled when the generator is
+    closed or the result of a call raises a `BaseException`
+    (e.g. `KeyboardInterrupt`).
+    """
+    jobs = enumerate(jobs)
+    if executor is None:
+        for index, job in jobs:
+            try:
+                yield Result(index, job, func(job))
+            except Exception as e:
+                yield Result(index, job, error=e)
+        return
+    window = WINDOW * (getattr(executor, '_max_workers', None)
+                       or max_workers or 1)
+    ### future --> (index, job)
+    pending = collections.OrderedDict()
+
+    def submit():
+        for index, job in jobs:
+            fut = executor.submit(func, job)
+            pending[fut] = index, job
+            if len(pending) >= window:
+                return
+
+    def result(fut):
+        index, job = pending.pop(fut)
+        try:
+            return Result(index, job, fut.result())
+        except Exception as e:
+            return Result(index, job, error=e)
+
+    try:
+        submit()
+        while pending:
+            if ordered:
+                done = [next(iter(pending))]
+            else:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                yield result(fut)
+            submit()
+    finally:
+        ### `shutdown(cancel_futures=True)` requires python 3.9
+        for fut in pending:
+            fut.cancel()
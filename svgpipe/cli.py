@@ -0,0 +1,288 @@
+""" The `svgpipe` command: render the jobs of a manifest.
+
+    svgpipe MANIFEST [--workers N] [--watch [--interval SECONDS]]
+
+The manifest is a JSON file with a list of jobs, or an object
+with a list `jobs` and defaults for all jobs (e.g. `template`),
+or a JSON lines file with one job per line::
+
+    {"template": "chart.svg", "output": "out/chart_1.svg",
+     "inject": [
+        {"layer": "Layer_A", "hrange": [0, 10], "vrange": [0, 1],
+         "flip_y": true, "content": ["<circle r='2'/>"]},
+        {"rect": "R1", "hrange": [0, 10], "vrange": [0, 1],
+         "content": ["<g id='G1'/>"]},
+        {"points": "P1", "tag": "polyline", "data": "data/p1.csv",
+         "trafo": ["R1", [0, 10], [0, 1], true], "pos": "after"}]}
+
+`inject` lists the steps of a `svgpipe.batch.Job` (`layer`, `rect`
+or `points`, with the arguments of the respective method). Point
+`data` is a list of points or a file: `.npy` or `.csv` (with the
+options `columns` and `skiprows`). Relative paths are resolved
+against the directory of the manifest.
+
+Jobs are rendered on a pool of worker processes, each keeping a
+`svgpipe.template.TemplateCache`. With `--watch`, the pool is kept
+and the manifest and all inputs are checked every `--interval`
+seconds; only jobs whose specification, template or data changed
+are rendered again.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import signal
+import sys
+import time
+
+import svgpipe
+from svgpipe.batch import Job, render, run_jobs
+from svgpipe.fmt import np
+from svgpipe.inject import INJ_POS_BEFORE, INJ_POS_AFTER
+
+### seconds between checks for changed inputs in `--watch` mode
+INTERVAL = 1.0
+
+_POS = {'before': INJ_POS_BEFORE, 'after': INJ_POS_AFTER}
+
+def _resolve(base, path):
+    return path if os.path.isabs(path) else os.path.join(base, path)
+
+def load_manifest(path):
+    """ The job specifications (dicts) of the manifest in `path`.
+
+    Paths in the jobs are resolved against the directory of
+    `path`. Raises a `ParseError` for invalid manifests.
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        content = json.loads(text)
+    except ValueError:
+        content = None
+    if content is None:
+        ### JSON lines
+        try:
+            content = [json.loads(line) for line in text.splitlines()
+                       if line.strip()]
+        except ValueError as e:
+            raise svgpipe.ParseError("Invalid manifest %s: %s" % (path, e))
+    defaults = {}
+    if isinstance(content, dict):
+        if 'jobs' in content:
+            defaults = dict(content)
+            content = defaults.pop('jobs')
+        else:
+            content = [content]
+    if (not isinstance(content, list)
+            or not all(isinstance(s, dict) for s in content)):
+        raise svgpipe.ParseError("Invalid manifest %s: expected a list"
+                                 " of jobs" % path)
+    base = os.path.dirname(os.path.abspath(path))
+    specs = []
+    for spec in content:
+        spec = dict(defaults, **spec)
+        for key in ('template', 'output'):
+            if key not in spec:
+                raise svgpipe.ParseError("Invalid manifest %s: job without"
+                                         " %s" % (path, key))
+            spec[key] = _resolve(base, spec[key])
+        steps = []
+        for step in spec.get('inject', ()):
+            if isinstance(step.get('data'), str):
+                step = dict(step, data=_resolve(base, step['data']))
+            steps.append(step)
+        spec['inject'] = steps
+        specs.append(spec)
+    return specs
+
+def load_data(path, columns=(0, 1), skiprows=0):
+    """ Point data from a `.npy` or `.csv` file.
+
+    `columns` (optional): The columns of a CSV file holding
+        the x and y values.
+
+    `skiprows` (optional): Number of header lines of a CSV file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        if np is None:
+            raise ImportError("Reading .npy files requires numpy.")
+        return np.load(path)
+    if ext != '.csv':
+        raise svgpipe.ParseError("Unknown data format: %s" % path)
+    if np is not None:
+        return np.loadtxt(path, delimiter=',', usecols=columns,
+                          skiprows=skiprows, ndmin=2)
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))[skiprows:]
+    return [tuple(float(row[c]) for c in columns) for row in rows if row]
+
+def make_job(spec):
+    """ The `svgpipe.batch.Job` for a job specification."""
+    job = Job(spec['output'])
+    for orig in spec['inject']:
+        step = dict(orig)
+        try:
+            if 'points' in step:
+                data = step.pop('data')
+                if isinstance(data, str):
+                    data = load_data(data, step.pop('columns', (0, 1)),
+                                     step.pop('skiprows', 0))
+                trafo = step.pop('trafo', None)
+                job.points(step.pop('tag', 'polyline'), step.pop('points'),
+                           data, trafo=tuple(trafo) if trafo else None,
+                           pos=_POS[step.pop('pos', 'after')])
+            elif 'layer' in step or 'rect' in step:
+                kind = 'layer' if 'layer' in step else 'rect'
+                getattr(job, kind)(step.pop(kind),
+                                   tuple(step.pop('hrange')),
+                                   tuple(step.pop('vrange')),
+                                   step.pop('content', ()), **step)
+                step = {}
+            else:
+                raise svgpipe.ParseError("Unknown step: %s"
+                                         % json.dumps(orig))
+        except KeyError as e:
+            raise svgpipe.ParseError("Invalid step, missing or unknown"
+                                     " value %s: %s" % (e, json.dumps(orig)))
+        if step:
+            raise svgpipe.ParseError("Unknown options: %s"
+                                     % ", ".join(sorted(step)))
+    return job
+
+def render_spec(spec):
+    """ Render the job specification `spec` in this process."""
+    directory = os.path.dirname(spec['output'])
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return render(spec['template'], make_job(spec))
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _signature(spec):
+    """ Changes whenever the output of `spec` may change."""
+    inputs = [spec['template']] + [step['data'] for step in spec['inject']
+                                   if isinstance(step.get('data'), str)]
+    return (json.dumps(spec, sort_keys=True),
+            tuple(_stat(p) for p in inputs))
+
+def _init_worker():
+    ### Ctrl-C is handled by the main process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+class Renderer(object):
+    """ Renders job specifications, skipping unchanged jobs.
+
+    `workers` (optional): Number of worker processes, by default
+        one per CPU. `0` renders in this process.
+
+    The worker processes are kept until `close`.
+    """
+
+    def __init__(self, workers=None):
+        if workers == 0:
+            self.executor = None
+        else:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                                    workers, initializer=_init_worker)
+        ### output --> signature of the last rendered job
+        self._rendered = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def run(self, specs, force=False):
+        """ Render the `specs` which changed since their last run.
+
+        `force` (optional): Render all `specs`.
+
+        The jobs are run by `svgpipe.batch.run_jobs`.
+
+        Returns a `svgpipe.batch.Result` (`job`: the specification)
+        for each rendered job, in the order of `specs`.
+        """
+        todo = []
+        for index, spec in enumerate(specs):
+            sig = _signature(spec)
+            if force or self._rendered.get(spec['output']) != sig:
+                ### failed jobs as well, they would fail again
+                self._rendered[spec['output']] = sig
+                todo.append((index, spec))
+        results = list(run_jobs(self.executor, render_spec,
+                                [spec for index, spec in todo]))
+        for r in results:
+            r.index = todo[r.index][0]
+        return results
+
+def _report(results, quiet):
+    failed = 0
+    for r in results:
+        if not r.ok:
+            failed += 1
+            print("svgpipe: %s: %s: %s" % (r.job['output'],
+                                           type(r.error).__name__, r.error),
+                  file=sys.stderr)
+        elif not quiet:
+            print(r.job['output'])
+    return failed
+
+def main(argv=None):
+    """ Entry point of the `svgpipe` command."""
+    parser = argparse.ArgumentParser(
+        prog="svgpipe", description="Render the jobs of a manifest"
+        " (JSON or JSON lines) into SVG documents.")
+    parser.add_argument("manifest")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of worker processes (default: one"
+                        " per CPU, 0: no worker processes)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and render jobs again when"
+                        " their inputs change")
+    parser.add_argument("--interval", type=float, default=INTERVAL,
+                        help="seconds between checks in --watch mode")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="only report errors")
+    args = parser.parse_args(argv)
+    with Renderer(args.workers) as renderer:
+        if not args.watch:
+            try:
+                specs = load_manifest(args.manifest)
+            except (OSError, svgpipe.ParseError) as e:
+                print("svgpipe: %s" % e, file=sys.stderr)
+                return 2
+            return 1 if _report(renderer.run(specs), args.quiet) else 0
+        specs = []
+        ### cf. `_stat`, `None` for a missing manifest
+        loaded = ()
+        try:
+            while True:
+                sig = _stat(args.manifest)
+                if sig != loaded:
+                    loaded = sig
+                    try:
+                        specs = load_manifest(args.manifest)
+                    except (OSError, svgpipe.ParseError) as e:
+                        print("svgpipe: %s" % e, file=sys.stderr)
+                        specs = []
+                _report(renderer.run(specs), args.quiet)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+""" Clip point data to a view rectangle.
+
+Zooming into a small window of a long data series leaves most
+points outside the target area. `InjectPoint.inject_points` and
+`replace_all_points` take a `clip` argument to drop them before
+they are formatted:
+
+Parts of the line inside the (slightly grown, cf. `MARGIN`) view
+rectangle are kept as they are, crossings of its boundary are
+interpolated. An off-screen run of points collapses to its two
+boundary crossings, joined by a segment along the boundary just
+outside the view. The margin grows with the stroke width, so
+that the stroke of this segment stays out of sight as well.
+Polygons keep their fill inside the view.
+
+Requires `numpy`.
+"""
+
+import re
+
+from svgpipe.fmt import np, _is_array_pts, _columns
+
+### Off-screen parts are replaced by segments this far (in document
+### units) outside the view rectangle, which keeps them and their
+### strokes out of sight.
+MARGIN = 4.0
+
+### ... or this many stroke widths, if more: miter joins reach up
+### to 2 stroke widths (for the default `stroke-miterlimit`)
+STROKE_MARGIN = 2.5
+
+_WIDTH = re.compile(r"\s*([-+]?[\d.]+(?:[eE][-+]?\d+)?)(?:px)?\s*$")
+_STYLE_WIDTH = re.compile(r"(?:^|;)\s*stroke-width\s*:([^;]*)")
+
+def _as_array(pts):
+    if np is None:
+        raise ImportError("Clipping requires numpy.")
+    if _is_array_pts(pts):
+        return np.column_stack(_columns(pts)).astype(float)
+    return np.array(list(pts), dtype=float).reshape(-1, 2)
+
+def _clip_half(pts, axis, bound, sign, closed, keep_ends):
+    """ One Sutherland-Hodgman stage, keeping `sign*(c-bound) >= 0`."""
+    s = sign * (pts[:,axis] - bound)
+    inside = s >= 0
+    if inside.all():
+        return pts
+    n = len(pts)
+    m = n if closed else n - 1
+    nxt = np.roll(pts, -1, axis=0)[:m]
+    s_nxt = np.roll(s, -1)[:m]
+    cross = s[:m] * s_nxt < 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(cross, s[:m] / (s[:m] - s_nxt), 0.)
+    out = np.empty((n, 2, 2))
+    out[:,0] = pts
+    out[:m,1] = pts[:m] + t[:,None] * (nxt - pts[:m])
+    out[:m,1,axis] = bound
+    mask = np.zeros((n, 2), dtype=bool)
+    mask[:,0] = inside
+    mask[:m,1] = cross
+    if keep_ends:
+        mask[0,0] = mask[-1,0] = True
+    return out[mask]
+
+def stroke_width(element, get_parent=None):
+    """ The stroke width of `element` in user units, or `None`.
+
+    `get_parent` (optional): Parent lookup (e.g.
+        `SVGDoc.get_parent`) for an inherited stroke width.
+
+    Widths in other units than `px` are not known.
+    """
+    while element is not None:
+        match = _STYLE_WIDTH.search(element.get('style') or "")
+        width = match.group(1) if match else element.get('stroke-width')
+        if width is not None:
+            match = _WIDTH.match(width)
+            return float(match.group(1)) if match else None
+        element = get_parent(element) if get_parent else None
+    return None
+
+def clip(pts, rect, closed=False, keep_ends=False, margin=None,
+         stroke_width=None):
+    """ Clip point data to the rectangle `rect`.
+
+    `pts`: Point data in document coordinates, cf.
+        `InjectPoint.inject_points`.
+
+    `rect`: `(x, y, width, height)` in document coordinates.
+
+    `closed` (optional): Clip a polygon instead of a polyline.
+
+    `keep_ends` (optional): Keep the first and the last point,
+        e.g. for points being joined to existing ones.
+
+    `margin` (optional): Grow `rect` by this on all sides,
+        default: `MARGIN`, or `STROKE_MARGIN * stroke_width`
+        if that is larger.
+
+    `stroke_width` (optional): Of the line, in document units.
+
+    Returns an (N,2) array.
+    """
+    if margin is None:
+        margin = max(MARGIN, STROKE_MARGIN * (stroke_width or 0))
+    x, y, width, height = rect
+    xmin, xmax = sorted((x, x + width))
+    ymin, ymax = sorted((y, y + height))
+    pts = _as_array(pts)
+    for axis, bound, sign in ((0, xmin - margin, 1), (0, xmax + margin, -1),
+                              (1, ymin - margin, 1), (1, ymax + margin, -1)):
+        pts = _clip_half(pts, axis, bound, sign, closed, keep_ends)
+    return pts
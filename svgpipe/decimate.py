@@ -0,0 +1,119 @@
+""" Reduce point data to what the target resolution can show.
+
+A polyline with a million points drawn into a few hundred pixels
+mostly consists of invisible detail. A `Decimation` passed to
+`InjectPoint.inject_points` or `replace_all_points` reduces the
+(transformed) points before they are stored:
+
+`minmax`: Per run of consecutive points within one pixel column,
+    keep the first, the last, the lowest and the highest point.
+    The rendered line is unchanged at the target resolution,
+    peaks are kept exactly.
+
+`lttb`: Largest-Triangle-Three-Buckets, a fixed number of points
+    chosen to keep the visual shape; a bit smoother output.
+
+Requires `numpy`.
+"""
+
+import math
+
+from svgpipe.fmt import np, _is_array_pts, _columns
+
+def _as_columns(pts):
+    if _is_array_pts(pts):
+        xs, ys = _columns(pts)
+        return np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+    arr = np.array(list(pts), dtype=float).reshape(-1, 2)
+    return arr[:,0], arr[:,1]
+
+def minmax(xs, ys, pixel=1.0):
+    """ Indices of the points kept by min/max decimation.
+
+    `xs`, `ys`: Document coordinates (1-D arrays).
+
+    `pixel`: Width of a pixel column in document units.
+    """
+    n = len(xs)
+    if n < 5:
+        return np.arange(n)
+    cols = np.floor(xs / pixel)
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    ### sort by y within each run; runs keep their positions
+    order = np.lexsort((ys, np.repeat(np.arange(len(starts)),
+                                      ends - starts + 1)))
+    return np.unique(np.concatenate((starts, ends,
+                                     order[starts], order[ends])))
+
+def lttb(xs, ys, n):
+    """ Indices of `n` points chosen by Largest-Triangle-Three-Buckets."""
+    N = len(xs)
+    if n >= N or n < 3:
+        return np.arange(N)
+    edges = np.linspace(1, N - 1, n - 1).astype(int)
+    keep = np.empty(n, dtype=int)
+    keep[0] = 0
+    keep[-1] = N - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nhi = edges[i + 2] if i + 2 < n - 1 else N
+        avgx = xs[hi:nhi].mean()
+        avgy = ys[hi:nhi].mean()
+        area = np.abs((xs[a] - avgx) * (ys[lo:hi] - ys[a])
+                      - (xs[a] - xs[lo:hi]) * (avgy - ys[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+class Decimation(object):
+    """ Decimation stage for point injection.
+
+    `method`: 'minmax' or 'lttb'.
+
+    `pixel` (optional): Width of a pixel column in document
+        units. With a rendered width in pixels, this is
+        `viewbox_width / width`, cf. `CoordFormatter.for_viewbox`.
+
+    `per_pixel` (optional): Points per pixel column for 'lttb'.
+
+    After each use, `n_in` and `n_out` hold the number of points
+    before and after decimation, `ratio` their quotient.
+    """
+
+    def __init__(self, method='minmax', pixel=1.0, per_pixel=2):
+        if method not in ('minmax', 'lttb'):
+            raise ValueError("Unknown decimation method: %s" % method)
+        if np is None:
+            raise ImportError("Decimation requires numpy.")
+        self.method = method
+        self.pixel = pixel
+        self.per_pixel = per_pixel
+        self.n_in = 0
+        self.n_out = 0
+
+    @property
+    def ratio(self):
+        """ `n_out / n_in` of the last use."""
+        return self.n_out / self.n_in if self.n_in else 1.0
+
+    def __call__(self, pts):
+        """ Reduce point data in document coordinates.
+
+        Returns an (N,2) array.
+        """
+        xs, ys = _as_columns(pts)
+        if self.method == 'minmax':
+            keep = minmax(xs, ys, self.pixel)
+        else:
+            width = xs.max() - xs.min() if len(xs) else 0
+            n = self.per_pixel * (math.ceil(width / self.pixel) + 1)
+            keep = lttb(xs, ys, n)
+        self.n_in = len(xs)
+        self.n_out = len(keep)
+        return np.column_stack((xs[keep], ys[keep]))
+
+    def __repr__(self):
+        return ("Decimation(%r, pixel=%r, per_pixel=%r)"
+                % (self.method, self.pixel, self.per_pixel))
@@ -0,0 +1,199 @@
+""" Extract point data and geometry from existing SVG documents.
+
+The counterpart of `svgpipe.inject`: `points`, `path` and `rects`
+read `points` and `d` attributes and rect geometry into `numpy`
+arrays. Numbers are tokenized by numpy as a whole (per attribute,
+or per path command), not one by one in Python.
+
+Given a `WorldDocTrafo`, document coordinates are transformed back
+into world coordinates (cf. `WorldDocTrafo.inverse_points`).
+
+`from_doc` extracts from a loaded document; `iter_extract` from
+many documents, one at a time, parsing each incrementally and
+discarding its elements as soon as they are read.
+
+Requires `numpy`.
+"""
+
+import re
+import warnings
+import xml.etree.ElementTree as ET
+
+import svgpipe
+from svgpipe.fmt import np, _NUMBER
+from svgpipe.query import compile_selector
+
+_CMD = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])")
+### numbers per segment of the path commands with points
+_STEP = {'m': 2, 'l': 2, 't': 2, 'c': 6, 's': 4, 'q': 4, 'a': 7}
+
+def _fromstring(s):
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            return np.fromstring(s, sep=' ')
+    except (ValueError, DeprecationWarning):
+        return None
+
+def _floats(text):
+    """ The numbers in `text` as a 1-D float array."""
+    s = text.replace(',', ' ').strip()
+    if not s:
+        ### numpy would return `[-1.]` for blanks
+        return np.empty(0)
+    nums = _fromstring(s)
+    if nums is None and '-' in s:
+        ### compact data, e.g. `10-5`; keep exponents like `1e-5`
+        s = s.replace('-', ' -').replace('e -', 'e-').replace('E -', 'E-')
+        nums = _fromstring(s)
+    if nums is not None:
+        return nums
+    ### e.g. `.5.5`; slow, but rare
+    if _NUMBER.sub(" ", s).strip():
+        raise svgpipe.ParseError("Invalid numbers: %.60s" % text)
+    return np.array(_NUMBER.findall(s), dtype=float)
+
+def points(text):
+    """ The text of a `points` attribute as (N,2) array."""
+    coords = _floats(text)
+    if len(coords) % 2:
+        raise svgpipe.ParseError("Odd number of coordinates: %.60s" % text)
+    return coords.reshape(-1, 2)
+
+def path(d):
+    """ The vertices of path data `d` as (N,2) array.
+
+    Subpaths are separated by a row of `NaN`, like gaps in point
+    data for `PathInjectPoint`. Curves and arcs contribute their
+    end points; `Z` adds the start point of its subpath.
+    """
+    parts = _CMD.split(d)
+    if parts[0].strip():
+        raise svgpipe.ParseError("Path data must start with a command: %.60s"
+                                 % d)
+    out = []
+    cur = start = np.zeros(2)
+    for cmd, args in zip(parts[1::2], parts[2::2]):
+        nums = _floats(args)
+        lower = cmd.lower()
+        rel = cmd == lower
+        if lower == 'z':
+            if len(nums):
+                raise svgpipe.ParseError("Invalid path data: %s%.60s"
+                                         % (cmd, args))
+            out.append(start[None])
+            cur = start
+            continue
+        if lower in 'hv':
+            if not len(nums):
+                raise svgpipe.ParseError("Invalid path data: %s%.60s"
+                                         % (cmd, args))
+            axis = 0 if lower == 'h' else 1
+            pts = np.empty((len(nums), 2))
+            pts[:,axis] = np.cumsum(nums) + cur[axis] if rel else nums
+            pts[:,1-axis] = cur[1-axis]
+        else:
+            step = _STEP[lower]
+            if not len(nums) or len(nums) % step:
+                raise svgpipe.ParseError("Invalid path data: %s%.60s"
+                                         % (cmd, args))
+            ends = nums.reshape(-1, step)[:,step-2:]
+            pts = np.cumsum(ends, axis=0) + cur if rel else ends
+            if lower == 'm':
+                if out:
+                    out.append(np.full((1, 2), np.nan))
+                start = pts[0]
+        out.append(pts)
+        cur = pts[-1]
+    if not out:
+        return np.empty((0, 2))
+    return np.concatenate(out)
+
+def rects(elements, trafo=None):
+    """ The geometry of rect `elements` as (N,4) array.
+
+    Rows are `(x, y, width, height)`, or with a `trafo` the world
+    coords `(h1, v1, h2, v2)` of the corners `(x, y)` and
+    `(x+width, y+height)`.
+    """
+    try:
+        geo = np.array([el.get(a, '0') for el in elements
+                        for a in ('x', 'y', 'width', 'height')],
+                       dtype=float).reshape(-1, 4)
+    except ValueError:
+        raise svgpipe.ParseError("Invalid rect geometry (units?)")
+    if trafo is None:
+        return geo
+    x, y, w, h = geo.T
+    return np.column_stack((trafo.x2h_array(x), trafo.y2v_array(y),
+                            trafo.x2h_array(x + w), trafo.y2v_array(y + h)))
+
+def element_data(el, trafo=None):
+    """ The data of a single element as array.
+
+    polygon, polyline: cf. `points`
+    path: cf. `path`
+    line: its two end points
+    rect: one row of `rects`
+
+    `None` for other elements.
+    """
+    tag = el.tag.rpartition('}')[2]
+    if tag in ('polyline', 'polygon'):
+        pts = points(el.get('points', ''))
+    elif tag == 'path':
+        pts = path(el.get('d', ''))
+    elif tag == 'line':
+        pts = _floats(" ".join(el.get(a, '0') for a in ('x1', 'y1',
+                                                        'x2', 'y2')))
+        pts = pts.reshape(2, 2)
+    elif tag == 'rect':
+        return rects([el], trafo)[0]
+    else:
+        return None
+    return pts if trafo is None else trafo.inverse_points(pts)
+
+def from_doc(doc, selectors, trafo=None):
+    """ The data of the elements of `doc` matching `selectors`.
+
+    `doc`: An `SVGDoc`; edited point data of an `SVGDocInj` is
+        written to the elements first.
+
+    `selectors`: cf. `svgpipe.query`
+
+    Returns a dict mapping each selector to a list of
+    `(id, data)`, cf. `element_data`.
+    """
+    if hasattr(doc, 'flush_points'):
+        doc.flush_points()
+    return {s: [(el.get('id'), element_data(el, trafo)) for el in els]
+            for s, els in doc.select(selectors).items()}
+
+def iter_extract(sources, selectors, trafo=None):
+    """ Extract data from many documents, one after the other.
+
+    `sources`: File names or file objects.
+
+    `selectors`, `trafo`: cf. `from_doc`.
+
+    Yields `(source, selector, id, data)` for each matching
+    element, in document order. Only the currently open
+    elements of one document are kept in memory.
+    """
+    sels = [compile_selector(s) for s in selectors]
+    for source in sources:
+        stack = []
+        for event, el in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                stack.append(el)
+                continue
+            stack.pop()
+            if not stack:
+                ### the root element
+                continue
+            for sel in sels:
+                if (sel.tag is None or sel.tag == el.tag) and sel.match(el):
+                    yield (source, sel.text, el.get('id'),
+                           element_data(el, trafo))
+            ### all earlier siblings are gone already
+            del stack[-1][:]
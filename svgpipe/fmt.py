@@ -0,0 +1,350 @@
+""" Format coordinates as SVG number text.
+
+A `CoordFormatter` turns point data into the text of a
+`points` attribute (`x1,y1 x2,y2 ...`). Numbers are formatted
+with a fixed number of decimals or significant digits, and can
+be snapped to a quantum such as the resolution of the document.
+
+Point data is given as a sequence of `(x,y)` tuples, or as
+`numpy` arrays: an (N,2) array or a pair of 1-D columns.
+"""
+
+import math
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    ### numpy is optional; without it, points are lists of tuples
+    np = None
+
+def _is_array_pts(pts):
+    """ Are `pts` an (N,2) ndarray or a pair of 1-D ndarray columns?"""
+    if np is None:
+        return False
+    if isinstance(pts, np.ndarray):
+        return True
+    return (isinstance(pts, tuple) and len(pts) == 2
+            and all(isinstance(c, np.ndarray) and c.ndim == 1
+                    for c in pts))
+
+def _columns(pts):
+    """ Split array point data into horizontal and vertical columns."""
+    if isinstance(pts, np.ndarray):
+        if pts.ndim != 2 or pts.shape[1] != 2:
+            raise ValueError("Expected an (N,2) array of points, got shape %s"
+                             % (pts.shape,))
+        return pts[:,0], pts[:,1]
+    hs, vs = pts
+    if len(hs) != len(vs):
+        raise ValueError("Point columns differ in length: %d, %d"
+                         % (len(hs), len(vs)))
+    return hs, vs
+
+def _subpaths(pts):
+    """ Split point data at gaps (`None` or `NaN`) into subpaths.
+
+    Yields `(connected, subpath)`: `connected` is true for a
+    first subpath not preceded by a gap. Subpaths are (N,2)
+    arrays for array point data, lists of `(x,y)` otherwise.
+    Empty subpaths are skipped.
+    """
+    if _is_array_pts(pts):
+        xs, ys = _columns(pts)
+        arr = np.column_stack((xs, ys)).astype(float)
+        gaps = np.flatnonzero(np.isnan(arr).any(axis=1))
+        start = 0
+        for stop in gaps.tolist() + [len(arr)]:
+            if stop > start:
+                yield start == 0, arr[start:stop]
+            start = stop + 1
+        return
+    sub = []
+    connected = True
+    for p in pts:
+        if p is None or p[0] != p[0] or p[1] != p[1]:
+            if sub:
+                yield connected, sub
+            sub = []
+            connected = False
+        else:
+            sub.append(p)
+    if sub:
+        yield connected, sub
+
+### a number in SVG attributes, which may follow one another without
+### separators (`10-5`, `.5.5`), cf. `svgpipe.extract`, `svgpipe.points`
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+### trailing zeros (and a dangling '.') of fixed point numbers
+_STRIP = re.compile(r"\.?0+(?=[ ,]|$)")
+### negative zeros, after stripping
+_NEGZERO = re.compile(r"-0(?=[ ,]|$)")
+
+### separators before minus signs and leading zeros, both
+### optional in path data
+_COMPACT = re.compile(r"[ ,](?=-)|(?<![0-9])0(?=\.)")
+
+### ASCII codes used by the array formatter
+_MINUS, _DOT, _COMMA, _SPACE, _ZERO = b"-., 0"
+
+class CoordFormatter(object):
+    """ Format numbers and points for SVG attributes.
+
+    `decimals`: Number of decimals (fixed precision). Trailing
+        zeros are stripped, `1.500000` becomes `1.5`.
+
+    `sigdigits` (optional): Use significant digits instead of
+        fixed precision (`%g` style, may use exponents).
+
+    `quantum` (optional): Snap each number to the nearest
+        multiple of `quantum`, e.g. the size of a pixel in
+        document units. Unless given explicitly, `decimals`
+        is derived from `quantum`.
+
+    Non-numeric values such as `datetime` raise a `TypeError`.
+    """
+
+    def __init__(self, decimals=None, sigdigits=None, quantum=None):
+        if sigdigits is not None and decimals is not None:
+            raise ValueError("Use either decimals or sigdigits, not both.")
+        if quantum is not None and quantum <= 0:
+            raise ValueError("quantum must be positive: %s" % quantum)
+        if decimals is None and sigdigits is None:
+            decimals = (6 if quantum is None
+                        else CoordFormatter._decimals_for(quantum))
+        self.decimals = decimals
+        self.sigdigits = sigdigits
+        self.quantum = quantum
+        if sigdigits is not None:
+            self._numfmt = "%%.%dg" % sigdigits
+            self._stripre = None
+        else:
+            ### `%f` is parsed faster than the same `%.6f`
+            self._numfmt = "%f" if decimals == 6 else "%%.%df" % decimals
+            self._stripre = _STRIP if decimals > 0 else None
+
+    def _decimals_for(quantum):
+        """ Number of decimals for writing multiples of `quantum`.
+
+        As many as the first significant digit of `quantum` needs,
+        plus one (guard) digit if `quantum` has more of them (e.g.
+        for 0.25 or 1/3); the error stays far below `quantum`.
+        """
+        d = max(0, math.ceil(-math.log10(quantum) - 1e-9))
+        if abs(round(quantum, d) - quantum) <= 1e-9 * quantum:
+            return d
+        return d + 1
+
+    @classmethod
+    def for_viewbox(cls, viewbox, width=None, subpixel=1):
+        """ A formatter snapping to the resolution of a document.
+
+        `viewbox`: `(x,y,width,height)`, cf. `SVGDoc.get_viewbox`.
+
+        `width` (optional): Rendered width of the document in
+            pixels. If omitted, one document unit is one pixel.
+
+        `subpixel`: Number of steps per pixel to be kept.
+        """
+        unit = 1.0 if width is None else viewbox[2] / width
+        return cls(quantum=unit / subpixel)
+
+    def _snap(self, x):
+        return round(x / self.quantum, 0) * self.quantum
+
+    def format_number(self, x):
+        """ Format a single number."""
+        if self.quantum is not None:
+            x = self._snap(x)
+        return self._strip(self._numfmt % x)
+
+    def _strip(self, txt):
+        if self.sigdigits is not None:
+            return txt
+        if self._stripre is not None:
+            txt = self._stripre.sub("", txt)
+        if "-0" in txt:
+            txt = _NEGZERO.sub("0", txt)
+        return txt
+
+    def format_points(self, pts):
+        """ Format points as `x1,y1 x2,y2 ...`.
+
+        `pts`: A sequence of points [(x1,y1), (x2,y2), ...],
+            an (N,2) array or a pair of 1-D arrays `(xs, ys)`.
+        """
+        if _is_array_pts(pts):
+            return self._format_array(*_columns(pts))
+        if self.quantum is not None:
+            pts = [(self._snap(x), self._snap(y)) for x, y in pts]
+        if self.sigdigits is None and self.decimals > 0:
+            ### stripping each number is faster than `_strip`
+            num = self._numfmt
+            txt = " ".join([(num % x).rstrip("0").rstrip(".") + ","
+                            + (num % y).rstrip("0").rstrip(".")
+                            for x, y in pts])
+            return _NEGZERO.sub("0", txt) if "-0" in txt else txt
+        flat = [c for x, y in pts for c in (x, y)]
+        fmt = "%s,%s " % (self._numfmt, self._numfmt)
+        return self._strip((fmt * (len(flat)//2))[:-1] % tuple(flat))
+
+    def _format_array(self, xs, ys):
+        n = len(xs)
+        if n == 0:
+            return ""
+        flat = np.empty(2*n, dtype=np.result_type(xs, ys, float))
+        flat[0::2] = xs
+        flat[1::2] = ys
+        if flat.dtype == object:
+            ### let `%` reject what is not a number
+            return self.format_points(zip(xs.tolist(), ys.tolist()))
+        if self.quantum is not None:
+            flat = np.round(flat / self.quantum) * self.quantum
+        if self.sigdigits is None:
+            txt = self._format_fixed(flat)
+            if txt is not None:
+                return txt
+        fmt = "%s,%s " % (self._numfmt, self._numfmt)
+        return self._strip((fmt * n)[:-1] % tuple(flat.tolist()))
+
+    def _format_fixed(self, flat):
+        """ Fixed point text of a float array, built digit by digit.
+
+        All numbers are written as ASCII codes into one byte
+        matrix; a mask selects the characters to keep. Returns
+        `None` for data outside the safe range of this method
+        (non-finite or very large numbers). Rounds like `%f`.
+        """
+        d = self.decimals
+        absval = np.abs(flat)
+        if not np.all(np.isfinite(absval)):
+            return None
+        scaled = absval * 10.0**d
+        q = np.rint(scaled)
+        if q.max() >= 2.0**53:
+            return None
+        ### `scaled` is rounded itself: values (nearly) halfway
+        ### between two steps are rounded by `%f` from their exact
+        ### binary value, e.g. 2.675 (2.67499...) to 2.67
+        halfway = np.abs(scaled - q) >= 0.5 - scaled * 2.0**-52
+        for i in np.flatnonzero(halfway).tolist():
+            q[i] = float(("%.*f" % (d, absval[i])).replace(".", ""))
+        q = q.astype(np.int64)
+        ip, fr = np.divmod(q, 10**d)
+        if ip.max() > 2**31 - 1:
+            return None
+        K = len(str(int(ip.max())))
+        ip = ip.astype(np.int32)
+        fr = fr.astype(np.int32)
+        N = len(flat)
+        W = 1 + K + 1 + d + 1 # sign, int part, '.', decimals, separator
+        chars = np.empty((N, W), np.uint8)
+        keep = np.zeros((N, W), bool)
+        chars[:,0] = _MINUS
+        keep[:,0] = (flat < 0) & (q != 0)
+        ### decimals, from the last one; stop stripping at a non-zero
+        nonzero = np.zeros(N, bool)
+        for j in range(1+K+d, 1+K, -1):
+            digit = fr % 10
+            fr //= 10
+            nonzero |= digit != 0
+            chars[:,j] = digit + _ZERO
+            keep[:,j] = nonzero
+        chars[:,1+K] = _DOT
+        keep[:,1+K] = nonzero
+        ### integer part, without leading zeros
+        for j in range(K, 0, -1):
+            chars[:,j] = ip % 10 + _ZERO
+            keep[:,j] = ip > 0
+            ip //= 10
+        keep[:,K] = True
+        chars[0::2,-1] = _COMMA
+        chars[1::2,-1] = _SPACE
+        keep[:,-1] = True
+        keep[-1,-1] = False
+        return chars[keep].tobytes().decode('ascii')
+
+    def round_values(self, values):
+        """ Round a number or `numpy` array as the formatter does.
+
+        With `sigdigits`, values are returned unchanged.
+        """
+        if self.sigdigits is not None:
+            return values
+        if np is not None and isinstance(values, np.ndarray):
+            if self.quantum is not None:
+                values = np.round(values / self.quantum) * self.quantum
+            return np.round(values, self.decimals)
+        if self.quantum is not None:
+            values = self._snap(values)
+        return round(values, self.decimals)
+
+    def format_path(self, pts, start=None):
+        """ Path data (`d` attribute) for points with gaps.
+
+        `pts`: Point data, cf. `format_points`. A point `None`
+            or with a `NaN` coordinate ends a subpath.
+
+        `start` (optional): The current point of the path the
+            data will be appended to; the data continues the
+            current subpath unless it starts with a gap. Without
+            `start`, the data starts with an absolute moveto.
+
+        Coordinates are written relative to the previous point,
+        separators are omitted where possible. The deltas are
+        taken between rounded points, so the rounding errors do
+        not accumulate. With `sigdigits`, absolute coordinates
+        are written.
+        """
+        return self._path_data(pts, start)[0]
+
+    def _path_data(self, pts, start):
+        """ `format_path`, also returns the (rounded) end point."""
+        parts = []
+        prev = start
+        for connected, sub in _subpaths(pts):
+            if self.sigdigits is not None:
+                if prev is not None and connected:
+                    parts.append("L" + self._compact(sub))
+                else:
+                    parts.append("M" + self._compact(sub[:1]))
+                    if len(sub) > 1:
+                        parts.append("L" + self._compact(sub[1:]))
+                prev = tuple(sub[-1])
+                continue
+            if np is not None and isinstance(sub, np.ndarray):
+                sub = self.round_values(sub)
+                if prev is None:
+                    deltas = np.diff(sub, axis=0)
+                else:
+                    deltas = np.diff(sub, axis=0, prepend=[prev])
+                end = tuple(sub[-1].tolist())
+            else:
+                sub = [(self.round_values(x), self.round_values(y))
+                       for x, y in sub]
+                chain = sub if prev is None else [prev] + sub
+                deltas = [(x1-x0, y1-y0) for (x0, y0), (x1, y1)
+                          in zip(chain, chain[1:])]
+                end = sub[-1]
+            if prev is None:
+                parts.append("M" + self._compact(sub[:1]))
+                if len(deltas):
+                    parts.append("l" + self._compact(deltas))
+            elif connected:
+                parts.append("l" + self._compact(deltas))
+            else:
+                ### pairs after a moveto are (relative) linetos
+                parts.append("m" + self._compact(deltas))
+            prev = end
+        return "".join(parts), prev
+
+    def _compact(self, pts):
+        return _COMPACT.sub("", self.format_points(pts))
+
+    def __repr__(self):
+        return ("CoordFormatter(decimals=%r, sigdigits=%r, quantum=%r)"
+                % (self.decimals, self.sigdigits, self.quantum))
+
+### `%f` style with trailing zeros stripped, the default for injection
+DEFAULT = CoordFormatter()
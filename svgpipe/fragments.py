@@ -0,0 +1,102 @@
+""" Cache of parsed SVG fragments.
+
+Content injected as strings (markers, legend items, group
+wrappers) tends to repeat. `InjectPoint.inject` and
+`SVGDocInj.get_layer_injectpoint` look fragments up in `CACHE`
+and only parse unknown ones; known ones are copied, which is
+much cheaper than setting up a parser. A fragment is only cached
+when it is seen for the second time, so unique fragments are
+parsed and returned as before, without copying.
+
+Replace `CACHE` (e.g. by `FragmentCache(maxsize=0)`, which
+caches nothing) to change the limits.
+"""
+
+import collections
+import copy
+import threading
+
+### fragments remembered by `FragmentCache`, per cached fragment
+SEEN = 4
+
+class FragmentCache(object):
+    """ Parsed fragments, evicting the least recently used.
+
+    `maxsize` (optional): Maximum number of fragments.
+
+    `maxchars` (optional): Maximum total length of the cached
+        fragment strings. Longer fragments are not cached.
+
+    `hits`, `misses`: Number of lookups of cacheable fragments
+        which were found, or had to be parsed.
+
+    Fragments are cached on their second miss. Up to
+    `SEEN * maxsize` missed fragments are remembered by hash,
+    the least recently missed ones are forgotten first.
+    """
+
+    def __init__(self, maxsize=1024, maxchars=1 << 20):
+        self.maxsize = maxsize
+        self.maxchars = maxchars
+        self._entries = collections.OrderedDict()
+        ### hashes of fragments missed once --> True, oldest first,
+        ### cf. `fromstring`
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fromstring(self, backend, text):
+        """ The element parsed from `text` by `backend`.
+
+        Returns a new copy on each call. Parse errors are raised
+        as by `backend.fromstring`.
+        """
+        if (not isinstance(text, (str, bytes)) or self.maxsize <= 0
+                or len(text) > self.maxchars):
+            return backend.fromstring(text)
+        key = backend.name, text
+        ### entries are only added or removed under the lock,
+        ### looking them up (without it) is atomic
+        el = self._entries.get(key)
+        if el is not None:
+            with self._lock:
+                self.hits += 1
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+            return copy.deepcopy(el)
+        ### fragments are cached when they are seen the second
+        ### time; unique ones are parsed without further overhead
+        h = hash(text)
+        with self._lock:
+            self.misses += 1
+            seen = self._seen.pop(h, False)
+            if not seen:
+                self._seen[h] = True
+                if len(self._seen) > SEEN * self.maxsize:
+                    self._seen.popitem(last=False)
+        el = backend.fromstring(text)
+        if not seen:
+            return el
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = el
+                self.chars += len(text)
+                while (len(self._entries) > self.maxsize
+                       or self.chars > self.maxchars):
+                    (name, old), _ = self._entries.popitem(last=False)
+                    self.chars -= len(old)
+        return copy.deepcopy(el)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._seen.clear()
+            self.chars = 0
+
+### used by `svgpipe.inject`
+CACHE = FragmentCache()
@@ -1,12 +1,27 @@
 """ Inject SVG content into existing SVG files.
 
-Relies on `xml.etree.ElementTree` (in short `ET`)
-for SVG/XML element representation.
+Relies on `xml.etree.ElementTree` (in short `ET`) or `lxml`
+for SVG/XML element representation, cf. `svgpipe.backend`.
 """
 
-import xml.etree.ElementTree as ET
+import datetime
+import functools
+
+try:
+    import numpy as np
+except ImportError:
+    ### numpy is optional; without it, points are lists of tuples
+    np = None
 
 import svgpipe
+import svgpipe.aio
+import svgpipe.backend
+import svgpipe.clip
+import svgpipe.fragments
+from svgpipe.fmt import DEFAULT as DEFAULT_FMT
+from svgpipe.fmt import _is_array_pts, _columns
+from svgpipe.points import PointBuffer
+import svgpipe.stream
 
 INJ_POS_BEFORE = 1
 INJ_POS_AFTER = 2
@@ -18,6 +33,60 @@ class SVGDocInj(svgpipe.SVGDoc):
     methods. Multiple injectpoints can be used simultaneously.
     """
 
+    def __init__(self, filename, fmt=DEFAULT_FMT, only=None, backend=None):
+        """ `fmt` (optional): The `svgpipe.fmt.CoordFormatter`
+            used by the injectpoints of this document.
+
+            `only`, `backend` (optional): cf. `SVGDoc`."""
+        super().__init__(filename, only, backend)
+        self._init_state(fmt)
+
+    def _init_state(self, fmt):
+        """ Per-document state, also set up by subclasses."""
+        self.fmt = fmt
+        self._point_buffers = {}
+        ### fragment --> symbol id, cf. `symbol_id`
+        self._symbols = {}
+        ### sorted properties --> class name, cf. `style_class`
+        self._classes = {}
+        ### element --> output of the last cached save, cf. `save`
+        self._saved = {}
+
+    def own(self, element):
+        """ The element to be changed in place of `element`.
+
+        `element` itself; documents sharing elements with others
+        return a copy, cf. `svgpipe.template.TemplateDoc.own`.
+        """
+        return element
+
+    def point_buffer(self, element):
+        """ The `PointBuffer` of a polygon/polyline `element`.
+
+        The `points` attribute is parsed on first use; all
+        injectpoints of the document share the same buffer per
+        element. Edits are written back by `flush_points`.
+        """
+        element = self.own(element)
+        buf = self._point_buffers.get(element)
+        if buf is None:
+            buf = PointBuffer.from_text(element.get('points', ''),
+                                        self.fmt)
+            ### edits invalidate the cached output, cf. `save`
+            buf.on_edit = functools.partial(self._touch, element)
+            self._point_buffers[element] = buf
+        return buf
+
+    def flush_points(self):
+        """ Write all edited point buffers into their elements.
+
+        Called by `save`. Call it before reading the `points`
+        attributes of edited elements directly.
+        """
+        for el, buf in self._point_buffers.items():
+            if buf.dirty:
+                buf.write(el)
+
     def get_layer_injectpoint(self, id, hrange, vrange,
                               group=None, **delta_hv):
         """ Get a `ScaledInjectPoint` for injecting content.
@@ -33,22 +102,113 @@ class SVGDocInj(svgpipe.SVGDoc):
             cf. WorldDocTrafo.
             """
         target_el = self.get_layer(id)
-        if not target_el:
-            raise NotFoundError("No Layer with id=%s" % id)
+        if target_el is None:
+            raise svgpipe.NotFoundError("No Layer with id=%s" % id)
         ### if group element is given, insert it as inj. target
         if group is not None:
-            g = ET.fromstring(group)
+            g = svgpipe.fragments.CACHE.fromstring(self.backend, group)
             target_el.append(g)
+            self.register_subtree(g, target_el)
+            self._touch(target_el)
             target_el = g
         return ScaledInjectPoint(target_el,
                                  self.get_viewbox(),
                                  hrange, vrange,
-                                 **delta_hv)
+                                 doc=self, fmt=self.fmt, **delta_hv)
+
+    def _defs(self):
+        """ The top-level `defs` element, created if missing."""
+        qtag = "{%s}defs" % svgpipe.SVGDoc._NS['svg']
+        for el in self.root:
+            if el.tag == qtag:
+                return el
+        defs = self.backend.Element(qtag)
+        self.root.insert(0, defs)
+        self.register_subtree(defs, self.root)
+        return defs
+
+    def symbol_id(self, fragment):
+        """ The id of a `symbol` holding `fragment` (`str` or element).
+
+        The symbol is added to the `defs` of the document when
+        `fragment` is used for the first time; later calls with
+        the same fragment return the same id.
+        """
+        id = self._symbols.get(fragment)
+        if id is not None:
+            return id
+        if self.backend.iselement(fragment):
+            el = fragment
+        else:
+            el = svgpipe.fragments.CACHE.fromstring(self.backend, fragment)
+        if self._ids is None:
+            self._build_index()
+        n = len(self._symbols) + 1
+        while "svgpipe_sym%d" % n in self._ids:
+            n += 1
+        id = "svgpipe_sym%d" % n
+        ### content outside the symbol's viewport must not be clipped
+        symbol = self.backend.Element("{%s}symbol" % svgpipe.SVGDoc._NS['svg'],
+                                      {'id': id, 'overflow': "visible"})
+        symbol.append(el)
+        defs = self._defs()
+        defs.append(symbol)
+        self.register_subtree(symbol, defs)
+        self._touch(defs)
+        self._symbols[fragment] = id
+        return id
+
+    def _styles(self):
+        """ The `style` element of the generated classes, created if missing."""
+        defs = self._defs()
+        qtag = "{%s}style" % svgpipe.SVGDoc._NS['svg']
+        for el in defs:
+            if el.tag == qtag and el.get('id') == "svgpipe_styles":
+                return el
+        style = self.backend.Element(qtag, {'id': "svgpipe_styles",
+                                            'type': "text/css"})
+        defs.append(style)
+        self.register_subtree(style, defs)
+        self._touch(defs)
+        return style
+
+    def style_class(self, props):
+        """ The name of a CSS class setting the properties `props`.
+
+        `props`: Pairs `(name, value)` of presentation attributes,
+            e.g. `[('fill', "#2EC"), ('stroke', "none")]`.
+
+        The class is added to a `style` element in the `defs` of
+        the document for the first use of `props`; later calls
+        with the same properties (in any order) return the same
+        name.
+        """
+        props = list(props)
+        key = tuple(sorted(props))
+        name = self._classes.get(key)
+        if name is not None:
+            return name
+        style = self._styles()
+        text = style.text or ""
+        n = len(self._classes) + 1
+        while ".svgpipe_c%d{" % n in text:
+            n += 1
+        name = "svgpipe_c%d" % n
+        style.text = text + ".%s{%s}\n" % (name, ";".join("%s:%s" % p
+                                                         for p in props))
+        self._touch(style)
+        self._classes[key] = name
+        return name
 
     def get_poly_injectpoint(self, tag, id):
         """ An `InjectPoint` for polygon/polyline with given `id`."""
         poly = self.get_svg_element(tag, id)
-        return InjectPoint(poly)
+        return InjectPoint(poly, doc=self, fmt=self.fmt)
+
+    def get_path_injectpoint(self, id):
+        """ A `PathInjectPoint` for the `path` with given `id`."""
+        path = self.get_svg_element('path', id)
+        return PathInjectPoint(path, doc=self, fmt=self.fmt)
 
     def trafo_from_rect(self, id, hrange, vrange,
                         flip_y=False, **delta_hv):
@@ -64,7 +224,7 @@ class SVGDocInj(svgpipe.SVGDoc):
         """
         target_el = self.get_svg_element('rect', id)
         if target_el is None:
-            raise NotFoundError("No `rect` element with id=%s" % id)
+            raise svgpipe.NotFoundError("No `rect` element with id=%s" % id)
         vbox = list(map(float, (target_el.attrib['x'],
                                 target_el.attrib['y'],
                                 target_el.attrib['width'],
@@ -73,35 +233,143 @@ class SVGDocInj(svgpipe.SVGDoc):
                              flip_y, **delta_hv)
 
 
-    def get_rect_injectpoint(self, id, hrange, vrange, **delta_hv):
-        def _rect2group(svgelement, newattribs):
-            # FIXME:
-            # To just rename the tag rather than cleanly create
-            # a new element is certainly not polite towards
-            # the ethos of engineering.
-            # However, it avoids finding parents and indices,
-            # which is not straightforward in ElementTree.
-            svgelement.tag = svgelement.tag.replace('rect','g')
-            svgelement.attrib = newattribs
-            return svgelement
+    def _rect2group(self, rect, newattribs):
+        """ Replace `rect` by a new `g` element containing `rect`.
+
+        The group takes the place (and the tail text) of `rect`
+        in its parent. Returns the new group.
+        """
+        parent = self.get_parent(rect)
+        group = self.backend.Element(rect.tag.replace('rect','g'),
+                                     newattribs)
+        group.tail, rect.tail = rect.tail, None
+        parent[list(parent).index(rect)] = group
+        self.register_subtree(group, parent)
+        self._touch(parent)
+        group.append(rect)
+        if self._parents is not None:
+            self._parents[rect] = group
+        return group
 
+    def get_rect_injectpoint(self, id, hrange, vrange, **delta_hv):
         target_el = self.get_svg_element('rect', id)
         if target_el is None:
-            raise NotFoundError("No `rect` element with id=%s" % id)
+            raise svgpipe.NotFoundError("No `rect` element with id=%s" % id)
         vbox = list(map(float, (target_el.attrib['x'],
                                 target_el.attrib['y'],
                                 target_el.attrib['width'],
                                 target_el.attrib['height'])))
-        injectrect_copy = ET.fromstring(ET.tostring(target_el))
-        injectrect_copy.attrib['opacity'] = "0.452"
-        target_el = _rect2group(target_el,
-                                {'id': "INJ_%s" % id})
-        target_el.append(injectrect_copy)
+        target_el.attrib['opacity'] = "0.452"
+        target_el = self._rect2group(target_el,
+                                     {'id': "INJ_%s" % id})
         return ScaledInjectPoint(target_el, vbox,
-                                 hrange, vrange, **delta_hv)
+                                 hrange, vrange,
+                                 doc=self, fmt=self.fmt, **delta_hv)
 
-    def save(self, file):
-        self.tree.write(file, encoding="utf8")
+    def _release(self, element):
+        """ Drop the children of `element` and everything about them."""
+        for el in element.iter():
+            self._point_buffers.pop(el, None)
+        self._touch(element)
+        self._forget_subtree(element)
+        del element[:]
+
+    def _touch(self, element):
+        """ Drop the cached output of `element` and its ancestors."""
+        while element is not None and self._saved:
+            self._saved.pop(element, None)
+            element = self.get_parent(element)
+
+    def invalidate_index(self):
+        super().invalidate_index()
+        self._saved.clear()
+
+    def save(self, file, cached=False):
+        """ Write the document into `file` (name or file object).
+
+        `cached` (optional): Keep the output of the top levels
+            of the tree (cf. `svgpipe.stream.CACHE_DEPTH`) and
+            reuse it in later cached saves for all elements which
+            have not been changed through `svgpipe` in between.
+            Other changes require `invalidate_index`. Only used
+            with the `etree` backend: `lxml` writes a whole tree
+            faster than it could reuse parts of it, so documents
+            of `lxml` are always written by `lxml` itself.
+        """
+        if cached and self.backend.name == 'etree':
+            svgpipe.stream.StreamWriter(self, file,
+                                        cache=self._saved).close()
+            return
+        if self._raw is not None:
+            ### partial document, cf. `svgpipe.partial`
+            self.save_streaming(file)
+            return
+        self.flush_points()
+        self.backend.write(self.tree, file)
+
+    async def asave(self, file):
+        """ Like `save`, without blocking the event loop.
+
+        `file` can also be an asyncio stream, cf. `svgpipe.aio`.
+        """
+        await svgpipe.aio.save_doc(self, file)
+
+    def stream_writer(self, file, bufsize=svgpipe.stream.BUFSIZE):
+        """ A `svgpipe.stream.StreamWriter` for this document.
+
+        Allows to write finished layers early, cf.
+        `StreamWriter.flush_through`.
+        """
+        return svgpipe.stream.StreamWriter(self, file, bufsize)
+
+    def save_streaming(self, file, bufsize=svgpipe.stream.BUFSIZE):
+        """ Like `save`, but with a bounded output buffer.
+
+        Point data is formatted into the output in chunks.
+        """
+        self.stream_writer(file, bufsize).close()
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=datetime.timezone.utc)
+_SECOND = datetime.timedelta(seconds=1)
+
+def _is_temporal(t):
+    return (isinstance(t, datetime.date)
+            or (np is not None and isinstance(t, np.datetime64)))
+
+def _epoch(t):
+    """ Seconds since 1970-01-01 of a point in time.
+
+    `t`: A `datetime` (naive ones are taken as UTC, like numpy
+        does), `date`, `numpy.datetime64` or a number of seconds.
+    """
+    if isinstance(t, datetime.datetime):
+        if t.tzinfo is not None:
+            return t.timestamp()
+        return (t - _EPOCH) / _SECOND
+    if isinstance(t, datetime.date):
+        return (t - _EPOCH.date()) / _SECOND
+    if np is not None and isinstance(t, np.datetime64):
+        return float((t - np.datetime64(0, 's')) / np.timedelta64(1, 's'))
+    return t
+
+def _epoch_array(ts):
+    """ Vectorised `_epoch`: A sequence --> `float` array of seconds."""
+    arr = np.asarray(ts)
+    if arr.dtype.kind == 'O' and len(arr):
+        first = arr.flat[0]
+        if isinstance(first, datetime.datetime):
+            epoch = _EPOCH if first.tzinfo is None else _EPOCH_UTC
+        elif isinstance(first, datetime.date):
+            epoch = _EPOCH.date()
+        else:
+            return np.fromiter(map(_epoch, arr.flat), dtype=float,
+                               count=arr.size)
+        ### still one Python operation per element, but no closure
+        return ((arr - epoch) / _SECOND).astype(float)
+    if arr.dtype.kind == 'M':
+        return (arr - np.datetime64(0, 's')) / np.timedelta64(1, 's')
+    return arr.astype(float)
 
 class WorldDocTrafo(object):
     """ Transform world coords into document coordinates.
@@ -134,6 +402,11 @@ class WorldDocTrafo(object):
         `hrange`, `vrange`:
             A 'view' on the data (world coords).
 
+        Temporal ranges (`datetime`, `date` or `numpy.datetime64`)
+            make a time axis: its world coordinates can be given
+            as any of these or as seconds since 1970-01-01, and
+            arrays of them are converted in one step.
+
         `delta_h`, `delta_v` (optional): If defined they
             override the canonical difference operation `-` for
             delta calculation on world coordinates.
@@ -146,7 +419,16 @@ class WorldDocTrafo(object):
         ### Define the View on the data: horizontal, vertical
         self.h1, self.h2 = hrange
         self.v1, self.v2 = vrange
+        ### time axes work on seconds, unless deltas are customized
+        self._time_h = delta_h is None and _is_temporal(self.h1)
+        self._time_v = delta_v is None and _is_temporal(self.v1)
+        if self._time_h:
+            self.h1, self.h2 = _epoch(self.h1), _epoch(self.h2)
+        if self._time_v:
+            self.v1, self.v2 = _epoch(self.v1), _epoch(self.v2)
+        self._delta_h, self._delta_v = delta_h, delta_v
         ### document dimensions: x, y
+        self.viewbox = tuple(viewbox)
         self.x1, self.y1, width, height = viewbox
         ### init scale factors and transformation functions
         if delta_h is not None:
@@ -157,6 +439,13 @@ class WorldDocTrafo(object):
                               x1=self.x1,        \
                               sc=self.hx_factor, \
                               d=delta_h : d(h1,h)*sc + x1
+        elif self._time_h:
+            # points in time --> seconds
+            self.hx_factor = width / (self.h2-self.h1)
+            self.h2x = lambda h,           \
+                              h1=self.h1,  \
+                              x1=self.x1,  \
+                              sc=self.hx_factor : (_epoch(h)-h1)*sc + x1
         else:
             # use simple and fast `-`
             self.hx_factor = width / (self.h2-self.h1)
@@ -170,14 +459,23 @@ class WorldDocTrafo(object):
             flipfactor_y = -1
         else:
             flipfactor_y = 1
+        self._flipfactor_y = flipfactor_y
         if delta_v is not None:
             # non-trivial delta calculation function
-            self.vy_factor = heigth / delta_v(self.v1, self.v2)
+            self.vy_factor = height / delta_v(self.v1, self.v2)
             self.v2y = lambda v,                              \
                               v1=self.v1,                     \
                               y1=self.y1,                     \
                               sc=self.vy_factor*flipfactor_y, \
                               d=delta_v : d(v1,v)*sc + y1
+        elif self._time_v:
+            # points in time --> seconds
+            self.vy_factor = height / (self.v2-self.v1)
+            self.v2y = lambda v,                              \
+                              v1=self.v1,                     \
+                              y1=self.y1,                     \
+                              sc=self.vy_factor*flipfactor_y  \
+                              : (_epoch(v)-v1)*sc + y1
         else:
             # use simple and fast `-`
             self.vy_factor = height / (self.v2-self.v1)
@@ -201,59 +499,283 @@ class WorldDocTrafo(object):
         """
         raise Exception("Internal error: h2x was not initialized properly. Please contact the administrator ,-)")
 
+    def h2x_array(self, hs):
+        """ Vectorised `h2x`: A sequence of `h` --> `float` array of `x`.
+
+        With a custom `delta_h`, the conversion falls back
+        to calling `h2x` once per element.
+        """
+        if self._delta_h is not None:
+            return np.fromiter(map(self.h2x, hs), dtype=float,
+                               count=len(hs))
+        if self._time_h:
+            return (_epoch_array(hs) - self.h1) * self.hx_factor + self.x1
+        return ((np.asarray(hs, dtype=float) - self.h1)
+                * self.hx_factor + self.x1)
+
+    def v2y_array(self, vs):
+        """ Vectorised `v2y`: A sequence of `v` --> `float` array of `y`.
+
+        cf. `h2x_array`
+        """
+        if self._delta_v is not None:
+            return np.fromiter(map(self.v2y, vs), dtype=float,
+                               count=len(vs))
+        sc = self.vy_factor * self._flipfactor_y
+        if self._time_v:
+            return (_epoch_array(vs) - self.v1) * sc + self.y1
+        return (np.asarray(vs, dtype=float) - self.v1) * sc + self.y1
+
+    def matrix(self, inner=None):
+        """ The trafo as SVG transform matrix `(a, b, c, d, e, f)`.
+
+        `inner` (optional): A `WorldDocTrafo` (or matrix) from
+            some other coordinate system into the world coords of
+            this trafo. Both are composed into a single matrix.
+
+        Not available with custom `delta_h` or `delta_v`.
+        """
+        if self._delta_h is not None or self._delta_v is not None:
+            raise ValueError("No transform matrix for custom delta functions.")
+        sy = self.vy_factor * self._flipfactor_y
+        m = (self.hx_factor, 0., 0., sy,
+             self.x1 - self.h1 * self.hx_factor, self.y1 - self.v1 * sy)
+        if inner is None:
+            return m
+        if isinstance(inner, WorldDocTrafo):
+            inner = inner.matrix()
+        a, b, c, d, e, f = inner
+        return (m[0]*a + m[2]*b, m[1]*a + m[3]*b,
+                m[0]*c + m[2]*d, m[1]*c + m[3]*d,
+                m[0]*e + m[2]*f + m[4], m[1]*e + m[3]*f + m[5])
+
+    def x2h_array(self, xs):
+        """ Inverse of `h2x_array`: document x --> world coords `h`.
+
+        Time axes give seconds since 1970-01-01. Not available
+        with a custom `delta_h`.
+        """
+        if self._delta_h is not None:
+            raise ValueError("No inverse for custom delta functions.")
+        return (np.asarray(xs, dtype=float) - self.x1) / self.hx_factor + self.h1
+
+    def y2v_array(self, ys):
+        """ Inverse of `v2y_array`, cf. `x2h_array`."""
+        if self._delta_v is not None:
+            raise ValueError("No inverse for custom delta functions.")
+        sc = self.vy_factor * self._flipfactor_y
+        return (np.asarray(ys, dtype=float) - self.y1) / sc + self.v1
+
+    def inverse_points(self, pts):
+        """ Document points --> (N,2) array of world coords.
+
+        `pts`: Array point data, cf. `transform_points`.
+        """
+        xs, ys = _columns(pts)
+        return np.column_stack((self.x2h_array(xs), self.y2v_array(ys)))
+
+    def transform_points(self, pts):
+        """ Transform world points into an (N,2) array of doc coords.
+
+        `pts`: An (N,2) array, a pair of 1-D arrays `(hs, vs)`
+            or a sequence of points [(h1,v1), (h2,v2), ...].
+        """
+        if _is_array_pts(pts):
+            hs, vs = _columns(pts)
+        else:
+            pts = list(pts)
+            hs = [h for h, v in pts]
+            vs = [v for h, v in pts]
+        return np.column_stack((self.h2x_array(hs),
+                                self.v2y_array(vs)))
+
 
 class InjectPoint:
     """Inject content into an _target_ element."""
 
-    def __init__(self, target_element):
+    def __init__(self, target_element, doc=None, fmt=DEFAULT_FMT):
         """ `target_element`: An SVG element defining
-            the point where new conted will get injected."""
+            the point where new conted will get injected.
+
+            `doc` (optional): The `SVGDocInj` containing the target.
+            If given, its id index is kept up to date
+            while injecting, and point edits are collected
+            in the document's point buffers until it is saved.
+
+            `fmt` (optional): The `svgpipe.fmt.CoordFormatter`
+            for point coordinates.
+
+            The XML backend is the one of `doc`, or the default
+            backend (cf. `svgpipe.backend`)."""
+        if doc is not None:
+            target_element = doc.own(target_element)
         self.target = target_element
+        self.doc = doc
+        self.fmt = fmt
+        self.backend = (svgpipe.backend.get() if doc is None
+                        else doc.backend)
+        self._points = None
+        ### `(x, y)` subtracted from (transformed) point data before
+        ### it is written, cf. `MatrixInjectPoint`
+        self.offset = None
+
+    def _append(self, el):
+        self._extend([el])
+
+    def _extend(self, els):
+        self.target.extend(els)
+        if self.doc is not None:
+            for el in els:
+                self.doc.register_subtree(el, self.target)
+            self.doc._touch(self.target)
 
     def inject(self, content):
-        """Inject SVG content provided as `str` or `ET.Element`."""
-        if isinstance(content, ET.Element):
-            self.target.append(inj)
+        """Inject SVG content provided as `str` or element."""
+        if self.backend.iselement(content):
+            self._append(content)
         else:
+            self._append(self._parse(content))
+
+    def _parse(self, content):
+        try:
+            return svgpipe.fragments.CACHE.fromstring(self.backend, content)
+        except self.backend.errors as e:
+            raise svgpipe.ParseError("Invalid type or syntax for content %s" % content)
+
+    def inject_many(self, fragments):
+        """ Inject several fragments (`str` or elements) at once.
+
+        All strings are parsed together, in a single run of the
+        parser. The fragments are injected in the given order.
+        """
+        fragments = list(fragments)
+        parsed = iter(self._parse_many([f for f in fragments
+                                        if not self.backend.iselement(f)]))
+        els = [f if self.backend.iselement(f) else next(parsed)
+               for f in fragments]
+        self._extend(els)
+
+    def _parse_many(self, texts):
+        """ Parse fragments wrapped into a single document."""
+        if not texts:
+            return []
+        if all(isinstance(t, str) and not t.lstrip().startswith("<?")
+               for t in texts):
             try:
-                self.target.append(ET.fromstring(content))
-            except (ET.ParseError, TypeError) as e:
-                raise ParseError("Invalid type or syntax for content %s" % content)
-
-    def _fmtpts(pts):
-        ### FIXME: A non-float argument should fail!
-        ### Should be ok
-        # fmtpts = " ".join(["{:f},{:f}".format(x,y)
-        #                    for x,y in pts])
-        #
-        # but format weirdly accepts datetime for {:g}
-        #
-        # >>> import datetime as DT
-        # >>> DT.datetime(2017,4,6)
-        # datetime.datetime(2017, 4, 6, 0, 0)
-        # >>> "{:.9g}".format(DT.datetime(2017,4,6))
-        # '.9g'
-        #
-        # Workaround 1:
-        #
-        # for x,y, in pts:
-        #     if type(x) is not in  [int, float]:
-        #         raise TypeError("There should not be %s in %s"
-        #                         % (DT.datetime, pts))
-        #     if type(x) is not in  [int, float]:
-        #         raise TypeError("There should not be %s in %s"
-        #                         % (DT.datetime, pts))
-
-        # Workaround 2, use old-fashioned formatting:
-        return " ".join([('%f' % x).rstrip('0').rstrip('.')
-                         + "," +
-                         ('%f' % y).rstrip('0').rstrip('.')
-                         for x,y in pts])
-
-    def inject_points(self, pts, pos=INJ_POS_AFTER, trafo=None):
+                wrapper = self.backend.fromstring("<w>%s</w>"
+                                                  % "".join(texts))
+            except self.backend.errors:
+                wrapper = None
+            if (wrapper is not None and len(wrapper) == len(texts)
+                    and not (wrapper.text or "").strip()
+                    and not any((el.tail or "").strip() for el in wrapper)):
+                els = list(wrapper)
+                for el in els:
+                    el.tail = None
+                return els
+        ### not one element per fragment; parse one by one to
+        ### report the culprit
+        return [self._parse(t) for t in texts]
+
+    def inject_symbol(self, fragment, pts, trafo=None):
+        """ Inject `fragment` at several positions, as `use` elements.
+
+        The fragment (`str` or element) is stored once, as a
+        `symbol` in the `defs` of the document (cf.
+        `SVGDocInj.symbol_id`); each position gets a `use`
+        element referring to it. Requires the `doc` of the
+        injectpoint.
+
+        `pts`: Positions, cf. `inject_points`.
+
+        `trafo` (optional): cf. `inject_points`.
+
+        Returns the id of the symbol.
+        """
+        if self.doc is None:
+            raise ValueError("inject_symbol requires the document"
+                             " of the injectpoint.")
+        id = self.doc.symbol_id(fragment)
+        pts = self._shift(InjectPoint._trafo_pts(pts, trafo))
+        if _is_array_pts(pts):
+            pts = zip(*(c.tolist() for c in _columns(pts)))
+        tag = "{%s}use" % svgpipe.SVGDoc._NS['svg']
+        href = "{%s}href" % svgpipe.SVGDoc._NS['xlink']
+        num = self.fmt.format_number
+        els = [self.backend.Element(tag, {href: "#" + id,
+                                          'x': num(x), 'y': num(y)})
+               for x, y in pts]
+        self._extend(els)
+        return id
+
+    def _trafo_pts(pts, trafo):
+        """ Apply `trafo` (if any) to iterable or array point data.
+
+        Iterables are transformed lazily, point by point.
+        """
+        if trafo is None:
+            return pts
+        if _is_array_pts(pts):
+            return trafo.transform_points(pts)
+        return ((trafo.h2x(h),trafo.v2y(v))
+                for (h,v) in pts)
+
+    def _shift(self, pts):
+        """ Subtract `offset` (if any) from iterable or array point data."""
+        if self.offset is None:
+            return pts
+        x0, y0 = self.offset
+        if _is_array_pts(pts):
+            xs, ys = _columns(pts)
+            return np.column_stack((np.asarray(xs, dtype=float) - x0,
+                                    np.asarray(ys, dtype=float) - y0))
+        return ((x - x0, y - y0) for (x, y) in pts)
+
+    def _point(self, p, trafo):
+        """ A single point, transformed by `trafo` and shifted."""
+        x, y = p
+        if trafo is not None:
+            x, y = trafo.h2x(x), trafo.v2y(y)
+        if self.offset is not None:
+            x, y = x - self.offset[0], y - self.offset[1]
+        return x, y
+
+    def point_buffer(self):
+        """ The `PointBuffer` of the (polygon/polyline) target.
+
+        Without a `doc`, the point methods write the `points`
+        attribute after each edit, cf. `flush`.
+        """
+        if self._points is None:
+            if self.doc is not None:
+                self._points = self.doc.point_buffer(self.target)
+            else:
+                self._points = PointBuffer.from_text(
+                                    self.target.get('points', ''),
+                                    self.fmt)
+        return self._points
+
+    def _edited(self):
+        if self.doc is None:
+            self.flush()
+        else:
+            self.doc._touch(self.target)
+
+    def flush(self):
+        """ Write edited point data into the `points` attribute."""
+        if self._points is not None and self._points.dirty:
+            self._points.write(self.target)
+
+    def inject_points(self, pts, pos=INJ_POS_AFTER, trafo=None,
+                      decimate=None, clip=None):
         """ Inject points into an existing polygon or polyline.
 
-        `pts`: a list of points [(x1,y1), (x2,y2), ...]
+        `pts`: a list of points [(x1,y1), (x2,y2), ...],
+            an (N,2) `numpy` array or a pair of 1-D arrays `(xs, ys)`.
+            Array data is transformed and formatted as a whole.
+            Any other iterable of points (e.g. a generator reading
+            a large file) is consumed in chunks, without keeping
+            the points as tuples or strings.
 
         `pos` (optional): Where to insert the new points?
             `INJ_POS_BEFORE`: before or ...
@@ -261,34 +783,38 @@ class InjectPoint:
 
         `trafo` (optional): Transform point coordinates according
             to a given `WorldDocTrafo`.
+
+        `decimate` (optional): A `svgpipe.decimate.Decimation`,
+            applied to the transformed points.
+
+        `clip` (optional): Drop points outside the view, cf.
+            `svgpipe.clip`. `True` clips to the view rectangle of
+            `trafo`, an `(x, y, width, height)` tuple to a given
+            rectangle in document coordinates. The first and the
+            last new point are kept, as they join existing points.
         """
-        if trafo is not None:
-            pts = [(trafo.h2x(h),trafo.v2y(v))
-                   for (h,v) in pts]
-        if 'points' in self.target.attrib:
-            if pos == INJ_POS_BEFORE:
-                self.target.attrib['points'] = (
-                        InjectPoint._fmtpts(pts) + " "
-                        + self.target.attrib['points'])
-            elif pos == INJ_POS_AFTER:
-                self.target.attrib['points'] += (
-                        " " + InjectPoint._fmtpts(pts))
-            else:
-                raise NotImplementedError("inject_points does not handle this position: %s" % pos)
+        pts = InjectPoint._trafo_pts(pts, trafo)
+        if clip is not None:
+            pts = self._clip(pts, clip, trafo, keep_ends=True)
+        if decimate is not None:
+            pts = decimate(pts)
+        pts = self._shift(pts)
+        if pos == INJ_POS_BEFORE:
+            self.point_buffer().insert(0, pts)
+        elif pos == INJ_POS_AFTER:
+            self.point_buffer().extend(pts)
         else:
-            self.target.attrib['points'] = InjectPoint._fmtpts(pts)
+            raise NotImplementedError("inject_points does not handle this position: %s" % pos)
+        self._edited()
 
     def inject_points_at(self, pts, index=-1, trafo=None):
-        """ Less efficient than `inject_points`, more flexible positioning.
+        """ Inject points at an arbitrary position.
 
         `idx`: Insert position, cf. `index` in pythons `list.insert`.
         """
-        if trafo is not None:
-            pts = [(trafo.h2x(h),trafo.v2y(v))
-                   for (h,v) in pts]
-        existpts = self.target.attrib['points'].split()
-        existpts.insert(index, InjectPoint._fmtpts(pts))
-        self.target.attrib['points'] = " ".join(existpts)
+        pts = self._shift(InjectPoint._trafo_pts(pts, trafo))
+        self.point_buffer().insert(index, pts)
+        self._edited()
 
     def replace_point_at(self, p, index=-1, trafo=None):
         """ Replace an existing point by a given point `p`.
@@ -296,25 +822,100 @@ class InjectPoint:
         `idx`: Position of the point being replaced
             (cf. `index` in pythons `list.insert`).
         """
-        if trafo is not None:
-            h, v = p
-            p = trafo.h2x(h), trafo.v2y(v)
-        existpts = self.target.attrib['points'].split()
-        existpts[index] = InjectPoint._fmtpts([p])
-        self.target.attrib['points'] = " ".join(existpts)
+        self.point_buffer()[index] = self._point(p, trafo)
+        self._edited()
 
-    def replace_all_points(self, pts, trafo=None):
+    def delete_points(self, start, stop=None):
+        """ Delete the point at `start` or the points `start:stop`."""
+        if stop is None:
+            del self.point_buffer()[start]
+        else:
+            del self.point_buffer()[start:stop]
+        self._edited()
+
+    def replace_all_points(self, pts, trafo=None, decimate=None,
+                           clip=None):
         """ Replace all points of an existing polygon or polyline.
 
         `pts`: list of new points [(x1,y1), (x2,y2), ...]
+            or array point data, cf. `inject_points`.
 
         `trafo` (optional): Transform point coordinates according
             to a given `WorldDocTrafo`.
+
+        `decimate`, `clip` (optional): cf. `inject_points`.
+            Polygons are clipped as closed shapes.
         """
-        if trafo is not None:
-            pts = [(trafo.h2x(h),trafo.v2y(v))
-                   for (h,v) in pts]
-        self.target.attrib['points'] = InjectPoint._fmtpts(pts)
+        pts = InjectPoint._trafo_pts(pts, trafo)
+        if clip is not None:
+            closed = self.target.tag.rpartition('}')[2] == 'polygon'
+            pts = self._clip(pts, clip, trafo, closed=closed)
+        if decimate is not None:
+            pts = decimate(pts)
+        self.point_buffer()[:] = self._shift(pts)
+        self._edited()
+
+    def _clip(self, pts, clip, trafo, closed=False, keep_ends=False):
+        if clip is True:
+            if trafo is None:
+                raise ValueError("clip=True requires a trafo.")
+            clip = trafo.viewbox
+        get_parent = self.doc.get_parent if self.doc is not None else None
+        width = svgpipe.clip.stroke_width(self.target, get_parent)
+        return svgpipe.clip.clip(pts, clip, closed, keep_ends,
+                                 stroke_width=width)
+
+class PathInjectPoint(InjectPoint):
+    """ Inject point data into the `d` attribute of a `path`.
+
+    Points are written as relative path data, which is
+    considerably shorter than absolute `points` (cf.
+    `svgpipe.fmt.CoordFormatter.format_path`).
+    """
+
+    def __init__(self, target_element, doc=None, fmt=DEFAULT_FMT):
+        InjectPoint.__init__(self, target_element, doc, fmt)
+        ### `d` as last written, and its (rounded) end point
+        self._d = None
+        self._end = None
+
+    def inject_path(self, pts, trafo=None):
+        """ Append point data to the path.
+
+        `pts`: Point data, cf. `inject_points`. A point `None`
+            or with a `NaN` coordinate marks a gap: the data
+            continues with a new subpath.
+
+        `trafo` (optional): cf. `inject_points`.
+
+        Data appended to a path written by this injectpoint
+        continues its last subpath (unless the data starts with
+        a gap); otherwise, it starts with an absolute moveto.
+        """
+        d = self.target.get('d') or ""
+        start = self._end if d and d == self._d else None
+        self._write(d, self._path_data(pts, trafo, start))
+
+    def replace_path(self, pts, trafo=None):
+        """ Replace the path data, cf. `inject_path`."""
+        self._write("", self._path_data(pts, trafo, None))
+
+    def _path_data(self, pts, trafo, start):
+        if _is_array_pts(pts):
+            pts = self._shift(InjectPoint._trafo_pts(pts, trafo))
+        elif trafo is not None or self.offset is not None:
+            pts = [None if p is None else self._point(p, trafo)
+                   for p in pts]
+        return self.fmt._path_data(pts, start)
+
+    def _write(self, d, data):
+        text, end = data
+        if text or not d:
+            self._d = d + text
+            self._end = end
+            self.target.set('d', self._d)
+            if self.doc is not None:
+                self.doc._touch(self.target)
 
 class ScaledInjectPoint(InjectPoint, WorldDocTrafo):
     """ Scale and inject SVG content into a target area/element.
@@ -327,7 +928,115 @@ class ScaledInjectPoint(InjectPoint, WorldDocTrafo):
         """
 
     def __init__(self, target_element, viewBox, hrange, vrange,
-                 **delta_hv):
+                 doc=None, fmt=DEFAULT_FMT, **delta_hv):
         """ Initialises both superclasses."""
-        InjectPoint.__init__(self, target_element)
+        InjectPoint.__init__(self, target_element, doc, fmt)
         WorldDocTrafo.__init__(self, viewBox, hrange, vrange, **delta_hv)
+
+    def matrix_injectpoint(self, inner=None, attribs=None, fmt=None):
+        """ A `MatrixInjectPoint` for content in world coordinates.
+
+        A new group, transformed by this trafo, is appended to
+        the target.
+
+        `inner` (optional): cf. `WorldDocTrafo.matrix`.
+
+        `attribs` (optional): Further attributes of the group.
+
+        `fmt` (optional): Formatter for world coordinates,
+            default: the one of this injectpoint.
+        """
+        g = self.backend.Element("{%s}g" % svgpipe.SVGDoc._NS['svg'],
+                                 dict(attribs or {}))
+        self._append(g)
+        return MatrixInjectPoint(g, self, inner, doc=self.doc,
+                                 fmt=self.fmt if fmt is None else fmt)
+
+### elements whose strokes must not be scaled by a `MatrixInjectPoint`
+_SHAPES = frozenset(['path', 'polyline', 'polygon', 'line',
+                     'rect', 'circle', 'ellipse'])
+
+class MatrixInjectPoint(InjectPoint):
+    """ Inject content in world coordinates into a transformed group.
+
+    Instead of transforming each point in Python, the group
+    carries the `WorldDocTrafo` as its `transform` attribute.
+    Changing the view (`set_view`) rewrites this one attribute.
+
+    Injected shapes get `vector-effect="non-scaling-stroke"`,
+    which keeps their stroke widths despite the (in general
+    non-uniform) scaling. Other sizes, such as radii or font
+    sizes, are scaled.
+
+    Coordinates are written in world units relative to `offset`,
+    the world coordinates of the view origin `(h1, v1)` when the
+    injectpoint is created; `transform` adds it back. This keeps
+    large coordinates (e.g. seconds since 1970) precise in
+    renderers working with single precision. Point data (of
+    `poly_injectpoint` and `inject_symbol`) is shifted by
+    `offset`, coordinates in injected content must be relative
+    to it. `fmt` should keep enough digits for them.
+    """
+
+    def __init__(self, target_element, trafo, inner=None,
+                 doc=None, fmt=DEFAULT_FMT):
+        """ `trafo`: The `WorldDocTrafo` of the group.
+
+            `inner` (optional): cf. `WorldDocTrafo.matrix`."""
+        super().__init__(target_element, doc, fmt)
+        self.trafo = trafo
+        self.inner = inner
+        ### `(h1, v1)` in the coordinates of `inner`
+        h, v = trafo.h1, trafo.v1
+        if inner is not None:
+            if isinstance(inner, WorldDocTrafo):
+                inner = inner.matrix()
+            a, b, c, d, e, f = inner
+            det = a*d - b*c
+            h, v = (d*(h - e) - c*(v - f)) / det, (a*(v - f) - b*(h - e)) / det
+        self.offset = h, v
+        self._write_transform()
+
+    def _write_transform(self):
+        a, b, c, d, e, f = self.trafo.matrix(self.inner)
+        h, v = self.offset
+        m = a, b, c, d, a*h + c*v + e, b*h + d*v + f
+        self.target.set('transform', "matrix(%s)" % " ".join(
+                        "%.12g" % c for c in m))
+        if self.doc is not None:
+            self.doc._touch(self.target)
+
+    def set_view(self, hrange, vrange):
+        """ Show another range of the world coordinates.
+
+        Not available with custom `delta_h` or `delta_v`.
+        """
+        t = self.trafo
+        if t._delta_h is not None or t._delta_v is not None:
+            raise ValueError("No transform matrix for custom delta functions.")
+        self.trafo = WorldDocTrafo(t.viewbox, hrange, vrange,
+                                   flip_y=t._flipfactor_y < 0)
+        self._write_transform()
+
+    def _extend(self, els):
+        for el in els:
+            for e in el.iter():
+                if (isinstance(e.tag, str)
+                        and e.tag.rpartition('}')[2] in _SHAPES
+                        and e.get('vector-effect') is None):
+                    e.set('vector-effect', "non-scaling-stroke")
+        super()._extend(els)
+
+    def poly_injectpoint(self, tag='polyline', attribs=None):
+        """ Inject a new polyline, polygon or path.
+
+        Returns an `InjectPoint` (`PathInjectPoint` for a `path`)
+        for adding world coordinates to it.
+        """
+        el = self.backend.Element("{%s}%s" % (svgpipe.SVGDoc._NS['svg'], tag),
+                                  dict(attribs or {}))
+        self._append(el)
+        cls = PathInjectPoint if tag == 'path' else InjectPoint
+        injp = cls(el, doc=self.doc, fmt=self.fmt)
+        injp.offset = self.offset
+        return injp
@@ -0,0 +1,220 @@
+""" Load only selected parts of an SVG document.
+
+For a partial document, only the elements with given ids (and
+their subtrees) are parsed into `ET.Element`s, together with their
+ancestors (attributes only). Everything else stays in the source
+file: it is represented by `RAW` placeholder elements referring to
+byte spans of the source, which are copied unchanged on saving.
+
+The source is scanned once with `xml.parsers.expat` (the parser
+beneath `ET.iterparse`), which in addition to the events reports
+byte offsets.
+"""
+
+import codecs
+import contextlib
+import io
+import mmap
+import os
+import re
+import xml.etree.ElementTree as ET
+import xml.parsers.expat as expat
+
+import svgpipe
+
+def RAW(start, stop):
+    """ Tag of placeholder elements for unparsed source spans.
+
+    The byte span is stored in the `start` and `stop`
+    attributes (as `int`) of the placeholder.
+    """
+    return ET.Element(RAW, {'start': start, 'stop': stop})
+
+_STARTTAG = re.compile(rb"""<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*(/?)>""")
+_ENCODING = re.compile(rb"""^<\?xml[^>]*encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+
+class RawSource(object):
+    """ Access to the bytes of the source of a partial document.
+
+    Sources given by file name are re-read on demand; the file
+    must not change until the document is saved. Other sources
+    (file objects) are kept in memory.
+    """
+
+    def __init__(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.fspath(source)
+            self.data = None
+            st = os.stat(self.path)
+            self._stat = st.st_size, st.st_mtime_ns
+            self.size = st.st_size
+        else:
+            self.path = None
+            data = source.read()
+            if isinstance(data, str):
+                match = _ENCODING.match(data[:200].encode('ascii', 'replace'))
+                data = data.encode(match.group(1).decode() if match
+                                   else 'utf-8')
+            self.data = data
+            self.size = len(data)
+        with self.open() as f:
+            match = _ENCODING.match(f.read(200))
+        self.encoding = match.group(1).decode() if match else 'utf-8'
+
+    def open(self):
+        """ A binary file object for the whole source."""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        st = os.stat(self.path)
+        if (st.st_size, st.st_mtime_ns) != self._stat:
+            raise svgpipe.ParseError("Source of partial document changed: %s"
+                                     % self.path)
+        return open(self.path, 'rb')
+
+    @contextlib.contextmanager
+    def buffer(self):
+        """ The whole source as `bytes` or memory-mapped file."""
+        if self.data is not None:
+            yield self.data
+        else:
+            with self.open() as f, mmap.mmap(f.fileno(), 0,
+                                             access=mmap.ACCESS_READ) as m:
+                yield m
+
+    def iter_text(self, start, stop, chunksize):
+        """ Decoded text of the span `start:stop` in pieces."""
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        with self.open() as f:
+            f.seek(start)
+            while start < stop:
+                data = f.read(min(chunksize, stop - start))
+                if not data:
+                    break
+                start += len(data)
+                yield decoder.decode(data, start >= stop)
+
+    def samefile(self, path):
+        return (self.path is not None and os.path.exists(path)
+                and os.path.samefile(self.path, path))
+
+def _qualify(name):
+    """ expat's `uri}local` --> ET's `{uri}local`."""
+    return "{" + name if "}" in name else name
+
+class _Open(object):
+    """ An element being scanned."""
+    __slots__ = ('start', 'name', 'attrs', 'decls', 'kept', 'children')
+
+def parse_partial(source, ids):
+    """ Scan `source` and materialise only the elements with `ids`.
+
+    Returns `(root, raw, nsdecls, prolog, epilog)`:
+    the root element, the `RawSource`, a dict of the namespace
+    declarations (`{uri: prefix}`) of the materialised ancestors,
+    and the byte spans before and after the root element.
+    """
+    raw = RawSource(source)
+    with raw.buffer() as buf:
+        return _scan(buf, raw, set(ids))
+
+def _scan(buf, raw, ids):
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.ordered_attributes = True
+    stack = []
+    scope = [{}]     # in-scope namespace declarations, {prefix: uri}
+    pending = {}
+    nsdecls = {}
+    result = {}
+    inside_kept = [0]  # depth inside a kept subtree
+
+    def on_ns(prefix, uri):
+        pending[prefix or ''] = uri
+
+    def on_start(name, attrs):
+        if pending:
+            scope.append(dict(scope[-1], **pending))
+            decls = dict(pending)
+            pending.clear()
+        else:
+            scope.append(scope[-1])
+            decls = None
+        if inside_kept[0]:
+            inside_kept[0] += 1
+            return
+        ### as little as possible here, most elements stay unparsed
+        el = _Open()
+        el.start = parser.CurrentByteIndex
+        el.name = name
+        el.attrs = attrs
+        el.decls = decls
+        el.kept = False
+        if stack and 'id' in attrs:
+            names = attrs[0::2]
+            if 'id' in names:
+                el.kept = attrs[2*names.index('id') + 1] in ids
+        el.children = None
+        if el.kept:
+            inside_kept[0] = 1
+        stack.append(el)
+
+    def on_end(name):
+        nsscope = scope.pop()
+        if inside_kept[0] > 1:
+            inside_kept[0] -= 1
+            return
+        inside_kept[0] = 0
+        el = stack.pop()
+        if not (el.kept or el.children is not None or not stack):
+            return
+        match = _STARTTAG.match(buf, el.start)
+        if match.group(1):
+            stop = content_end = content = match.end()
+        else:
+            content = match.end()
+            content_end = parser.CurrentByteIndex
+            stop = buf.find(b">", content_end) + 1
+        if el.kept:
+            node = _parse_span(buf, raw.encoding, el.start, stop, nsscope)
+        else:
+            attrs = el.attrs
+            node = ET.Element(_qualify(el.name),
+                              {_qualify(attrs[i]): attrs[i+1]
+                               for i in range(0, len(attrs), 2)})
+            pos = content
+            for cstart, cstop, child in el.children or ():
+                if cstart > pos:
+                    node.append(RAW(pos, cstart))
+                node.append(child)
+                pos = cstop
+            if content_end > pos:
+                node.append(RAW(pos, content_end))
+            nsdecls[node] = {uri: prefix
+                             for prefix, uri in (el.decls or {}).items()}
+        if stack:
+            parent = stack[-1]
+            if parent.children is None:
+                parent.children = []
+            parent.children.append((el.start, stop, node))
+        else:
+            result['root'] = node, el.start, stop
+
+    parser.StartNamespaceDeclHandler = on_ns
+    parser.StartElementHandler = on_start
+    parser.EndElementHandler = on_end
+    try:
+        for i in range(0, len(buf), 1 << 20):
+            parser.Parse(buf[i:i + (1 << 20)], False)
+        parser.Parse(b"", True)
+    except expat.ExpatError as e:
+        raise svgpipe.ParseError("Invalid SVG/XML: %s" % e)
+    root, start, stop = result['root']
+    return root, raw, nsdecls, (0, start), (stop, raw.size)
+
+def _parse_span(buf, encoding, start, stop, scope):
+    """ Parse a source span, using the namespaces in `scope`."""
+    decls = " ".join('xmlns%s="%s"' % (prefix and ":" + prefix, uri)
+                     for prefix, uri in scope.items())
+    wrapped = (('<?xml version="1.0" encoding="%s"?><w %s>'
+                % (encoding, decls)).encode(encoding)
+               + buf[start:stop] + "</w>".encode(encoding))
+    return ET.fromstring(wrapped)[0]
@@ -0,0 +1,263 @@
+""" Editable point data of polygon and polyline elements.
+
+A `PointBuffer` holds the coordinates of a `points` attribute
+as a flat `array.array` of floats `[x1, y1, x2, y2, ...]`.
+The attribute text is parsed once; edits work on the array and
+the text is only written back by `PointBuffer.write`. Unedited
+points keep their original text, only new or changed points are
+formatted.
+
+Point data can be given as a sequence, a generator or any other
+iterable of `(x,y)` tuples, or as `numpy` arrays (cf. `svgpipe.fmt`).
+Iterables are consumed in chunks of `CHUNKSIZE` points.
+"""
+
+from array import array
+from itertools import islice
+
+import svgpipe
+from svgpipe.fmt import DEFAULT as DEFAULT_FMT
+from svgpipe.fmt import _is_array_pts, _columns, np, _NUMBER
+
+### points per chunk when consuming iterators
+CHUNKSIZE = 65536
+
+def _flat_chunks(pts, chunksize=None):
+    """ Point data --> flat `array('d')` chunks of alternating x and y.
+
+    Sequences and iterators are consumed `chunksize` points at
+    a time, arrays are converted as a whole.
+    """
+    if _is_array_pts(pts):
+        xs, ys = _columns(pts)
+        flat = np.empty(2*len(xs), dtype=float)
+        flat[0::2] = xs
+        flat[1::2] = ys
+        yield array('d', flat.tobytes())
+        return
+    if chunksize is None:
+        chunksize = CHUNKSIZE
+    it = iter(pts)
+    while True:
+        chunk = array('d', [c for x, y in islice(it, chunksize)
+                              for c in (x, y)])
+        if not chunk:
+            return
+        yield chunk
+
+def _flat(pts):
+    """ Point data --> flat `array('d')` of alternating x and y."""
+    flat = array('d')
+    for chunk in _flat_chunks(pts):
+        flat.extend(chunk)
+    return flat
+
+class PointBuffer(object):
+    """ Array-backed point data of a single element.
+
+    Indices count points, not coordinates. Indexing, slicing,
+    `insert`, `extend`, assignment and `del` work like on
+    a python `list` of `(x,y)` tuples. Slices must be
+    contiguous (step 1).
+    """
+
+    def __init__(self, coords=None, fmt=DEFAULT_FMT):
+        """ `coords` (optional): Flat coordinates `[x1, y1, x2, ...]`.
+
+        `fmt`: The `CoordFormatter` used by `to_text`.
+        """
+        self.coords = array('d') if coords is None else array('d', coords)
+        self.fmt = fmt
+        self.dirty = False
+        ### called after each edit, cf. `SVGDocInj.point_buffer`
+        self.on_edit = None
+        self._set_text("", 0)
+
+    def _set_text(self, text, n):
+        """ `text` of `n` points, which is kept for unedited points."""
+        self._text = text
+        self._orig = n
+        ### unedited points: (index, index in `_text`, count)
+        self._runs = [(0, 0, n)] if n else []
+        ### offsets of the points in `_text`, cf. `_offset`
+        self._starts = None
+
+    def _edited(self, start, stop, n=0):
+        """ Points `start` up to `stop` are replaced by `n` points."""
+        runs = []
+        shift = n - (stop - start)
+        for i, o, k in self._runs:
+            if i < start:
+                runs.append((i, o, min(k, start - i)))
+            if i + k > stop:
+                skip = max(stop - i, 0)
+                runs.append((i + skip + shift, o + skip, k - skip))
+        self._runs = runs
+        self._changed()
+
+    def _changed(self):
+        self.dirty = True
+        if self.on_edit is not None:
+            self.on_edit()
+
+    @classmethod
+    def from_text(cls, text, fmt=DEFAULT_FMT):
+        """ Parse the text of a `points` attribute."""
+        try:
+            coords = array('d', map(float, text.replace(',', ' ').split()))
+        except ValueError:
+            ### compact data of minifiers, e.g. `10-5 .5.5`
+            if _NUMBER.sub(" ", text.replace(',', ' ')).strip():
+                raise svgpipe.ParseError("Invalid point data: %.60s" % text)
+            coords = array('d', map(float, _NUMBER.findall(text)))
+        if len(coords) % 2:
+            raise svgpipe.ParseError("Odd number of coordinates: %.60s"
+                                     % text)
+        buf = cls(coords, fmt)
+        buf._set_text(text, len(buf))
+        return buf
+
+    def __len__(self):
+        return len(self.coords) // 2
+
+    def _index(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("point index out of range")
+        return index
+
+    def _slice(self, s):
+        start, stop, step = s.indices(len(self))
+        if step != 1:
+            raise ValueError("Only contiguous slices are supported.")
+        return slice(2*start, 2*max(start, stop))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointBuffer(self.coords[self._slice(index)], self.fmt)
+        i = 2 * self._index(index)
+        return self.coords[i], self.coords[i+1]
+
+    def __setitem__(self, index, pts):
+        if isinstance(index, slice):
+            s = self._slice(index)
+            flat = _flat(pts)
+            self._edited(s.start // 2, s.stop // 2, len(flat) // 2)
+            self.coords[s] = flat
+        else:
+            i = 2 * self._index(index)
+            flat = _flat([pts])
+            self._edited(i // 2, i // 2 + 1, 1)
+            self.coords[i:i+2] = flat
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            s = self._slice(index)
+            self._edited(s.start // 2, s.stop // 2)
+            del self.coords[s]
+        else:
+            i = 2 * self._index(index)
+            self._edited(i // 2, i // 2 + 1)
+            del self.coords[i:i+2]
+
+    def insert(self, index, pts):
+        """ Insert several points before `index` (cf. `list.insert`)."""
+        index = min(max(index + len(self) if index < 0 else index, 0),
+                    len(self))
+        flat = _flat(pts)
+        self._edited(index, index, len(flat) // 2)
+        self.coords[2*index:2*index] = flat
+
+    def extend(self, pts):
+        """ Append several points.
+
+        `pts` can be any iterable of points, e.g. a generator; it is
+        consumed in chunks. If it fails, nothing is appended.
+        """
+        n = len(self.coords)
+        try:
+            for chunk in _flat_chunks(pts):
+                self.coords.extend(chunk)
+        except:
+            del self.coords[n:]
+            raise
+        ### the runs are not affected
+        self._changed()
+
+    def clear(self):
+        self._edited(0, len(self))
+        del self.coords[:]
+
+    def as_array(self):
+        """ The points as an (N,2) `numpy` array (sharing memory)."""
+        return np.frombuffer(self.coords, dtype=float).reshape(-1, 2)
+
+    def _format(self):
+        """ Format all points with the buffer's formatter."""
+        if np is not None:
+            return self.fmt.format_points(self.as_array())
+        c = self.coords
+        return self.fmt.format_points(zip(c[0::2], c[1::2]))
+
+    def _offset(self, index):
+        """ Offset of point `index` in the original text."""
+        if index == self._orig:
+            return len(self._text)
+        if index == 0:
+            return len(self._text) - len(self._text.lstrip(" ,\t\r\n"))
+        if self._starts is None:
+            self._starts = array('l', [m.start() for m in
+                                      islice(_NUMBER.finditer(self._text),
+                                             0, None, 2)])
+            self._starts.append(len(self._text))
+        return self._starts[index]
+
+    def _unedited(self):
+        return self._runs == [(0, 0, len(self))] and len(self) == self._orig
+
+    def _pieces(self, chunksize):
+        """ The original text of unedited points, and chunks of
+        edited points to be formatted (as `PointBuffer`s)."""
+        pos = 0
+        for i, o, k in self._runs + [(len(self), None, 0)]:
+            for start in range(pos, i, chunksize):
+                yield self[start:min(start + chunksize, i)]
+            if k:
+                yield self._text[self._offset(o):
+                                 self._offset(o + k)].rstrip(" ,\t\r\n")
+            pos = i + k
+
+    def iter_text(self, chunksize=None):
+        """ The text of the points, chunk by chunk, cf. `to_text`."""
+        if chunksize is None:
+            chunksize = CHUNKSIZE
+        if self._unedited():
+            yield self._text
+            return
+        first = True
+        for piece in self._pieces(chunksize):
+            if not isinstance(piece, str):
+                piece = piece._format()
+            if not piece:
+                continue
+            yield piece if first else " " + piece
+            first = False
+
+    def to_text(self):
+        """ The text of the points.
+
+        Points added or changed since parsing are formatted with
+        the buffer's formatter, the others keep their text.
+        """
+        if self._unedited():
+            return self._text
+        return "".join(self.iter_text(max(len(self), 1)))
+
+    def write(self, element):
+        """ Write the points into the `points` attribute of `element`."""
+        text = self.to_text()
+        element.attrib['points'] = text
+        self._set_text(text, len(self))
+        self.dirty = False
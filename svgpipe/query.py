@@ -0,0 +1,144 @@
+""" Simple selectors for looking up elements.
+
+A selector is an optional tag name (`*` for any) followed by
+any number of `#id`, `.class`, `[name]` and `[name=value]`
+parts, e.g. `rect.bar[data-series="2"]` or `g#Layer_A`.
+Tag names refer to SVG elements; attribute names can use the
+prefixes of `SVGDoc._NS`, e.g. `[xlink:href]`.
+
+Selectors are compiled once (`compile_selector` caches them),
+and `SVGDoc.select` matches any number of them in a single walk
+of the tree.
+"""
+
+import functools
+import re
+
+import svgpipe
+
+_TAG = re.compile(r"\*|[A-Za-z_][\w-]*")
+_PART = re.compile(r"""\#(?P<id>[\w:-]+)
+                     | \.(?P<cls>[\w-]+)
+                     | \[\s*(?P<name>[\w.:-]+)\s*
+                         (?:=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'
+                                  |(?P<bare>[^\]\s]+))\s*)?\]""",
+                   re.VERBOSE)
+
+def _qname(name):
+    prefix, sep, local = name.rpartition(':')
+    if not sep or prefix not in svgpipe.SVGDoc._NS:
+        return name
+    return "{%s}%s" % (svgpipe.SVGDoc._NS[prefix], local)
+
+class Selector(object):
+    """ A compiled selector, cf. `compile_selector`.
+
+    `tag`: Qualified tag name or `None` for any element.
+    """
+
+    def __init__(self, text, tag, id, classes, attribs):
+        self.text = text
+        self.tag = tag
+        self.id = id
+        self.classes = classes
+        self.attribs = attribs
+
+    def match(self, el):
+        """ Does the element `el` match (ignoring its tag)?"""
+        if self.id is not None and el.get('id') != self.id:
+            return False
+        if self.classes:
+            cls = el.get('class')
+            if cls is None or not self.classes.issubset(cls.split()):
+                return False
+        for name, value in self.attribs:
+            v = el.get(name)
+            if v is None or (value is not None and v != value):
+                return False
+        return True
+
+    def __repr__(self):
+        return "Selector(%r)" % self.text
+
+@functools.lru_cache(maxsize=1024)
+def compile_selector(text):
+    """ The `Selector` for the string `text`.
+
+    Raises a `ValueError` for invalid selectors.
+    """
+    m = _TAG.match(text)
+    tag = None
+    pos = 0
+    if m is not None:
+        pos = m.end()
+        if m.group() != '*':
+            tag = "{%s}%s" % (svgpipe.SVGDoc._NS['svg'], m.group())
+    id = None
+    classes = set()
+    attribs = []
+    while pos < len(text):
+        m = _PART.match(text, pos)
+        if m is None:
+            raise ValueError("Invalid selector: %s" % text)
+        pos = m.end()
+        if m.group('id') is not None:
+            if id is not None and id != m.group('id'):
+                raise ValueError("Invalid selector: %s" % text)
+            id = m.group('id')
+        elif m.group('cls') is not None:
+            classes.add(m.group('cls'))
+        else:
+            value = next((v for v in m.group('dq', 'sq', 'bare')
+                          if v is not None), None)
+            attribs.append((_qname(m.group('name')), value))
+    if pos == 0:
+        raise ValueError("Invalid selector: %s" % text)
+    return Selector(text, tag, id, frozenset(classes), tuple(attribs))
+
+def _candidates(bucket, el):
+    """ The selectors of `bucket` which could match `el`."""
+    ids, classes, rest = bucket
+    cands = list(rest)
+    if ids:
+        cands.extend(ids.get(el.get('id'), ()))
+    if classes:
+        cls = el.get('class')
+        if cls:
+            for c in set(cls.split()):
+                cands.extend(classes.get(c, ()))
+    return cands
+
+def select(root, selectors):
+    """ The descendants of `root` matching each of `selectors`.
+
+    Returns a dict mapping each selector (string) to the list
+    of its matches in document order.
+    """
+    result = {}
+    ### tag --> ({id: sels}, {class: sels}, other sels), so that
+    ### each element is only matched against likely selectors
+    buckets = {}
+    for text in selectors:
+        if text in result:
+            continue
+        sel = compile_selector(text)
+        result[text] = []
+        ids, classes, rest = buckets.setdefault(sel.tag, ({}, {}, []))
+        if sel.id is not None:
+            ids.setdefault(sel.id, []).append(sel)
+        elif sel.classes:
+            classes.setdefault(min(sel.classes), []).append(sel)
+        else:
+            rest.append(sel)
+    any_tag = buckets.pop(None, None)
+    for el in root.iter():
+        if el is root or not isinstance(el.tag, str):
+            continue
+        bucket = buckets.get(el.tag)
+        cands = [] if bucket is None else _candidates(bucket, el)
+        if any_tag is not None:
+            cands.extend(_candidates(any_tag, el))
+        for sel in cands:
+            if sel.match(el):
+                result[sel.text].append(el)
+    return result
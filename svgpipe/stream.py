@@ -0,0 +1,334 @@
+""" Write SVG documents incrementally with bounded memory.
+
+A `StreamWriter` serialises the tree of an `SVGDocInj` into a
+file (or socket) piece by piece, keeping at most `bufsize`
+characters in its buffer. Point buffers are formatted chunk
+by chunk directly into the output, rather than into one
+attribute string.
+
+With a `cache` (a dict), the output of elements down to
+`CACHE_DEPTH` is kept and reused by later writers for the
+elements not changed in between, cf. `SVGDocInj.save`.
+
+Content which is generated layer by layer can be written early:
+`flush_through(layer)` writes the document up to the end of
+`layer` and frees the subtree. The output corresponds to
+`SVGDocInj.save`, including the namespace prefixes registered
+via `svgpipe.register_namespace`. For partial documents
+(cf. `svgpipe.partial`), the unparsed spans, the prolog and the
+namespace declarations are copied from the source.
+
+One difference: lxml does not tell the position of the document
+type declaration among the comments and processing instructions
+before the root, so a `StreamWriter` writes it first, while `save`
+keeps the order of the source.
+"""
+
+import sys
+
+import svgpipe
+from svgpipe.partial import RAW
+
+### characters kept before writing to the file
+BUFSIZE = 1 << 16
+
+### elements down to this depth (1: children of the root) are
+### cached between saves, cf. `SVGDocInj.save`
+CACHE_DEPTH = 2
+
+### ET before python 3.8 writes the attributes sorted by name
+_SORTED_ATTRIBS = sys.version_info < (3, 8)
+
+def _escape_cdata(text):
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+def _escape_attrib(text):
+    text = _escape_cdata(text)
+    if "\"" in text:
+        text = text.replace("\"", "&quot;")
+    ### keep whitespace other than blanks, cf. XML spec, 3.3.3
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#09;")
+    return text
+
+class StreamWriter(object):
+    """ Serialise an `SVGDocInj` incrementally into `file`.
+
+    `file`: A file name or a binary file-like object, e.g. from
+        `socket.makefile('wb')`. A file opened by name is closed
+        by `close`.
+
+    `cache` (optional): Element --> output of earlier writers.
+        Entries must be removed when their elements change.
+
+    Use as a context manager or call `close` to write the
+    remainder of the document.
+    """
+
+    def __init__(self, doc, file, bufsize=BUFSIZE, encoding="utf8",
+                 cache=None):
+        self.doc = doc
+        self.bufsize = bufsize
+        self._cache = cache
+        ### lists collecting the output of elements to be cached
+        self._captures = []
+        raw = doc._raw
+        if raw is not None:
+            encoding = raw.encoding
+            if isinstance(file, str) and raw.samefile(file):
+                raise ValueError("A partial document cannot overwrite"
+                                 " its source: %s" % file)
+        self.encoding = encoding
+        if isinstance(file, str):
+            self.file = open(file, 'wb')
+            self._owns_file = True
+        else:
+            self.file = file
+            self._owns_file = False
+        self._pieces = []
+        self._size = 0
+        ### written elements whose parent is still open
+        self._written = set()
+        self._namespaces = {}
+        ### like `save`, partial documents are written unsorted
+        self._sort = (_SORTED_ATTRIBS and raw is None
+                      and doc.backend.name == 'etree')
+        if raw is None:
+            self._qnames, rootdecls = doc.backend.namespaces(doc.root)
+            doctype, before, self._after = doc.backend.toplevel(doc.tree)
+            self._write("<?xml version='1.0' encoding='%s'?>\n" % encoding)
+            if doctype:
+                ### first, cf. the module docstring
+                self._write(doctype + "\n")
+            for node in before:
+                for done in self._serialize_elem(node, None, 0):
+                    pass
+        else:
+            self._qnames = {None: None}
+            rootdecls = None
+            self._after = []
+            self._write_raw(*doc._prolog)
+        self._events = self._serialize(doc.root, rootdecls)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._owns_file:
+            self.file.close()
+
+    def _write(self, txt):
+        for capture in self._captures:
+            capture.append(txt)
+        self._pieces.append(txt)
+        self._size += len(txt)
+        if self._size >= self.bufsize:
+            self.flush()
+
+    def flush(self):
+        """ Pass the buffered text on to the file."""
+        if self._pieces:
+            self.file.write("".join(self._pieces).encode(self.encoding))
+            self._pieces = []
+            self._size = 0
+
+    def flush_through(self, element, free=True):
+        """ Write the document up to and including `element`.
+
+        `element` must be in the document and not yet be written.
+        Content added to it (or to elements before it) later
+        will not be part of the output.
+
+        `free` (optional): Release the children of `element` (and
+            its point buffers) after writing.
+        """
+        e = element
+        while e is not None:
+            if e in self._written:
+                raise ValueError("Element has already been written.")
+            if e is self.doc.root:
+                break
+            e = self.doc.get_parent(e)
+        else:
+            raise ValueError("Element is not part of the document.")
+        for done in self._events:
+            if done is element:
+                break
+        else:
+            raise ValueError("Element is not part of the document.")
+        if free:
+            self.doc._release(element)
+        self.flush()
+
+    def close(self):
+        """ Write the rest of the document and flush."""
+        for done in self._events:
+            pass
+        for node in self._after:
+            for done in self._serialize_elem(node, None, 0):
+                pass
+        self._after = []
+        if self.doc._raw is not None:
+            self._write_raw(*self.doc._epilog)
+        self.flush()
+        if self._owns_file:
+            self.file.close()
+
+    def _write_raw(self, start, stop):
+        for piece in self.doc._raw.iter_text(start, stop, self.bufsize):
+            self._write(piece)
+
+    def _declare(self, uri, prefix, newdecls, restore):
+        """ Declare `uri` for the subtree of the current element."""
+        if self._namespaces.get(uri) == prefix:
+            return
+        restore.setdefault(uri, self._namespaces.get(uri))
+        self._namespaces[uri] = prefix
+        newdecls[uri] = prefix
+        self._forget_qnames(uri)
+
+    def _forget_qnames(self, uri):
+        for qname in [q for q in self._qnames
+                      if q and q.startswith("{%s}" % uri)]:
+            del self._qnames[qname]
+
+    def _qname(self, qname, newdecls, restore):
+        try:
+            return self._qnames[qname]
+        except KeyError:
+            pass
+        if qname[:1] != "{":
+            self._qnames[qname] = qname
+            return qname
+        uri, local = qname[1:].rsplit("}", 1)
+        if uri not in self._namespaces:
+            ### a namespace which appeared after the writer was created,
+            ### declare it on the current element
+            used = set(self._namespaces.values())
+            prefix = svgpipe.NAMESPACES.get(uri)
+            n = len(self._namespaces)
+            while not prefix or prefix in used:
+                prefix = "ns%d" % n
+                n += 1
+            self._declare(uri, prefix, newdecls, restore)
+        prefix = self._namespaces[uri]
+        self._qnames[qname] = "%s:%s" % (prefix, local) if prefix else local
+        return self._qnames[qname]
+
+    def _undeclare(self, restore):
+        for uri, prefix in restore.items():
+            if prefix is None:
+                del self._namespaces[uri]
+            else:
+                self._namespaces[uri] = prefix
+            self._forget_qnames(uri)
+
+    def _pi_text(self, elem):
+        """ Target and data of a processing instruction."""
+        target = getattr(elem, 'target', None)
+        if target is None:
+            ### ET keeps both in `text`
+            return elem.text
+        return "%s %s" % (target, elem.text) if elem.text else target
+
+    def _attribs(self, elem):
+        """ Attribute items of `elem`, with point buffers unformatted."""
+        points = self.doc._point_buffers.get(elem)
+        for k, v in elem.items():
+            if k == 'points' and points is not None and points.dirty:
+                yield k, points
+            else:
+                yield k, v
+        if points is not None and points.dirty and 'points' not in elem.attrib:
+            yield 'points', points
+
+    def _serialize(self, elem, namespaces=None, depth=0):
+        """ Write `elem`; yields each element after its tail is written.
+
+        Cached output is used for unchanged elements, without
+        yielding their descendants.
+        """
+        cache = self._cache
+        if cache is None or not 0 < depth <= CACHE_DEPTH:
+            yield from self._serialize_elem(elem, namespaces, depth)
+            return
+        ### the output depends on the namespace prefixes in scope
+        scope = tuple(sorted(self._namespaces.items()))
+        hit = cache.get(elem)
+        if hit is not None and hit[0] == scope:
+            self._write(hit[1])
+            self._written.add(elem)
+            yield elem
+            return
+        capture = []
+        self._captures.append(capture)
+        try:
+            yield from self._serialize_elem(elem, namespaces, depth)
+        finally:
+            self._captures.remove(capture)
+        cache[elem] = scope, "".join(capture)
+
+    def _serialize_elem(self, elem, namespaces, depth):
+        write = self._write
+        backend = self.doc.backend
+        tag = elem.tag
+        text = elem.text
+        if tag is backend.Comment:
+            write("<!--%s-->" % text)
+        elif tag is backend.ProcessingInstruction:
+            write("<?%s?>" % self._pi_text(elem))
+        elif tag is RAW:
+            self._write_raw(elem.get('start'), elem.get('stop'))
+        else:
+            newdecls = {}
+            restore = {}
+            if namespaces is None:
+                namespaces = self.doc._nsdecls.get(elem, {})
+            for uri, prefix in namespaces.items():
+                self._declare(uri, prefix, newdecls, restore)
+            tag = self._qname(tag, newdecls, restore)
+            items = self._attribs(elem)
+            if self._sort:
+                items = sorted(items, key=lambda x: x[0])
+            attribs = [(self._qname(k, newdecls, restore), v)
+                       for k, v in items]
+            write("<" + tag)
+            for v, k in sorted(newdecls.items(), key=lambda x: x[1]):
+                write(" xmlns%s=\"%s\"" % (k and ":" + k,
+                                          _escape_attrib(v)))
+            for k, v in attribs:
+                if isinstance(v, str):
+                    write(" %s=\"%s\"" % (k, _escape_attrib(v)))
+                else:
+                    write(" %s=\"" % k)
+                    for piece in v.iter_text():
+                        write(piece)
+                    write("\"")
+            if text or len(elem):
+                write(">")
+                if text:
+                    write(_escape_cdata(text))
+                for e in elem:
+                    yield from self._serialize(e, depth=depth + 1)
+                for e in elem:
+                    self._written.discard(e)
+                write("</" + tag + ">")
+            else:
+                write(" />")
+            self._undeclare(restore)
+        if elem.tail:
+            write(_escape_cdata(elem.tail))
+        self._written.add(elem)
+        yield elem
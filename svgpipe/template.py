@@ -0,0 +1,262 @@
+""" Parse templates once, render them many times.
+
+A `TemplateCache` keeps parsed template documents and hands out
+independent copies of them (`TemplateDoc`, an `SVGDocInj`), so
+that repeated renders of the same template do not pay for
+reading and parsing the file again.
+
+Copies are deep copies of the whole tree, which is still cheaper
+than parsing. With `copy_on_write` and the `etree` backend, a copy
+shares the top-level elements (layers) with its template instead,
+and a layer is only copied when one of its elements is looked up
+via the copy (`get_layer`, `get_svg_element`, `get_parent`, ...)
+or passed to `own`. With `lxml`, elements cannot be shared, the
+whole tree is always copied.
+"""
+
+import collections
+import copy
+import hashlib
+import io
+import os
+
+import svgpipe
+import svgpipe.backend
+from svgpipe.fmt import DEFAULT as DEFAULT_FMT
+from svgpipe.inject import SVGDocInj
+
+### default memory budget of a `TemplateCache`, in bytes
+BUDGET = 64 << 20
+### estimated memory of a parsed tree per byte of source
+MEM_FACTOR = 12
+
+class TemplateDoc(SVGDocInj):
+    """ An independent copy of a parsed template document.
+
+    With `shared`, elements obtained via the lookup methods
+    (including `get_parent`) belong to the copy and can be changed
+    freely, as can elements passed to injectpoints, `point_buffer`
+    or `svgpipe.transfer` with this document.
+
+    WARNING: With `shared`, other elements (e.g. reached by
+    iterating `root`) may be shared with the template and with
+    all other copies. Changing them directly changes every later
+    render of the template. Call `own` and change its result.
+    """
+
+    def __init__(self, template, fmt=DEFAULT_FMT, shared=False):
+        """ `template`: The parsed `svgpipe.SVGDoc` to be copied.
+
+        `fmt` (optional): cf. `SVGDocInj`.
+
+        `shared` (optional): Copy on write, sharing unchanged
+            top-level elements with `template` (`etree` only).
+        """
+        backend = template.backend
+        if backend.parent_pointers or not shared:
+            self._template = None
+            root = copy.deepcopy(template.root)
+        else:
+            if template._ids is None:
+                template._build_index()
+            self._template = template
+            root = backend.Element(template.root.tag,
+                                   dict(template.root.attrib))
+            root.text = template.root.text
+            root.tail = template.root.tail
+            root.extend(template.root)
+        self._init_tree(backend, backend.ElementTree(root))
+        self._init_state(fmt)
+        ### shared top-level element --> own copy
+        self._copies = {}
+
+    def _shared(self, element):
+        """ Is `element` part of the template?"""
+        t = self._template
+        return t is not None and (element is t.root
+                                  or element in t._parents)
+
+    def own(self, element):
+        """ The element of this copy corresponding to `element`.
+
+        If `element` is shared with the template, the top-level
+        element containing it is copied (once). Elements of the
+        copy are returned unchanged.
+        """
+        if not self._shared(element):
+            return element
+        t = self._template
+        if element is t.root:
+            return self.root
+        path = []
+        top = element
+        parent = t._parents[top]
+        while parent is not t.root:
+            path.append(list(parent).index(top))
+            top, parent = parent, t._parents[parent]
+        mine = self._copies.get(top)
+        if mine is None:
+            mine = copy.deepcopy(top)
+            self.root[list(self.root).index(top)] = mine
+            self._copies[top] = mine
+            if self._ids is not None:
+                self._unregister(top)
+                self.register_subtree(mine, self.root)
+        for i in reversed(path):
+            mine = mine[i]
+        return mine
+
+    def _unregister(self, element):
+        """ Remove `element` and its descendants from the index."""
+        self._forget_subtree(element)
+        self._parents.pop(element, None)
+        id = element.get('id')
+        if id is not None and element in self._ids.get(id, ()):
+            self._ids[id].remove(element)
+
+    def _build_index(self):
+        """ Derive the index from the one of the template.
+
+        Shared top-level elements are taken over from the
+        template, all others are indexed.
+        """
+        t = self._template
+        if t is None:
+            super()._build_index()
+            return
+        if t._ids is None:
+            t._build_index()
+        self._ids = {id: list(els) for id, els in t._ids.items()}
+        self._unordered = set()
+        self._parents = dict(t._parents)
+        present = set(self.root)
+        for child in t.root:
+            if child not in present:
+                self._unregister(child)
+        for child in self.root:
+            if child in t._parents:
+                self._parents[child] = self.root
+            else:
+                self.register_subtree(child, self.root)
+
+    def get_svg_element(self, tag, id):
+        return self.own(super().get_svg_element(tag, id))
+
+    def get_parent(self, element):
+        return self.own(super().get_parent(self.own(element)))
+
+    def get_layers_as_dict(self, ids):
+        return {id: self.own(el)
+                for id, el in super().get_layers_as_dict(ids).items()}
+
+    def get_svg_elements(self, pairs):
+        return {pair: self.own(el)
+                for pair, el in super().get_svg_elements(pairs).items()}
+
+    def select(self, selectors, unique=False):
+        found = super().select(selectors, unique)
+        if unique:
+            return {s: self.own(el) for s, el in found.items()}
+        return {s: [self.own(el) for el in els] for s, els in found.items()}
+
+    def _defs(self):
+        return self.own(super()._defs())
+
+    def _release(self, element):
+        if self._shared(element):
+            ### the template keeps it anyway
+            return
+        super()._release(element)
+
+class TemplateCache(object):
+    """ Parsed templates, evicting the least recently used.
+
+    `budget` (optional): Memory for parsed templates in bytes,
+        estimated as `MEM_FACTOR` times the source size. The
+        most recently used template is kept in any case.
+
+    `backend` (optional): The XML backend, cf. `svgpipe.backend`.
+        Defaults to 'etree', the only one with copy-on-write
+        copies; with 'lxml', copying a tree costs nearly as much
+        as parsing it.
+
+    `copy_on_write` (optional): Hand out copies sharing elements
+        with the template, cf. `TemplateDoc`. Only for code which
+        changes elements through `svgpipe` or `TemplateDoc.own`.
+
+    `hits`, `misses`: Number of loads with and without a cached
+        template.
+    """
+
+    def __init__(self, budget=BUDGET, backend='etree', copy_on_write=False):
+        self.budget = budget
+        self.backend = svgpipe.backend.get(backend)
+        self.copy_on_write = copy_on_write
+        self._templates = collections.OrderedDict()
+        self._paths = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._templates)
+
+    def _key(self, source, hash):
+        """ Cache key, source data (if read) and source size."""
+        if isinstance(source, (str, os.PathLike)):
+            path = os.path.abspath(os.fspath(source))
+            if not hash:
+                st = os.stat(path)
+                return (path, st.st_mtime_ns, st.st_size), None, st.st_size
+            with open(path, 'rb') as f:
+                data = f.read()
+        else:
+            data = source.read()
+        raw = data.encode('utf-8') if isinstance(data, str) else data
+        return hashlib.sha1(raw).hexdigest(), data, len(raw)
+
+    def load(self, source, fmt=DEFAULT_FMT, hash=False):
+        """ A `TemplateDoc` copy of the template in `source`.
+
+        `source`: A file name or file object. Files given by name
+            are identified by path, modification time and size;
+            a changed file is parsed again. File objects are
+            identified by a hash of their content.
+
+        `fmt` (optional): cf. `SVGDocInj`.
+
+        `hash` (optional): Identify files given by name by their
+            content as well.
+        """
+        key, data, size = self._key(source, hash)
+        template = self._templates.get(key)
+        if template is not None:
+            self.hits += 1
+            self._templates.move_to_end(key)
+            return TemplateDoc(template[0], fmt, self.copy_on_write)
+        self.misses += 1
+        if data is not None:
+            source = (io.StringIO(data) if isinstance(data, str)
+                      else io.BytesIO(data))
+        elif key[0] in self._paths:
+            ### the file has changed
+            self._drop(self._paths.pop(key[0]))
+        doc = svgpipe.SVGDoc(source, backend=self.backend)
+        self._templates[key] = doc, MEM_FACTOR * size
+        self.size += MEM_FACTOR * size
+        if data is None:
+            self._paths[key[0]] = key
+        while self.size > self.budget and len(self._templates) > 1:
+            self._drop(next(iter(self._templates)))
+        return TemplateDoc(doc, fmt, self.copy_on_write)
+
+    def _drop(self, key):
+        doc, size = self._templates.pop(key)
+        self.size -= size
+        if isinstance(key, tuple) and self._paths.get(key[0]) == key:
+            del self._paths[key[0]]
+
+    def clear(self):
+        self._templates.clear()
+        self._paths.clear()
+        self.size = 0
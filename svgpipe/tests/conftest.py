@@ -2,6 +2,19 @@ import codecs
 import os
 import pytest
 
+import svgpipe.backend
+
+@pytest.fixture(autouse=True, params=['etree', 'lxml'])
+def backend(request):
+    """ Run each test with each XML backend (if installed)."""
+    try:
+        be = svgpipe.backend.get(request.param)
+    except ImportError:
+        pytest.skip("%s is not installed" % request.param)
+    previous = svgpipe.backend.use(be)
+    yield be
+    svgpipe.backend.use(previous)
+
 @pytest.fixture(scope="session")
 def write_if_svgout():
     html_opener = """<!DOCTYPE html>
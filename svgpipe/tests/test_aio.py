@@ -0,0 +1,78 @@
+import asyncio
+import io
+import threading
+
+import pytest
+
+import svgpipe
+import svgpipe.aio
+import svgpipe.inject
+import svgpipe.tests.utils as TU
+
+TEM = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+    '<polyline id="P1" points="0,0 1,1"/>')
+
+class AsyncReader(object):
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    async def read(self, n):
+        await asyncio.sleep(0)
+        return self.data.read(n)
+
+class AsyncWriter(object):
+    def __init__(self, fail_after=None):
+        self.chunks = []
+        self.fail_after = fail_after
+
+    async def write(self, data):
+        await asyncio.sleep(0)
+        if self.fail_after is not None and len(self.chunks) >= self.fail_after:
+            raise ConnectionResetError()
+        self.chunks.append(data)
+
+class Test_Aio:
+
+    def test_open_save(self, tmp_path):
+        path = tmp_path / "result.svg"
+        async def main():
+            doc = await svgpipe.inject.SVGDocInj.aopen(
+                                            AsyncReader(TEM.encode("utf8")))
+            doc.get_poly_injectpoint("polyline", "P1").inject_points([(2, 3)])
+            await doc.asave(str(path))
+            return await svgpipe.SVGDoc.aopen(str(path))
+        doc = asyncio.run(main())
+        assert (doc.get_svg_element("polyline", "P1").get("points")
+                == "0,0 1,1 2,3")
+
+    def test_save_to_stream(self, monkeypatch):
+        monkeypatch.setattr(svgpipe.aio, 'CHUNKSIZE', 10)
+        doc = svgpipe.inject.SVGDocInj(io.StringIO(TEM))
+        expected = io.BytesIO()
+        doc.save_streaming(expected)
+        writer = AsyncWriter()
+        asyncio.run(doc.asave(writer))
+        assert len(writer.chunks) > 1
+        assert b"".join(writer.chunks) == expected.getvalue()
+        with pytest.raises(ConnectionResetError):
+            asyncio.run(doc.asave(AsyncWriter(fail_after=2)))
+
+    def test_limit(self, monkeypatch):
+        running = []
+        peak = []
+        lock = threading.Lock()
+        def parse(source):
+            with lock:
+                running.append(source)
+                peak.append(len(running))
+            threading.Event().wait(0.01)
+            with lock:
+                running.remove(source)
+            return source
+        monkeypatch.setattr(svgpipe.aio, '_semaphores', {})
+        monkeypatch.setattr(svgpipe.aio, 'LIMIT', 2)
+        async def main():
+            return await asyncio.gather(*[svgpipe.aio.open_doc(parse, i)
+                                          for i in range(6)])
+        assert asyncio.run(main()) == list(range(6))
+        assert max(peak) == 2
@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+import svgpipe
+import svgpipe.backend
+import svgpipe.inject
+import svgpipe.tests.utils as TU
+
+class Test_Backend(TU.SVGDoc_Tester):
+    TEM = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+        '<rect id="R1" x="0" y="0" width="100"'
+        ' height="50" />')
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            svgpipe.backend.get('minidom')
+
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv('SVGPIPE_BACKEND', raising=False)
+        monkeypatch.setattr(svgpipe.backend, '_default', None)
+        assert svgpipe.backend.get().name == 'etree'
+        monkeypatch.setattr(svgpipe.backend, '_default', None)
+        monkeypatch.setenv('SVGPIPE_BACKEND', 'auto')
+        assert svgpipe.backend.get().name in ('etree', 'lxml')
+
+    def test_per_document(self, backend):
+        other = 'lxml' if backend.name == 'etree' else 'etree'
+        try:
+            svgdoc = svgpipe.SVGDoc(io.StringIO(Test_Backend.TEM),
+                                    backend=other)
+        except ImportError:
+            pytest.skip("%s is not installed" % other)
+        assert svgdoc.backend.name == other
+        injp = svgpipe.inject.InjectPoint(svgdoc.get_layer("Layer_A"))
+        assert injp.backend is backend
+
+    def test_parent_and_streaming(self, backend):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(Test_Backend.TEM))
+        assert svgdoc.backend is backend
+        injp = svgdoc.get_rect_injectpoint("R1", (0, 1), (0, 1))
+        rect = svgdoc.get_svg_element('rect', 'R1')
+        assert svgdoc.get_parent(rect) is injp.target
+        assert svgdoc.get_parent(svgdoc.root) is None
+        with pytest.raises(svgpipe.ParseError):
+            injp.inject("<circle")
+        injp.inject(backend.ProcessingInstruction('target', 'some data'))
+        out = io.BytesIO()
+        svgdoc.save_streaming(out)
+        assert b'<?target some data?>' in out.getvalue()
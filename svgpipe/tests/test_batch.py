@@ -0,0 +1,80 @@
+import concurrent.futures
+
+import pytest
+
+import svgpipe
+import svgpipe.tests.utils as TU
+import svgpipe.batch as B
+from svgpipe.batch import Job, render, render_batch, run_jobs
+
+TEM = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+    '<rect id="R1" x="0" y="0" width="100" height="50" />'
+    '<polyline id="P1" points=""/>')
+
+def circle(injp):
+    injp.inject('<circle xmlns="%s" cx="%s" r="1"/>'
+                % (TU.SVG_NS, injp.h2x(5)))
+
+def _jobs(n):
+    for i in range(n):
+        job = Job()
+        if i == 3:
+            job.layer("Layer_X", (0, 1), (0, 1))
+        job.layer("Layer_B", (0, 10), (0, 1), [circle])
+        job.points("polyline", "P1", [(i, 0), (i, 1)],
+                   trafo=("R1", (0, 10), (0, 1), True))
+        yield job
+
+class Test_Batch:
+
+    def test_render(self, tmp_path):
+        path = tmp_path / "template.svg"
+        path.write_text(TEM)
+        job = Job(str(tmp_path / "out.svg")).rect("R1", (0, 10), (0, 1),
+                                                   ['<g id="G"/>'])
+        assert render(str(path), job) == job.output
+        assert svgpipe.SVGDoc(job.output).get_layer("G") is not None
+
+    @pytest.mark.parametrize("ordered", [True, False])
+    def test_render_batch(self, ordered):
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            results = list(render_batch(TEM.encode("utf8"), _jobs(12),
+                                        ordered=ordered,
+                                        executor=executor))
+        if ordered:
+            assert [r.index for r in results] == list(range(12))
+        results.sort(key=lambda r: r.index)
+        assert [r.ok for r in results] == [i != 3 for i in range(12)]
+        assert isinstance(results[3].error, svgpipe.NotFoundError)
+        assert b'cx="100.0"' in results[0].value
+        assert b'points="10,50 10,0"' in results[1].value
+
+    @pytest.mark.parametrize("workers", [None, 2])
+    def test_run_jobs(self, workers):
+        consumed = []
+
+        def jobs():
+            for i in range(20):
+                consumed.append(i)
+                yield i
+
+        def check(i):
+            if i == 5:
+                raise ValueError(i)
+            return i * i
+
+        if workers is None:
+            results = run_jobs(None, check, jobs())
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(workers)
+            results = run_jobs(executor, check, jobs())
+        first = next(results)
+        assert (first.index, first.value) == (0, 0)
+        assert len(consumed) <= B.WINDOW * (workers or 0) + 1
+        results = [first] + list(results)
+        assert [r.index for r in results] == list(range(20))
+        assert [r.value for r in results if r.ok] == \
+                    [i * i for i in range(20) if i != 5]
+        assert isinstance(results[5].error, ValueError)
+        if workers is not None:
+            executor.shutdown()
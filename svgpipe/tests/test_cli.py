@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+import svgpipe
+import svgpipe.tests.utils as TU
+from svgpipe.cli import Renderer, load_manifest, main
+
+TEM = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+    '<rect id="R1" x="0" y="0" width="100" height="50" />'
+    '<polyline id="P1" points=""/>')
+
+def _job(i, data, **options):
+    return {"output": "out/chart_%d.svg" % i,
+            "inject": [{"layer": "Layer_B", "hrange": [0, 1],
+                        "vrange": [0, 1], "content": ['<g id="G%d"/>' % i]},
+                       dict(options, points="P1", data=data,
+                            trafo=["R1", [0, 10], [0, 1], True])]}
+
+@pytest.fixture
+def manifest(tmp_path):
+    (tmp_path / "chart.svg").write_text(TEM)
+    (tmp_path / "data.csv").write_text("x,y\n0,0\n10,1\n")
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps({"template": "chart.svg",
+                                "jobs": [_job(0, [[5, 0.5]]),
+                                         _job(1, "data.csv", skiprows=1)]}))
+    return path
+
+class Test_CLI:
+
+    def test_manifest(self, manifest, tmp_path):
+        specs = load_manifest(str(manifest))
+        assert [s['output'] for s in specs] == [
+                    str(tmp_path / "out" / "chart_0.svg"),
+                    str(tmp_path / "out" / "chart_1.svg")]
+        assert specs[1]['inject'][1]['data'] == str(tmp_path / "data.csv")
+        lines = tmp_path / "jobs.jsonl"
+        lines.write_text("\n".join(json.dumps(dict(_job(i, []),
+                                                   template="chart.svg"))
+                                   for i in range(3)) + "\n")
+        assert len(load_manifest(str(lines))) == 3
+        lines.write_text('{"output": "a.svg"}\n')
+        with pytest.raises(svgpipe.ParseError):
+            load_manifest(str(lines))
+
+    def test_main(self, manifest, tmp_path, capsys):
+        assert main([str(manifest), "--workers", "2", "-q"]) == 0
+        doc = svgpipe.SVGDoc(str(tmp_path / "out" / "chart_0.svg"))
+        assert doc.get_layer("G0") is not None
+        assert doc.get_svg_element("polyline", "P1").get('points') == \
+                    "50,25"
+        doc = svgpipe.SVGDoc(str(tmp_path / "out" / "chart_1.svg"))
+        assert doc.get_svg_element("polyline", "P1").get('points') == \
+                    "0,50 100,0"
+        assert capsys.readouterr().out == ""
+        specs = json.loads(manifest.read_text())
+        specs['jobs'][0]['inject'].append({"circle": "C1"})
+        manifest.write_text(json.dumps(specs))
+        assert main([str(manifest), "--workers", "0"]) == 1
+        out, err = capsys.readouterr()
+        assert out.strip() == str(tmp_path / "out" / "chart_1.svg")
+        assert "ParseError: Unknown step" in err
+
+    def test_rerender_changed(self, manifest, tmp_path):
+        with Renderer(workers=0) as renderer:
+            specs = load_manifest(str(manifest))
+            assert [r.index for r in renderer.run(specs)] == [0, 1]
+            assert renderer.run(specs) == []
+            data = tmp_path / "data.csv"
+            data.write_text("x,y\n0,0\n10,1\n5,0\n")
+            os.utime(str(data), ns=(1, 1))
+            assert [r.index for r in renderer.run(specs)] == [1]
+            specs[0]['inject'][1]['data'] = [[1, 1]]
+            results = renderer.run(specs)
+            assert [r.index for r in results] == [0]
+            assert all(r.ok for r in results)
+            assert [r.index for r in renderer.run(specs, force=True)] == \
+                        [0, 1]
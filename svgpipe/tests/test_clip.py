@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import svgpipe.clip
+import svgpipe.inject
+import svgpipe.tests.utils as TU
+from svgpipe.clip import clip
+
+RECT = (0, 0, 10, 10)
+
+class Test_Clip:
+
+    def test_polyline(self):
+        pts = [(-20, 5), (-10, 5), (5, 5), (5, 30), (6, 40), (7, 30),
+               (8, 5), (30, 5)]
+        assert clip(pts, RECT, margin=0).tolist() == [
+            [0, 5], [5, 5], [5, 10], [7.8, 10], [8, 5], [10, 5]]
+        assert clip(pts, RECT, keep_ends=True, margin=0).tolist() == [
+            [-20, 5], [0, 5], [5, 5], [5, 10], [7.8, 10], [8, 5],
+            [10, 5], [30, 5]]
+        assert clip(pts, RECT, margin=1).tolist()[:2] == [[-1, 5], [5, 5]]
+        inside = [(1, 1), (2, 3)]
+        assert clip(inside, RECT).tolist() == [[1, 1], [2, 3]]
+        assert len(clip([(20, 20), (30, 30)], RECT)) == 0
+        assert len(clip([(20, 20)], RECT)) == 0
+        assert clip([(20, 20)], RECT, keep_ends=True).tolist() == [[20, 20]]
+        assert clip([(1, 2)], RECT).tolist() == [[1, 2]]
+        assert clip(pts, RECT, stroke_width=4).tolist()[:2] == [[-10, 5],
+                                                                [5, 5]]
+
+    def test_polygon(self):
+        pts = np.array([(-10, -10), (20, -10), (20, 20), (-10, 20)])
+        assert clip(pts, RECT, closed=True, margin=0).tolist() == [
+            [10, 0], [10, 10], [0, 10], [0, 0]]
+        tri = [(5, 5), (15, 5), (5, 15)]
+        assert clip(tri, RECT, closed=True, margin=0).tolist() == [
+            [5, 5], [10, 5], [10, 10], [5, 10]]
+
+    def test_replace_all_points(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+                    '<rect id="R" x="0" y="0" width="100" height="100"/>'
+                    '<polyline id="P1" points=""/>')))
+        trafo = svgdoc.trafo_from_rect("R", (1000, 1100), (0, 10),
+                                       flip_y=True)
+        hs = np.arange(100000.)
+        injp = svgdoc.get_poly_injectpoint("polyline", "P1")
+        injp.replace_all_points((hs, np.full(len(hs), 5.)),
+                                trafo=trafo, clip=True)
+        ### points within `MARGIN` outside the view are kept
+        assert injp.point_buffer().to_text() == " ".join(
+            "%d,50" % x for x in range(-4, 105))
+        with pytest.raises(ValueError):
+            injp.replace_all_points([(1, 2)], clip=True)
+
+    def test_stroke_width(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+                    '<g style="fill:none; stroke-width: 8px">'
+                    '<polyline id="P1" points=""/></g>')))
+        injp = svgdoc.get_poly_injectpoint("polyline", "P1")
+        injp.replace_all_points([(-50, 5), (5, 5)], clip=RECT)
+        assert injp.point_buffer().to_text() == "-20,5 5,5"
+        injp.target.set('stroke-width', "1em")
+        assert svgpipe.clip.stroke_width(injp.target) is None
+        injp.replace_all_points([(-50, 5), (5, 5)], clip=RECT)
+        assert injp.point_buffer().to_text() == "-4,5 5,5"
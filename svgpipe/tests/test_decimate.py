@@ -0,0 +1,56 @@
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import svgpipe.inject
+import svgpipe.tests.utils as TU
+from svgpipe.decimate import Decimation, lttb, minmax
+
+def _signal(n=100000):
+    xs = np.linspace(0, 200, n)
+    ys = np.sin(xs / 10.) * 50 + 100
+    ys[12345] = -400.
+    ys[54321] = 900.
+    return xs, ys
+
+class Test_Decimate:
+
+    def test_minmax(self):
+        xs, ys = _signal()
+        keep = minmax(xs, ys, pixel=0.5)
+        assert len(keep) <= 4 * 401
+        assert list(keep) == sorted(set(keep))
+        assert {0, len(xs) - 1, 12345, 54321} <= set(keep)
+        cols = np.floor(xs / 0.5)
+        for col in (17., 250., 399.):
+            run = cols == col
+            assert ys[keep][cols[keep] == col].min() == ys[run].min()
+            assert ys[keep][cols[keep] == col].max() == ys[run].max()
+        assert list(minmax(xs[:4], ys[:4])) == [0, 1, 2, 3]
+
+    def test_lttb(self):
+        xs, ys = _signal()
+        keep = lttb(xs, ys, 500)
+        assert len(keep) == 500
+        assert list(keep) == sorted(set(keep))
+        assert {0, len(xs) - 1, 12345, 54321} <= set(keep)
+        assert list(lttb(xs[:10], ys[:10], 20)) == list(range(10))
+
+    def test_inject(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+                    '<rect id="R" x="0" y="0" width="200" height="200"/>'
+                    '<polyline id="P1" points=""/>')))
+        trafo = svgdoc.trafo_from_rect("R", (0, 200), (-500, 1000))
+        injp = svgdoc.get_poly_injectpoint("polyline", "P1")
+        dec = Decimation('minmax')
+        injp.replace_all_points(_signal(), trafo=trafo, decimate=dec)
+        assert dec.n_in == 100000
+        assert dec.n_out == len(injp.point_buffer())
+        assert dec.ratio < 0.01
+        injp.inject_points([(x, 100) for x in range(50)], decimate=dec)
+        assert dec.n_in == 50
+        with pytest.raises(ValueError):
+            Decimation('median')
@@ -0,0 +1,77 @@
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import svgpipe
+import svgpipe.extract as EXT
+import svgpipe.inject
+import svgpipe.tests.utils as TU
+from svgpipe.fmt import CoordFormatter
+
+CONTENT = TU.SVGDoc_Tester.TEM1 % ('0 0 200 100',
+    '<rect id="R1" x="0" y="0" width="200" height="100"/>'
+    '<rect id="R2" class="bar" x="10" y="20" width="5" height="30"/>'
+    '<polyline id="P1" class="data" points="0,100 100,50 200,0"/>'
+    '<path id="D1" class="data" d="M10,10 h5 v-5 L1 2 Z m1-1 c0 0 1 1 2 2"/>'
+    '<line id="L1" x1="0" y1="1" x2="2" y2="3"/><circle id="C1"/>')
+
+class Test_Extract:
+
+    def test_points(self):
+        assert EXT.points(" 1,2 3 -4\n5e1,.5").tolist() == [[1, 2], [3, -4],
+                                                            [50, .5]]
+        assert EXT.points("1-2 .5.5").tolist() == [[1, -2], [.5, .5]]
+        assert EXT.points("").shape == (0, 2)
+        with pytest.raises(svgpipe.ParseError):
+            EXT.points("1,2 3")
+        with pytest.raises(svgpipe.ParseError):
+            EXT.points("1,2 3,x")
+
+    def test_path(self):
+        d = EXT.path("M10,10 h5 v-5 L1 2 Z m1-1 c0 0 1 1 2 2 2 2 3 3 3 3")
+        assert np.isnan(d[5]).all()
+        d = np.nan_to_num(d, nan=-1).tolist()
+        assert d == [[10, 10], [15, 10], [15, 5], [1, 2], [10, 10],
+                     [-1, -1], [11, 9], [13, 11], [16, 14]]
+        pts = [(0, 0), (1.5, 2), (3, 1), None, (4, 4), (5, 2.25)]
+        fmt = CoordFormatter(decimals=2)
+        d = EXT.path(fmt.format_path(pts))
+        expect = np.array([p if p else (np.nan, np.nan) for p in pts])
+        assert np.allclose(d, expect, equal_nan=True)
+        for d in ["10,10", "M1,2 3", "Z1"]:
+            with pytest.raises(svgpipe.ParseError):
+                EXT.path(d)
+
+    def test_from_doc(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(CONTENT))
+        trafo = svgdoc.trafo_from_rect("R1", (0, 1000), (0, 10),
+                                       flip_y=True)
+        svgdoc.get_poly_injectpoint('polyline', "P1").inject_points(
+                                                    [(50, 50)])
+        found = EXT.from_doc(svgdoc, ['polyline', 'rect.bar', 'line',
+                                      'circle'], trafo)
+        [(id, data)] = found['polyline']
+        assert id == "P1"
+        assert data.tolist() == [[0, 0], [500, 5], [1000, 10], [250, 5]]
+        assert found['rect.bar'][0][1].tolist() == [50, 8, 75, 5]
+        assert found['line'][0][1].tolist() == [[0, 9.9], [10, 9.7]]
+        assert found['circle'] == [("C1", None)]
+        assert EXT.rects(svgdoc.select(['rect'])['rect']).tolist() == [
+                    [0, 0, 200, 100], [10, 20, 5, 30]]
+
+    def test_iter_extract(self, tmp_path):
+        sources = []
+        for i in range(3):
+            path = tmp_path / ("doc%d.svg" % i)
+            path.write_text(CONTENT.replace('200,0', '200,%d' % i))
+            sources.append(str(path))
+        found = list(EXT.iter_extract(sources, ['.data', 'rect#R1']))
+        assert [(s, sel, id) for s, sel, id, data in found[:3]] == [
+                    (sources[0], 'rect#R1', "R1"),
+                    (sources[0], '.data', "P1"),
+                    (sources[0], '.data', "D1")]
+        assert len(found) == 9
+        assert [data.tolist()[-1] for s, sel, id, data in found
+                if id == "P1"] == [[200, 0], [200, 1], [200, 2]]
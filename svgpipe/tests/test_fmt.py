@@ -0,0 +1,122 @@
+import datetime
+import re
+
+import pytest
+
+from svgpipe.fmt import CoordFormatter, DEFAULT
+
+class Test_CoordFormatter:
+    def test_default_strips_zeros(self):
+        assert DEFAULT.format_points([(1, 2.5), (-0.0000001, 100)]) \
+                == "1,2.5 0,100"
+        assert DEFAULT.format_points([]) == ""
+        assert DEFAULT.format_number(1/3) == "0.333333"
+
+    def test_decimals_and_sigdigits(self):
+        assert CoordFormatter(decimals=2).format_points(
+                   [(1.005001, 20.499)]) == "1.01,20.5"
+        assert CoordFormatter(decimals=0).format_points(
+                   [(10.4, -0.4)]) == "10,0"
+        assert CoordFormatter(sigdigits=3).format_points(
+                   [(1234.5, 0.000123456)]) == "1.23e+03,0.000123"
+        with pytest.raises(ValueError):
+            CoordFormatter(decimals=2, sigdigits=3)
+
+    def test_quantum(self):
+        fmt = CoordFormatter(quantum=0.25)
+        assert fmt.decimals == 2
+        assert fmt.format_points([(1.1, 1.2), (7.9, -3.1)]) \
+                == "1,1.25 8,-3"
+        fmt = CoordFormatter.for_viewbox((0, 0, 200, 100), width=400)
+        assert fmt.quantum == 0.5
+        assert fmt.format_number(3.3) == "3.5"
+        fmt = CoordFormatter.for_viewbox((0, 0, 200, 100), subpixel=3)
+        assert fmt.decimals == 2
+        assert fmt.format_points([(1.2, 100 / 3)]) == "1.33,33.33"
+        fmt = CoordFormatter.for_viewbox((0, 0, 100, 100), width=300)
+        assert fmt.decimals == 2
+        assert CoordFormatter(quantum=0.001).decimals == 3
+        assert CoordFormatter(quantum=20).decimals == 0
+
+    def test_rejects_non_numbers(self):
+        with pytest.raises(TypeError):
+            DEFAULT.format_points([(datetime.datetime(2017,4,6), 1)])
+        with pytest.raises(TypeError):
+            CoordFormatter(quantum=0.1).format_points(
+                [(1, datetime.datetime(2017,4,6))])
+
+    @pytest.mark.parametrize("fmt", [DEFAULT,
+                                     CoordFormatter(decimals=0),
+                                     CoordFormatter(decimals=3),
+                                     CoordFormatter(sigdigits=4),
+                                     CoordFormatter(quantum=0.2)])
+    def test_arrays_like_lists(self, fmt):
+        np = pytest.importorskip("numpy")
+        rng = np.random.default_rng(7)
+        pts = rng.uniform(-5000, 5000, (1000, 2))
+        pts[::4] = np.round(pts[::4])
+        ### (nearly) halfway between steps of 0.5 ... 0.0005
+        pts[3::4] = (np.round(pts[3::4], 3)
+                     + 0.5 * 10.0**-rng.integers(0, 4, (250, 2)))
+        pts[1] = 0, 1e-9
+        pts[2] = 3e12, -7
+        aspairs = [tuple(p) for p in pts.tolist()]
+        assert fmt.format_points(pts) == fmt.format_points(aspairs)
+        assert (fmt.format_points((pts[:,0], pts[:,1]))
+                == fmt.format_points(aspairs))
+        intpts = np.arange(6).reshape(3, 2)
+        assert (fmt.format_points(intpts)
+                == fmt.format_points(intpts.tolist()))
+        nonfinite = np.array([[np.inf, 1.5], [np.nan, 2]])
+        assert fmt.format_points(nonfinite).split(" ")[0] \
+                == fmt.format_points([(np.inf, 1.5)])
+
+    def test_rounds_like_lists(self):
+        np = pytest.importorskip("numpy")
+        fmt = CoordFormatter(decimals=2)
+        pts = [(2.675, -1.005), (0.125, 2.5)]
+        assert fmt.format_points(np.array(pts)) == "2.67,-1 0.12,2.5"
+        assert fmt.format_points(pts) == "2.67,-1 0.12,2.5"
+
+    def test_format_path(self):
+        fmt = CoordFormatter(decimals=2)
+        pts = [(0, 0), (1.5, -2), (1.25, 0.5), None,
+               (10, 10), (10.1, 10.3), (float('nan'), 1), (9, 9)]
+        assert (fmt.format_path(pts)
+                == "M0,0l1.5-2-.25,2.5m8.75,9.5 .1,.3m-1.1-1.3")
+        assert fmt.format_path([(1, 1)], start=(0.5, 0.5)) == "l.5,.5"
+        assert (fmt.format_path([None, (1, 1)], start=(0.5, 0.5))
+                == "m.5,.5")
+        assert fmt.format_path([None]) == ""
+        assert (CoordFormatter(sigdigits=3).format_path(pts[:4])
+                == "M0,0L1.5-2 1.25,.5")
+
+    _NUMBER = re.compile(r"[Mml]|-?(?:[0-9]+\.?[0-9]*|\.[0-9]+)")
+
+    def _decode(d):
+        """ Absolute points of path data as written by `format_path`."""
+        pts = []
+        cur = (0, 0)
+        tokens = Test_CoordFormatter._NUMBER.findall(d)
+        i = 0
+        while i < len(tokens):
+            if tokens[i] in "Mml":
+                cmd = tokens[i]
+                i += 1
+            x, y = float(tokens[i]), float(tokens[i+1])
+            i += 2
+            cur = (x, y) if cmd == "M" else (cur[0] + x, cur[1] + y)
+            pts.append(cur)
+        return pts
+
+    @pytest.mark.parametrize("fmt", [CoordFormatter(decimals=3),
+                                     CoordFormatter(quantum=0.25)])
+    def test_path_without_drift(self, fmt):
+        np = pytest.importorskip("numpy")
+        rng = np.random.default_rng(3)
+        pts = np.cumsum(rng.normal(0, 1, (5000, 2)), axis=0)
+        d = fmt.format_path(pts)
+        assert d == fmt.format_path([tuple(p) for p in pts.tolist()])
+        assert np.allclose(Test_CoordFormatter._decode(d),
+                           fmt.round_values(pts), rtol=0, atol=1e-9)
+        assert len(d) < 0.8 * len(fmt.format_points(pts))
@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+import svgpipe
+import svgpipe.fragments
+import svgpipe.inject
+import svgpipe.tests.utils as TU
+from svgpipe.fragments import FragmentCache
+
+class Test_FragmentCache:
+
+    def test_copies(self, backend):
+        cache = FragmentCache()
+        unique = cache.fromstring(backend, '<g id="a"><rect/></g>')
+        assert len(cache) == 0
+        first = cache.fromstring(backend, '<g id="a"><rect/></g>')
+        assert first is not unique
+        first.set('id', "b")
+        first[0].set('x', "1")
+        second = cache.fromstring(backend, '<g id="a"><rect/></g>')
+        assert second is not first
+        assert second.get('id') == "a"
+        assert second[0].get('x') is None
+        assert (cache.hits, cache.misses, len(cache)) == (1, 2, 1)
+        with pytest.raises(backend.errors):
+            cache.fromstring(backend, '<g>')
+        assert len(cache) == 1
+
+    def test_limits(self, backend):
+        cache = FragmentCache(maxsize=2, maxchars=20)
+        for text in ['<a/>', '<b/>', '<c/>'] * 2:
+            cache.fromstring(backend, text)
+        assert len(cache) == 2
+        cache.fromstring(backend, '<b/>')
+        for i in range(2):
+            cache.fromstring(backend, '<long_element_name/>')
+        assert len(cache) == 1
+        assert cache.chars == len('<long_element_name/>')
+        for i in range(2):
+            cache.fromstring(backend, '<too_long_element_name/>')
+        assert (cache.hits, cache.misses, len(cache)) == (1, 8, 1)
+
+    def test_seen(self, backend, monkeypatch):
+        monkeypatch.setattr(svgpipe.fragments, 'SEEN', 4)
+        cache = FragmentCache(maxsize=1)
+        for text in ['<a/>', '<b/>', '<c/>', '<d/>', '<e/>', '<b/>']:
+            cache.fromstring(backend, text)
+        ### only the oldest one, `<a/>`, was forgotten
+        assert len(cache) == 1
+        cache.fromstring(backend, '<a/>')
+        assert len(cache) == 1
+        cache.fromstring(backend, '<b/>')
+        assert (cache.hits, cache.misses) == (1, 7)
+
+    def test_inject(self, monkeypatch):
+        cache = FragmentCache()
+        monkeypatch.setattr(svgpipe.fragments, 'CACHE', cache)
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 10 10', '')))
+        group = '<g xmlns="%s" id="G"/>' % TU.SVG_NS
+        for i in range(3):
+            injp = svgdoc.get_layer_injectpoint("Layer_A", (0, 1), (0, 1),
+                                                group=group)
+            injp.inject('<circle r="1"/>')
+        assert (cache.hits, cache.misses) == (2, 4)
+        layer = svgdoc.get_layer("Layer_A")
+        assert len(layer) == 3
+        layer[0][0].set('r', "2")
+        assert [g[0].get('r') for g in layer] == ["2", "1", "1"]
@@ -55,6 +55,44 @@ class Test_SVGDoc:
         with pytest.raises(svgpipe.NotFoundError):
             svgdoc.get_poly_injectpoint("polyline","Poly1")
 
+    def test_index_follows_injection(self):
+        fileobject = io.StringIO(Test_SVGDoc.svgdocument1
+                                 % ('<rect id="R1" x="0" y="0"'
+                                    ' width="10" height="10"/>', ""))
+        svgdoc = svgpipe.inject.SVGDocInj(fileobject)
+        layer = svgdoc.get_layer("Layer_A2")
+        assert svgdoc.get_parent(layer) is svgdoc.root
+        assert svgdoc.get_parent(svgdoc.root) is None
+        with pytest.raises(svgpipe.NotFoundError):
+            svgdoc.get_svg_element('circle', "C1")
+        injp = svgdoc.get_layer_injectpoint("Layer_A2", (0,1), (0,1),
+                                            group='<g xmlns="%s" id="G1"/>'
+                                                  % TU.SVG_NS)
+        injp.inject('<g xmlns="%s" id="G2"><circle id="C1" r="1"/></g>'
+                    % TU.SVG_NS)
+        circle = svgdoc.get_svg_element('circle', "C1")
+        g2 = svgdoc.get_svg_element('g', "G2")
+        assert svgdoc.get_parent(circle) is g2
+        assert svgdoc.get_parent(g2) is svgdoc.get_layer("G1")
+        svgdoc.get_rect_injectpoint("R1", (0,1), (0,1))
+        rect = svgdoc.get_svg_element('rect', "R1")
+        group = svgdoc.get_layer("INJ_R1")
+        assert svgdoc.get_parent(rect) is group
+        assert svgdoc.get_parent(group) is svgdoc.get_layer("Layer_A1")
+
+    def test_duplicate_ids_in_document_order(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 10 10',
+                    '<g><rect id="D" x="1"/></g><rect id="D" x="2"/>')))
+        assert svgdoc.get_svg_element('rect', "D").get('x') == "1"
+        assert [el.get('x') for el in svgdoc.select(["rect#D"])["rect#D"]] \
+                == ["1", "2"]
+        injp = svgdoc.get_layer_injectpoint("Layer_B", (0, 1), (0, 1))
+        injp.inject('<rect xmlns="%s" id="D" x="0"/>' % TU.SVG_NS)
+        assert svgdoc.get_svg_element('rect', "D").get('x') == "0"
+        with pytest.raises(svgpipe.ParseError):
+            svgdoc.get_svg_elements([('rect', "D")])
+
 class Test_SVGDocInj(TU.SVGDoc_Tester):
     def test_inject_into_layer(self, write_if_svgout):
         vbox = '0 10 90.71 68.03'
@@ -136,6 +174,140 @@ class Test_SVGDocInj(TU.SVGDoc_Tester):
                                       content_expect,
                                       write_if_svgout)
 
+    def test_inject_many(self, write_if_svgout):
+        vbox = '0 0 100 100'
+        circles = ['<circle id="C%d" cx="%d" cy="1" r="1"/>\n' % (i, i)
+                   for i in range(5)]
+        content_test = TU.SVGDoc_Tester.TEM1 % (vbox, '')
+        content_expect = TU.SVGDoc_Tester.TEM1 % (vbox,
+            "".join(circles[:2]) + '<g id="G"/>' + "".join(circles[2:])
+            + '<text>a &amp; b</text>')
+        svgdoc = TU.SVGDoc_Tester._prepare_svgdoc(content_test,
+                                                  content_expect,
+                                                  write_if_svgout)
+        injp = svgdoc.get_layer_injectpoint("Layer_A", (0, 1), (0, 1))
+        group = svgdoc.backend.Element("{%s}g" % TU.SVG_NS, {'id': "G"})
+        injp.inject_many(circles[:2] + [group] + circles[2:]
+                         + ['<text xmlns="%s">a &amp; b</text>'
+                            % TU.SVG_NS])
+        assert svgdoc.get_parent(svgdoc.get_layer("G")) is injp.target
+        with pytest.raises(svgpipe.ParseError):
+            injp.inject_many(['<circle/>', 'text', '<circle/>'])
+        with pytest.raises(svgpipe.ParseError):
+            injp.inject_many(['<circle/><circle/>'])
+        TU.SVGDoc_Tester._save_result(svgdoc,
+                                      content_expect,
+                                      write_if_svgout)
+
+
+    def test_inject_symbol(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 100 100', '')))
+        injp = svgdoc.get_layer_injectpoint("Layer_A", (0, 10), (0, 10))
+        marker = '<circle xmlns="%s" r="1"/>' % TU.SVG_NS
+        id = injp.inject_symbol(marker, [(1, 2), (3, 4)], trafo=injp)
+        assert injp.inject_symbol(marker, [(50, 60)]) == id
+        other = injp.inject_symbol('<rect xmlns="%s"/>' % TU.SVG_NS, [])
+        assert other != id
+        out = io.BytesIO()
+        svgdoc.save(out)
+        result = out.getvalue().decode("utf8")
+        assert ' xlink:href="#%s"' % id in result
+        root = svgpipe.ET.fromstring(result)
+        ns = svgpipe.SVGDoc._NS
+        symbols = root.findall("svg:defs/svg:symbol", ns)
+        assert [s.get('id') for s in symbols] == [id, other]
+        assert symbols[0][0].tag == "{%s}circle" % TU.SVG_NS
+        uses = root.findall("svg:g[@id='Layer_A']/svg:use", ns)
+        assert [(u.get('x'), u.get('y')) for u in uses] == [
+                    ("10", "20"), ("30", "40"), ("50", "60")]
+        assert {u.get("{%s}href" % ns['xlink']) for u in uses} == {"#" + id}
+
+    def test_path_injectpoint(self, write_if_svgout):
+        vbox = '0 0 100 100'
+        content_test = TU.SVGDoc_Tester.TEM1 % (vbox,
+            '<rect id="R1" x="0" y="0" width="100" height="100"/>'
+            '<path id="Path1" d="M5,5 h10" stroke="black"/>')
+        content_expect = TU.SVGDoc_Tester.TEM1 % (vbox,
+            '<rect id="R1" x="0" y="0" width="100" height="100"/>'
+            '<path id="Path1" d="M5,5 h10M0,100l10-10 10,0m10-10l10,0'
+            'm-10,20" stroke="black"/>')
+        svgdoc = TU.SVGDoc_Tester._prepare_svgdoc(content_test,
+                                                  content_expect,
+                                                  write_if_svgout)
+        injp = svgdoc.get_path_injectpoint("Path1")
+        trafo = svgdoc.trafo_from_rect("R1", (0, 10), (0, 10), flip_y=True)
+        injp.inject_path([(0, 0), (1, 1), (2, 1), None, (3, 2)], trafo)
+        injp.inject_path([(4, 2), (float('nan'), 0), (3, 0)], trafo)
+        TU.SVGDoc_Tester._save_result(svgdoc,
+                                      content_expect,
+                                      write_if_svgout)
+        injp.replace_path([(1, 2), (3, 4)])
+        assert injp.target.get('d') == "M1,2l2,2"
+
+    def test_matrix_injectpoint(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 100 50', '')))
+        injp = svgdoc.get_layer_injectpoint("Layer_A", (10, 20), (0, 5),
+                                            flip_y=True)
+        a, b, c, d, e, f = injp.matrix()
+        for h, v in [(10, 0), (12, 3), (20, 5)]:
+            assert a*h + c*v + e == pytest.approx(injp.h2x(h))
+            assert b*h + d*v + f == pytest.approx(injp.v2y(v))
+        ### inner world: h in tenths, v shifted by 1
+        inner = svgpipe.inject.WorldDocTrafo((0, 1, 1, 1), (0, 10), (0, 1))
+        a, b, c, d, e, f = injp.matrix(inner)
+        assert (a*120 + e, d*2 + f) == pytest.approx(
+                    (injp.h2x(12), injp.v2y(3)))
+        mp = injp.matrix_injectpoint(attribs={'id': "M"})
+        ### coordinates are written relative to (h1, v1)
+        assert mp.offset == (10, 0)
+        assert mp.target.get('transform') == "matrix(10 0 0 -10 0 50)"
+        poly = mp.poly_injectpoint(attribs={'stroke-width': "2"})
+        poly.inject_points([(10, 0), (12.5, 3)])
+        mp.inject('<circle xmlns="%s" r="1" vector-effect="none"/>'
+                  % TU.SVG_NS)
+        svgdoc.flush_points()
+        assert poly.target.get('points') == "0,0 2.5,3"
+        assert poly.target.get('vector-effect') == "non-scaling-stroke"
+        assert mp.target[1].get('vector-effect') == "none"
+        mp.set_view((0, 100), (0, 5))
+        assert svgdoc.get_svg_element('g', "M").get('transform') == \
+                    "matrix(1 0 0 -10 10 50)"
+        mi = injp.matrix_injectpoint(inner)
+        assert mi.offset == pytest.approx((100, -1))
+        a, b, c, d, e, f = [float(c) for c in
+                            mi.target.get('transform')[7:-1].split()]
+        assert (a*20 + e, d*3 + f) == pytest.approx(
+                    (injp.h2x(12), injp.v2y(3)))
+        custom = svgpipe.inject.WorldDocTrafo((0, 0, 1, 1), (0, 1), (0, 1),
+                                              delta_h=lambda a, b: b - a)
+        with pytest.raises(ValueError):
+            injp.matrix_injectpoint(custom)
+        with pytest.raises(ValueError):
+            svgpipe.inject.MatrixInjectPoint(svgdoc.root, custom)
+
+    def test_matrix_injectpoint_epoch(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 100 50', '')))
+        t0 = 1.7e9
+        injp = svgdoc.get_layer_injectpoint("Layer_A", (t0, t0 + 100),
+                                            (0, 5))
+        mp = injp.matrix_injectpoint()
+        path = mp.poly_injectpoint('path')
+        path.inject_path([(t0 + 0.25, 1), None, (t0 + 50, 2)])
+        assert path.target.get('d') == "M.25,1m49.75,1"
+        poly = mp.poly_injectpoint()
+        poly.inject_points([(t0 + 1.5, 1)])
+        poly.replace_point_at((t0 + 2.5, 2), 0)
+        mp.inject_symbol('<circle xmlns="%s" r="1"/>' % TU.SVG_NS,
+                         [(t0 + 3, 4)])
+        svgdoc.flush_points()
+        assert poly.target.get('points') == "2.5,2"
+        assert mp.target[-1].get('x') == "3"
+        a, b, c, d, e, f = [float(c) for c in
+                            mp.target.get('transform')[7:-1].split()]
+        assert a*2.5 + e == pytest.approx(injp.h2x(t0 + 2.5))
 
     _POLY_POINTS = ('931,2169.304 817.627,2169.285'
                     ' 770.96,2169.285 667.874,2307.31 539.317,2191.927'
@@ -190,6 +362,15 @@ class Test_SVGDocInj(TU.SVGDoc_Tester):
                                       content_expect,
                                       write_if_svgout)
 
+    def test_inject_points_minified(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(
+                    TU.SVGDoc_Tester.TEM1 % ('0 0 100 100',
+                    '<polyline id="P1" points="10-5 20-3.5.5-1"/>')))
+        injp = svgdoc.get_poly_injectpoint("polyline", "P1")
+        injp.inject_points([(1, 2)])
+        svgdoc.flush_points()
+        assert injp.target.get('points') == "10-5 20-3.5.5-1 1,2"
+
     def test_inject_points_polyline_trafo(self, write_if_svgout):
         vbox = '0 0 200 200'
         addons = 'fill="#2EC" stroke="#C0D" stroke-width="3" opacity="0.7"'
@@ -218,6 +399,108 @@ class Test_SVGDocInj(TU.SVGDoc_Tester):
                                       content_expect,
                                       write_if_svgout)
 
+    def test_inject_points_polyline_trafo_array(self, write_if_svgout):
+        np = pytest.importorskip("numpy")
+        vbox = '0 0 200 200'
+        addons = 'fill="#2EC" stroke="#C0D" stroke-width="3" opacity="0.7"'
+        rect = '<rect id="Rect1" x="10" y="30" width="150" height="75" />'
+        poly, poly_after = Test_SVGDocInj._two_poly("polyline",
+                           '0,0 100,0 100,10',
+                           '10,30 160,105 0,0 100,0 100,10 160,30 10,105',
+                           addons)
+        content_test = TU.SVGDoc_Tester.TEM1 % (vbox, rect+poly)
+        content_expect = TU.SVGDoc_Tester.TEM1 % (vbox, rect+poly_after)
+        svgdoc = TU.SVGDoc_Tester._prepare_svgdoc(content_test,
+                                                  content_expect,
+                                                  write_if_svgout)
+        trafo = svgdoc.trafo_from_rect("Rect1", (1000, 2000), (10, 30))
+        injp = svgdoc.get_poly_injectpoint("polyline", "Poly1")
+        injp.inject_points(np.array([[1000, 10], [2000, 30]]),
+                           pos=INJ_POS_BEFORE, trafo=trafo)
+        injp.inject_points((np.array([2000., 1000.]),
+                            np.array([10., 30.])),
+                           trafo=trafo)
+        TU.SVGDoc_Tester._save_result(svgdoc,
+                                      content_expect,
+                                      write_if_svgout)
+
+    def test_array_points_like_list_points(self):
+        np = pytest.importorskip("numpy")
+        trafo = svgpipe.inject.WorldDocTrafo((10, 30, 150, 75),
+                                             (-3, 7), (0, 1),
+                                             flip_y=True)
+        rng = np.random.default_rng(1)
+        pts = rng.uniform(-1e4, 1e4, (50, 2))
+        pts[0] = 0, -0.0000004
+        fmt = svgpipe.fmt.DEFAULT
+        assert (fmt.format_points(pts)
+                == fmt.format_points([tuple(p) for p in pts.tolist()]))
+        xy = trafo.transform_points(pts)
+        assert np.allclose(xy, [(trafo.h2x(h), trafo.v2y(v))
+                                for h, v in pts])
+        assert np.allclose(trafo.transform_points((pts[:,0], pts[:,1])),
+                           xy)
+        with pytest.raises(ValueError):
+            fmt.format_points(np.zeros((3, 3)))
+        with pytest.raises(TypeError):
+            fmt.format_points(np.array([(datetime.datetime(2017,4,6), 1.0)],
+                                 dtype=object))
+
+    def test_temporal_axes(self):
+        np = pytest.importorskip("numpy")
+        t0 = datetime.datetime(2020, 1, 1)
+        day = datetime.timedelta(days=1)
+        trafo = svgpipe.inject.WorldDocTrafo((0, 0, 100, 50),
+                                             (t0, t0 + 10*day),
+                                             (np.datetime64('2020-01-01'),
+                                              np.datetime64('2020-01-06')),
+                                             flip_y=True)
+        assert trafo.h2x(t0 + 5*day) == 50
+        assert trafo.h2x(datetime.date(2020, 1, 3)) == 20
+        assert trafo.h2x(t0.replace(tzinfo=datetime.timezone.utc)
+                         + day) == 10
+        assert trafo.h2x(trafo.h1 + 86400) == 10
+        assert trafo.v2y(np.datetime64('2020-01-02T12')) == 35
+        hs = np.datetime64('2020-01-01') + np.arange(11) * np.timedelta64(1, 'D')
+        xy = trafo.transform_points((hs, hs[:11]))
+        assert xy[:,0].tolist() == list(range(0, 101, 10))
+        assert xy[:6,1].tolist() == list(range(50, -1, -10))
+        assert trafo.h2x_array([t0 + 2*day, t0 + 3*day]).tolist() == [20, 30]
+        tz = datetime.timezone(datetime.timedelta(hours=2))
+        assert trafo.h2x_array([(t0 + day).replace(tzinfo=tz),
+                                datetime.datetime(2020, 1, 2, 2, tzinfo=tz)
+                                ]).tolist() == pytest.approx([10 - 2/2.4, 10])
+        assert trafo.h2x_array([datetime.date(2020, 1, 5)]).tolist() == [40]
+        ### a custom delta function, also for the vertical axis
+        delta = lambda t1, t2: (t2 - t1).total_seconds()
+        trafo = svgpipe.inject.WorldDocTrafo((0, 0, 100, 50), (0, 1),
+                                             (t0, t0 + 10*day),
+                                             delta_v=delta)
+        assert trafo.v2y(t0 + 5*day) == 25
+
+    def test_inject_points_generator_trafo(self, write_if_svgout):
+        vbox = '0 0 200 200'
+        addons = 'fill="#2EC" stroke="#C0D" stroke-width="3" opacity="0.7"'
+        rect = '<rect id="Rect1" x="10" y="30" width="150" height="75" />'
+        poly, poly_after = Test_SVGDocInj._two_poly("polyline",
+                           '0,0',
+                           '10,30 0,0 10,30 40,45 70,60 100,75 130,90',
+                           addons)
+        content_test = TU.SVGDoc_Tester.TEM1 % (vbox, rect+poly)
+        content_expect = TU.SVGDoc_Tester.TEM1 % (vbox, rect+poly_after)
+        svgdoc = TU.SVGDoc_Tester._prepare_svgdoc(content_test,
+                                                  content_expect,
+                                                  write_if_svgout)
+        trafo = svgdoc.trafo_from_rect("Rect1", (0, 50), (0, 10))
+        injp = svgdoc.get_poly_injectpoint("polyline", "Poly1")
+        injp.inject_points(((h, h/5) for h in range(0, 50, 10)),
+                           trafo=trafo)
+        injp.inject_points(iter([(0, 0)]), pos=INJ_POS_BEFORE,
+                           trafo=trafo)
+        TU.SVGDoc_Tester._save_result(svgdoc,
+                                      content_expect,
+                                      write_if_svgout)
+
     def test_insert_points_polyline_trafo(self, write_if_svgout):
         vbox = '0 0 200 200'
         addons = 'fill="#2EC" stroke="#C0D" stroke-width="3" opacity="0.7"'
@@ -272,6 +555,30 @@ class Test_SVGDocInj(TU.SVGDoc_Tester):
                                       content_expect,
                                       write_if_svgout)
 
+    def test_delete_points_written_on_save(self, write_if_svgout):
+        vbox = '0 0 200 200'
+        addons = 'fill="#2CE" stroke="#C0D" stroke-width="3" opacity="0.7"'
+        poly, poly_after = Test_SVGDocInj._two_poly("polyline",
+                                    '10,30 160,30 160,105 10,105 50,50',
+                                    '10,30 20,40 50,50',
+                                    addons)
+        content_test = TU.SVGDoc_Tester.TEM1 % (vbox, poly)
+        content_expect = TU.SVGDoc_Tester.TEM1 % (vbox, poly_after)
+        svgdoc = TU.SVGDoc_Tester._prepare_svgdoc(content_test,
+                                                  content_expect,
+                                                  write_if_svgout)
+        injp = svgdoc.get_poly_injectpoint("polyline", "Poly1")
+        injp.delete_points(1, 3)
+        injp2 = svgdoc.get_poly_injectpoint("polyline", "Poly1")
+        injp2.replace_point_at((20, 40), index=1)
+        assert injp.target.get('points').startswith('10,30 160,30 ')
+        TU.SVGDoc_Tester._save_result(svgdoc,
+                                      content_expect,
+                                      write_if_svgout)
+        standalone = svgpipe.inject.InjectPoint(injp.target)
+        standalone.delete_points(-1)
+        assert injp.target.get('points') == '10,30 20,40'
+
     def test_replace_all_points(self, write_if_svgout):
         vbox = '0 0 200 200'
         addons = 'fill="#3dd" stroke="#C0D" stroke-width="3" opacity="0.7"'
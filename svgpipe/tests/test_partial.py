@@ -0,0 +1,78 @@
+import io
+
+import pytest
+
+import svgpipe
+import svgpipe.inject
+import svgpipe.tests.utils as TU
+from svgpipe.partial import RAW
+
+class Test_PartialSVGDoc:
+    DOC = """<?xml version='1.0' encoding='utf-8'?>
+<!-- exported by some CAD application -->
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     viewBox="0 0 200 100">
+  <defs><marker id='m1'><path d="M0,0 L1,1"/></marker></defs>
+  <g id="Layer_A" inkscape:label='A  &amp; "a"'>
+    <rect id="R1" x="0" y="0" width='10' height="10"/>
+    <polyline id="P1" points="0,0 1,1"/>
+  </g>
+  <g id="Layer_B"  inkscape:groupmode="layer">
+    <g id="Sub"><use xlink:href="#m1" x="5" /><polyline id="P2" points="1,2"/></g>
+    <text>  ü &lt; ä </text>
+  </g>
+</svg>
+<!-- trailer -->
+"""
+    RAW_LAYER_A = DOC[DOC.index('<g id="Layer_A"'):DOC.index('  <g id="Layer_B"')]
+
+    def _edit(svgdoc):
+        injp = svgdoc.get_poly_injectpoint("polyline", "P2")
+        injp.inject_points([(3, 4)])
+        svgdoc.get_layer("Sub").set("opacity", "0.5")
+        out = io.BytesIO()
+        svgdoc.save(out)
+        return out.getvalue().decode("utf-8")
+
+    @pytest.mark.parametrize("from_file", [False, True])
+    def test_edit_one_layer(self, from_file, tmp_path):
+        if from_file:
+            path = tmp_path / "template.svg"
+            path.write_text(Test_PartialSVGDoc.DOC, encoding="utf-8")
+            source = str(path)
+        else:
+            source = io.StringIO(Test_PartialSVGDoc.DOC)
+        svgdoc = svgpipe.inject.SVGDocInj(source, only=["Sub"])
+        assert svgdoc.get_viewbox() == [0, 0, 200, 100]
+        layer_b = svgdoc.get_layer("Layer_B")
+        assert layer_b.get("{http://www.inkscape.org/namespaces/inkscape}"
+                           "groupmode") == "layer"
+        with pytest.raises(svgpipe.NotFoundError):
+            svgdoc.get_layer("Layer_A")
+        assert [el.tag for el in svgdoc.root if el.tag is not RAW] \
+                == [layer_b.tag]
+        result = Test_PartialSVGDoc._edit(svgdoc)
+        ### untouched content is copied as it is
+        assert Test_PartialSVGDoc.RAW_LAYER_A in result
+        assert result.startswith(Test_PartialSVGDoc.DOC[:100])
+        assert result.endswith("</svg>\n<!-- trailer -->\n")
+        full = svgpipe.inject.SVGDocInj(io.StringIO(Test_PartialSVGDoc.DOC))
+        expected = Test_PartialSVGDoc._edit(full)
+        assert (TU.xml_tree(result, strip_text=True)
+                == TU.xml_tree(expected, strip_text=True))
+        assert 'inkscape:groupmode="layer"' in result
+        assert '<use xlink:href="#m1" x="5" />' in result
+
+    def test_source_checks(self, tmp_path):
+        path = tmp_path / "template.svg"
+        path.write_text(Test_PartialSVGDoc.DOC, encoding="utf-8")
+        svgdoc = svgpipe.inject.SVGDocInj(str(path), only=["Layer_A"])
+        with pytest.raises(ValueError):
+            svgdoc.save(str(path))
+        path.write_text(Test_PartialSVGDoc.DOC + " ", encoding="utf-8")
+        with pytest.raises(svgpipe.ParseError):
+            svgdoc.save(io.BytesIO())
+        with pytest.raises(svgpipe.ParseError):
+            svgpipe.SVGDoc(io.StringIO("<svg><g></svg>"), only=["x"])
@@ -0,0 +1,110 @@
+import datetime
+
+import pytest
+
+import svgpipe
+from svgpipe.points import PointBuffer
+
+class Test_PointBuffer:
+    def test_parse_and_format(self):
+        buf = PointBuffer.from_text(" 931,2169.304 817.627,2169.285\n"
+                                    "  57.23 2452.75 ")
+        assert len(buf) == 3
+        assert buf[1] == (817.627, 2169.285)
+        assert buf.to_text() == (" 931,2169.304 817.627,2169.285\n"
+                                 "  57.23 2452.75 ")
+        buf[1] = (1, 2)
+        assert buf.to_text() == "931,2169.304 1,2 57.23 2452.75"
+        assert PointBuffer.from_text("").to_text() == ""
+        with pytest.raises(svgpipe.ParseError):
+            PointBuffer.from_text("1,2 3")
+        with pytest.raises(svgpipe.ParseError):
+            PointBuffer.from_text("1,2 3,x")
+
+    def test_edit_like_list(self):
+        pts = [(float(i), float(-i)) for i in range(10)]
+        buf = PointBuffer()
+        buf.extend(pts)
+        for index, p in [(3, (99., 98.)), (-1, (97., 96.)),
+                         (100, (95., 94.)), (-100, (93., 92.))]:
+            pts.insert(index, p)
+            buf.insert(index, [p])
+        pts[-2] = buf[-2] = (1., 2.)
+        del pts[0], buf[0]
+        del pts[2:5], buf[2:5]
+        pts[1:2] = buf[1:2] = [(5., 5.), (6., 6.)]
+        assert [buf[i] for i in range(len(buf))] == pts
+        assert [buf[1:3][i] for i in range(2)] == pts[1:3]
+        with pytest.raises(IndexError):
+            buf[len(pts)]
+        with pytest.raises(ValueError):
+            del buf[::2]
+        assert buf.dirty
+
+    def test_keeps_unedited_text(self):
+        text = "0.123456789,1e-9 12345678.87654321,2 3,4"
+        buf = PointBuffer.from_text(text)
+        buf.extend([(5, 5)])
+        assert buf.to_text() == text + " 5,5"
+        buf.insert(0, [(6, 6)])
+        assert buf.to_text() == "6,6 " + text + " 5,5"
+        del buf[2]
+        assert buf.to_text() == "6,6 0.123456789,1e-9 3,4 5,5"
+        buf.clear()
+        assert buf.to_text() == ""
+        buf = PointBuffer.from_text(text)
+        buf.insert(100, [(5, 5)])
+        assert "".join(buf.iter_text(1)) == text + " 5,5"
+        element = svgpipe.ET.Element('polyline')
+        buf.write(element)
+        buf.insert(1, [(7, 7)])
+        assert buf.to_text() == ("0.123456789,1e-9 7,7"
+                                 " 12345678.87654321,2 3,4 5,5")
+
+    def test_compact_text(self):
+        ### as written by minifiers
+        buf = PointBuffer.from_text("10-5 20-3,.5.5 1e-2-1")
+        assert [buf[i] for i in range(len(buf))] == [
+                (10, -5), (20, -3), (.5, .5), (.01, -1)]
+        buf.insert(2, [(7, 7)])
+        assert buf.to_text() == "10-5 20-3 7,7 .5.5 1e-2-1"
+        with pytest.raises(svgpipe.ParseError):
+            PointBuffer.from_text("10-5 20-x")
+
+    def test_rejects_non_numbers(self):
+        buf = PointBuffer.from_text("1,2")
+        with pytest.raises(TypeError):
+            buf.extend([(datetime.datetime(2017,4,6), 1)])
+        with pytest.raises(TypeError):
+            buf[0] = ("1", 2)
+        assert buf.to_text() == "1,2"
+
+    def test_arrays(self):
+        np = pytest.importorskip("numpy")
+        buf = PointBuffer.from_text("0,0 1,1")
+        buf.insert(1, np.array([[5, 6], [7, 8]]))
+        buf.extend((np.array([9.5]), np.array([10.])))
+        assert np.array_equal(buf.as_array(),
+                              [[0, 0], [5, 6], [7, 8], [1, 1], [9.5, 10]])
+
+    def test_stream_in_chunks(self, monkeypatch):
+        monkeypatch.setattr(svgpipe.points, 'CHUNKSIZE', 3)
+        consumed = []
+        def gen(n):
+            for i in range(n):
+                consumed.append(i)
+                yield i, 2*i
+        buf = PointBuffer.from_text("-1,-1")
+        chunks = svgpipe.points._flat_chunks(gen(7))
+        assert list(next(chunks)) == [0, 0, 1, 2, 2, 4]
+        assert consumed == [0, 1, 2]
+        buf.extend(gen(7))
+        assert len(buf) == 8 and buf[-1] == (6, 12)
+        def broken():
+            yield from gen(5)
+            yield "x", 1
+        with pytest.raises(TypeError):
+            buf.extend(broken())
+        assert len(buf) == 8
+        buf.insert(1, gen(4))
+        assert buf[1:5].to_text() == "0,0 1,2 2,4 3,6"
@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+import svgpipe
+import svgpipe.template
+import svgpipe.tests.utils as TU
+from svgpipe.query import compile_selector
+
+CONTENT = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+    '<g id="Panel_1"><rect id="F1" class="frame bold"/>'
+    '<rect id="B1" class="bar" data-series="2"/></g>'
+    '<g id="Panel_2"><rect id="F2" class="frame"/>'
+    '<use xmlns:xlink="http://www.w3.org/1999/xlink"'
+    ' xlink:href="#F1" id="U1"/><rect id="F2"/></g>')
+
+class Test_Query:
+
+    def test_compile(self):
+        sel = compile_selector('rect.frame.bold[data-series="2"][x]')
+        assert compile_selector('rect.frame.bold[data-series="2"][x]') is sel
+        assert sel.tag == "{%s}rect" % TU.SVG_NS
+        assert sel.classes == {"frame", "bold"}
+        assert sel.attribs == (("data-series", "2"), ("x", None))
+        sel = compile_selector("*#a-1[xlink:href='#b']")
+        assert (sel.tag, sel.id) == (None, "a-1")
+        assert sel.attribs == (("{%s}href" % svgpipe.SVGDoc._NS['xlink'],
+                                "#b"),)
+        for text in ['', 'rect#', 'rect[x', 'rect #a', '#a#b']:
+            with pytest.raises(ValueError):
+                compile_selector(text)
+
+    def test_select(self):
+        svgdoc = svgpipe.SVGDoc(io.StringIO(CONTENT))
+        found = svgdoc.select(['rect.frame', '.bold', 'g#Panel_2',
+                               '[data-series=2]', 'use[xlink:href="#F1"]',
+                               'circle'])
+        ids = {s: [el.get('id') for el in els] for s, els in found.items()}
+        assert ids == {'rect.frame': ["F1", "F2"], '.bold': ["F1"],
+                       'g#Panel_2': ["Panel_2"], '[data-series=2]': ["B1"],
+                       'use[xlink:href="#F1"]': ["U1"], 'circle': []}
+        found = svgdoc.select(['#B1', 'g#Panel_1'], unique=True)
+        assert found['#B1'].get('class') == "bar"
+        with pytest.raises(svgpipe.NotFoundError) as e:
+            svgdoc.select(['#B1', '#F2', 'circle', 'rect.frame'], unique=True)
+        assert e.value.missing == ['circle']
+        assert e.value.duplicates == ['#F2', 'rect.frame']
+
+    def test_get_svg_elements(self):
+        svgdoc = svgpipe.SVGDoc(io.StringIO(CONTENT))
+        found = svgdoc.get_svg_elements([('g', "Panel_1"), ('rect', "B1")])
+        assert found[('rect', "B1")].get('class') == "bar"
+        with pytest.raises(svgpipe.ParseError) as e:
+            svgdoc.get_svg_elements([('rect', "F2"), ('rect', "B1")])
+        assert e.value.duplicates == [('rect', "F2")]
+        with pytest.raises(svgpipe.NotFoundError) as e:
+            svgdoc.get_svg_elements([('rect', "F2"), ('g', "B1"),
+                                     ('g', "X")])
+        assert e.value.missing == [('g', "B1"), ('g', "X")]
+        assert e.value.duplicates == [('rect', "F2")]
+
+    def test_template_copies(self):
+        cache = svgpipe.template.TemplateCache()
+        doc = cache.load(io.StringIO(CONTENT))
+        found = doc.select(['rect.frame'])['rect.frame']
+        found[0].set('x', "1")
+        doc.get_svg_elements([('rect', "B1")])[('rect', "B1")].set('x', "2")
+        other = cache.load(io.StringIO(CONTENT))
+        assert [el.get('x') for el in other.select(['rect'])['rect']] == \
+                    [None] * 4
+        assert [el.get('x') for el in doc.select(['rect'])['rect']] == \
+                    ["1", "2", None, None]
@@ -0,0 +1,171 @@
+import io
+
+import pytest
+
+import svgpipe
+import svgpipe.inject
+import svgpipe.points
+import svgpipe.tests.utils as TU
+
+class Test_StreamWriter(TU.SVGDoc_Tester):
+    TEM = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+        '<rect id="R1" x="0" y="0" width="100"'
+        ' height="50" /><polyline id="P1" points="0,0 1,1"/>'
+        '<text xmlns:xlink="http://www.w3.org/1999/xlink"'
+        ' xlink:href="#R1">A &amp; B</text>')
+
+    def _both(svgdoc, bufsize):
+        expected = io.BytesIO()
+        svgdoc.save(expected)
+        streamed = io.BytesIO()
+        svgdoc.save_streaming(streamed, bufsize=bufsize)
+        return expected.getvalue(), streamed.getvalue()
+
+    @pytest.mark.parametrize("bufsize", [1, 50, 1 << 16])
+    def test_like_save(self, bufsize, monkeypatch):
+        monkeypatch.setattr(svgpipe.points, 'CHUNKSIZE', 2)
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(Test_StreamWriter.TEM))
+        injp = svgdoc.get_layer_injectpoint("Layer_B", (0, 1), (0, 1))
+        injp.inject('<circle r="5"/>')
+        injp.inject(svgdoc.backend.Comment(" a comment "))
+        polyp = svgdoc.get_poly_injectpoint("polyline", "P1")
+        polyp.inject_points([(i, i/3) for i in range(7)])
+        expected, streamed = Test_StreamWriter._both(svgdoc, bufsize)
+        if svgdoc.backend.name == 'etree':
+            assert streamed == expected
+        else:
+            ### lxml writes empty elements and prefixes differently
+            assert (TU.xml_tree(streamed.decode("utf8"))
+                    == TU.xml_tree(expected.decode("utf8")))
+
+    def test_flush_layers(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(Test_StreamWriter.TEM))
+        out = io.BytesIO()
+        writer = svgdoc.stream_writer(out)
+        layer_b = svgdoc.get_layer("Layer_B")
+        svgdoc.get_layer_injectpoint("Layer_B", (0, 1), (0, 1)).inject(
+            '<g xmlns="%s" id="G1"><g id="G2"/></g>' % TU.SVG_NS)
+        writer.flush_through(layer_b)
+        assert out.getvalue().endswith(b'<g id="G2" /></g></g>\n')
+        assert len(layer_b) == 0
+        with pytest.raises(svgpipe.NotFoundError):
+            svgdoc.get_layer("G1")
+        with pytest.raises(ValueError):
+            writer.flush_through(layer_b)
+        with pytest.raises(ValueError):
+            writer.flush_through(svgdoc.backend.Element("g"))
+        svgdoc.get_layer_injectpoint("Layer_A", (0, 1), (0, 1)).inject(
+            '<ns2:marker xmlns:ns2="urn:example" id="M"/>')
+        polyp = svgdoc.get_poly_injectpoint("polyline", "P1")
+        polyp.replace_all_points([(5, 6)])
+        writer.close()
+        result = out.getvalue().decode("utf8")
+        assert '="urn:example" id="M" />' in result
+        expected = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+            '<rect id="R1" x="0" y="0" width="100"'
+            ' height="50" /><polyline id="P1" points="5,6"/>'
+            '<text xmlns:xlink="http://www.w3.org/1999/xlink"'
+            ' xlink:href="#R1">A &amp; B</text>'
+            '<ns2:marker xmlns:ns2="urn:example" id="M"/>')
+        expected = expected.replace(
+                '<g id="Layer_B"></g>',
+                '<g id="Layer_B"><g id="G1"><g id="G2"/></g></g>')
+        assert (TU.xml_tree(result, strip_text=True)
+                == TU.xml_tree(expected, strip_text=True))
+
+    def test_cached_save(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(Test_StreamWriter.TEM))
+        injp = svgdoc.get_layer_injectpoint("Layer_B", (0, 1), (0, 1))
+        polyp = svgdoc.get_poly_injectpoint("polyline", "P1")
+        polyp.inject_points([(1, 2)])
+        cached = io.BytesIO()
+        svgdoc.save(cached, cached=True)
+        if svgdoc.backend.name == 'lxml':
+            ### written by lxml, like a plain save
+            expected = io.BytesIO()
+            svgdoc.save(expected)
+            assert cached.getvalue() == expected.getvalue()
+            assert not svgdoc._saved
+            return
+        layer_a = svgdoc.get_layer("Layer_A")
+        layer_b = svgdoc.get_layer("Layer_B")
+        entry = svgdoc._saved[layer_b]
+        assert layer_a in svgdoc._saved
+        polyp.inject_points([(3, 4)])
+        assert layer_a not in svgdoc._saved
+        assert svgdoc._saved[layer_b] is entry
+        cached = io.BytesIO()
+        svgdoc.save(cached, cached=True)
+        assert svgdoc._saved[layer_b] is entry
+        assert b'points="0,0 1,1 1,2 3,4"' in cached.getvalue()
+        injp.inject('<circle r="5"/>')
+        assert layer_b not in svgdoc._saved
+        cached = io.BytesIO()
+        svgdoc.save(cached, cached=True)
+        expected, streamed = Test_StreamWriter._both(svgdoc, 1 << 16)
+        assert cached.getvalue() == streamed
+
+    def test_registered_prefix(self):
+        svgpipe.register_namespace('spt', "urn:svgpipe-test")
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(Test_StreamWriter.TEM))
+        injp = svgdoc.get_layer_injectpoint("Layer_B", (0, 1), (0, 1))
+        injp.inject('<a:mark xmlns:a="urn:svgpipe-test"'
+                    ' a:label="&lt;1&#9;&amp;&#10;2&quot;"/>')
+        expected, streamed = Test_StreamWriter._both(svgdoc, 1 << 16)
+        assert (b'<spt:mark spt:label="&lt;1&#09;&amp;&#10;2&quot;"'
+                in streamed)
+        assert (TU.xml_tree(streamed.decode("utf8"))
+                == TU.xml_tree(expected.decode("utf8")))
+        if svgdoc.backend.name == 'etree':
+            assert streamed == expected
+
+    def test_toplevel_nodes(self, backend):
+        doctype = ('<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN"'
+                   ' "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">')
+        src = Test_StreamWriter.TEM.replace(
+                "?>\n<svg", "?>\n%s\n<!-- before --><?pi data?>\n<svg"
+                % doctype) + "<!-- after -->\n"
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(src))
+        expected, streamed = Test_StreamWriter._both(svgdoc, 1)
+        streamed = streamed.decode("utf8")
+        if backend.name == 'etree':
+            ### ET's parser drops them
+            assert streamed == expected.decode("utf8")
+            assert "before" not in streamed
+        else:
+            assert streamed.startswith(
+                    "<?xml version='1.0' encoding='utf8'?>\n%s\n"
+                    "<!-- before --><?pi data?><svg " % doctype)
+            assert streamed.endswith("</svg><!-- after -->")
+            assert (TU.xml_tree(streamed)
+                    == TU.xml_tree(expected.decode("utf8")))
+
+    def test_toplevel_doctype_order(self, backend):
+        if backend.name == 'etree':
+            pytest.skip("ET's parser drops the doctype")
+        src = Test_StreamWriter.TEM.replace(
+                "?>\n<svg", "?>\n<!-- first -->\n<!DOCTYPE svg>\n"
+                "<!-- second -->\n<svg")
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(src))
+        expected, streamed = Test_StreamWriter._both(svgdoc, 1)
+        ### `save` keeps the source order, the doctype is streamed first
+        assert b"<!-- first --><!DOCTYPE svg>\n<!-- second -->" in expected
+        assert streamed.startswith(
+                b"<?xml version='1.0' encoding='utf8'?>\n<!DOCTYPE svg>\n"
+                b"<!-- first --><!-- second --><svg ")
+        assert (TU.xml_tree(streamed.decode("utf8"))
+                == TU.xml_tree(expected.decode("utf8")))
+
+    def test_cached_save_point_buffer(self):
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(Test_StreamWriter.TEM))
+        polyline = svgdoc.get_svg_element('polyline', "P1")
+        buf = svgdoc.point_buffer(polyline)
+        svgdoc.save(io.BytesIO(), cached=True)
+        buf.extend([(2, 2)])
+        cached = io.BytesIO()
+        svgdoc.save(cached, cached=True)
+        assert b'points="0,0 1,1 2,2"' in cached.getvalue()
+        svgdoc.point_buffer(polyline)[0] = (5, 5)
+        cached = io.BytesIO()
+        svgdoc.save(cached, cached=True)
+        assert b'points="5,5 1,1 2,2"' in cached.getvalue()
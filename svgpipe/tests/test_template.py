@@ -0,0 +1,123 @@
+import io
+import os
+
+import pytest
+
+import svgpipe
+import svgpipe.inject
+import svgpipe.transfer
+import svgpipe.tests.utils as TU
+from svgpipe.template import TemplateCache, TemplateDoc
+
+class Test_TemplateCache(TU.SVGDoc_Tester):
+    TEM = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+        '<rect id="R1" x="0" y="0" width="100" height="50" />'
+        '<polyline id="P1" points="0,0 1,1"/>')
+
+    def _render(doc, radius):
+        injp = doc.get_layer_injectpoint("Layer_B", (0, 1), (0, 1))
+        injp.inject('<circle xmlns="%s" id="C" r="%d"/>'
+                    % (TU.SVG_NS, radius))
+        doc.get_poly_injectpoint("polyline", "P1").inject_points([(2, 2)])
+        out = io.BytesIO()
+        doc.save(out)
+        return out.getvalue().decode("utf8")
+
+    def test_copies_are_independent(self, tmp_path, backend):
+        path = tmp_path / "template.svg"
+        path.write_text(Test_TemplateCache.TEM)
+        cache = TemplateCache(backend=backend)
+        first = cache.load(path)
+        second = cache.load(str(path))
+        assert isinstance(second, TemplateDoc)
+        assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+        result1 = Test_TemplateCache._render(first, 1)
+        assert 'r="1"' in result1
+        assert 'points="0,0 1,1 2,2"' in result1
+        third = cache.load(path)
+        with pytest.raises(svgpipe.NotFoundError):
+            third.get_svg_element('circle', 'C')
+        result2 = Test_TemplateCache._render(second, 2)
+        assert result2 == result1.replace('r="1"', 'r="2"')
+        assert third.get_svg_element('polyline', 'P1').get('points') == "0,0 1,1"
+
+    def test_copy_on_write(self, backend):
+        if backend.parent_pointers:
+            pytest.skip("lxml copies the whole tree")
+        cache = TemplateCache(backend=backend)
+        doc = cache.load(io.StringIO(Test_TemplateCache.TEM))
+        assert doc._template is None
+        cache = TemplateCache(backend=backend, copy_on_write=True)
+        doc = cache.load(io.StringIO(Test_TemplateCache.TEM))
+        template = doc._template
+        assert list(doc.root) == list(template.root)
+        layer_a = doc.get_layer("Layer_A")
+        rect = doc.get_svg_element('rect', 'R1')
+        assert doc.get_parent(rect) is layer_a
+        assert layer_a is not template.get_layer("Layer_A")
+        assert doc.root[0] is template.root[0]
+        shared_rect = next(template.root.iter("{%s}rect" % TU.SVG_NS))
+        assert doc.get_parent(template.root[0]) is doc.root
+        assert doc.get_parent(shared_rect) is layer_a
+        assert doc.own(template.root[0]) is not template.root[0]
+        doc.invalidate_index()
+        assert doc.get_svg_element('rect', 'R1') is rect
+
+    def test_changed_file(self, tmp_path, backend):
+        path = tmp_path / "template.svg"
+        path.write_text(Test_TemplateCache.TEM)
+        cache = TemplateCache(backend=backend)
+        cache.load(path)
+        path.write_text(Test_TemplateCache.TEM.replace('R1', 'R2'))
+        os.utime(path, ns=(0, 0))
+        doc = cache.load(path)
+        assert doc.get_svg_element('rect', 'R2') is not None
+        assert (cache.misses, len(cache)) == (2, 1)
+
+    def test_eviction(self):
+        size = len(Test_TemplateCache.TEM.encode("utf8"))
+        cache = TemplateCache(budget=2 * size * svgpipe.template.MEM_FACTOR)
+        for i in range(3):
+            cache.load(io.StringIO(Test_TemplateCache.TEM.replace('R1', 'R%d' % i)))
+        assert len(cache) == 2
+        cache.load(io.StringIO(Test_TemplateCache.TEM.replace('R1', 'R2')))
+        cache.load(io.StringIO(Test_TemplateCache.TEM.replace('R1', 'R0')))
+        assert (cache.hits, cache.misses) == (1, 4)
+        assert cache.size <= cache.budget
+
+    def test_symbols_in_copy(self, backend):
+        cache = TemplateCache(backend=backend)
+        tem = Test_TemplateCache.TEM.replace('<g id="Layer_B">',
+                                             '<defs/><g id="Layer_B">')
+        doc = cache.load(io.StringIO(tem))
+        injp = doc.get_layer_injectpoint("Layer_B", (0, 1), (0, 1))
+        injp.inject_symbol('<circle xmlns="%s" r="1"/>' % TU.SVG_NS,
+                           [(0, 0)])
+        assert len(doc._defs()) == 1
+        assert len(cache.load(io.StringIO(tem))._defs()) == 0
+
+    @pytest.mark.parametrize("cow", [False, True])
+    def test_shared_elements(self, backend, cow):
+        cache = TemplateCache(backend=backend, copy_on_write=cow)
+        doc = cache.load(io.StringIO(Test_TemplateCache.TEM))
+        rect = next(doc.root.iter("{%s}rect" % TU.SVG_NS))
+        poly = next(doc.root.iter("{%s}polyline" % TU.SVG_NS))
+        svgpipe.transfer.apply_attribs([rect], poly, ['points'], doc=doc)
+        svgpipe.inject.InjectPoint(poly, doc=doc).inject_points([(2, 2)])
+        doc.flush_points()
+        assert doc.get_svg_element('rect', 'R1').get('points') == "0,0 1,1"
+        assert doc.get_svg_element('polyline', 'P1').get('points') == \
+                    "0,0 1,1 2,2"
+        other = cache.load(io.StringIO(Test_TemplateCache.TEM))
+        assert other.get_svg_element('rect', 'R1').get('points') is None
+        assert other.get_svg_element('polyline', 'P1').get('points') == \
+                    "0,0 1,1"
+        fresh = cache.load(io.StringIO(Test_TemplateCache.TEM))
+        next(fresh.root.iter("{%s}rect" % TU.SVG_NS)).set('fill', "red")
+        fill = cache.load(io.StringIO(Test_TemplateCache.TEM)) \
+                    .get_svg_element('rect', 'R1').get('fill')
+        if cow and not backend.parent_pointers:
+            ### changed directly, the template itself is changed
+            assert fill == "red"
+        else:
+            assert fill is None
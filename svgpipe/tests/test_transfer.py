@@ -3,6 +3,7 @@ import io
 import pytest
 
 import svgpipe
+import svgpipe.inject
 import svgpipe.transfer as TRA
 import svgpipe.tests.utils as TU
 
@@ -36,3 +37,33 @@ class Test_SVGDocInj(TU.SVGDoc_Tester):
         Test_SVGDocInj._save_result(svgdoc,
                                     content_expect,
                                     write_if_svgout)
+
+    def test_transfer_class(self):
+        content_test = TU.SVGDoc_Tester.TEM1 % ('0 0 200 200',
+            '<rect id="P1" fill="#2EC" stroke="#aad" stroke-width="15"/>'
+            '<rect id="P2" stroke-width="15" stroke="#aad" fill="#2EC"/>'
+            '<rect id="P3" fill="none" stroke="#aad" stroke-width="1"/>'
+            '<rect id="T1" fill="#904" class="a"/>'
+            '<rect id="T2"/><rect id="T3"/>')
+        svgdoc = svgpipe.inject.SVGDocInj(io.StringIO(content_test))
+        el = lambda id: svgdoc.get_svg_element('rect', id)
+        name = TRA.apply_class([el('T1'), el('T2')], el('P1'),
+                               doc=svgdoc)
+        assert TRA.apply_class([el('T2')], el('P2'), doc=svgdoc) == name
+        other = TRA.apply_class([el('T3')], el('P3'), doc=svgdoc)
+        assert other != name
+        with pytest.raises(TypeError):
+            TRA.apply_class([el('T3')], el('P3'))
+        assert el('T1').get('class') == "a " + name
+        assert el('T1').get('fill') is None
+        assert el('T2').get('class') == name
+        out = io.BytesIO()
+        svgdoc.save(out)
+        root = svgpipe.ET.fromstring(out.getvalue())
+        style = root.find("svg:defs/svg:style", svgpipe.SVGDoc._NS)
+        assert style.text == (
+            ".%s{fill:#2EC;stroke:#aad;stroke-width:15}\n"
+            ".%s{fill:none;stroke:#aad;stroke-width:1}\n" % (name, other))
+        ### a reloaded document does not reuse the class names
+        svgdoc = svgpipe.inject.SVGDocInj(io.BytesIO(out.getvalue()))
+        assert svgdoc.style_class([('fill', "red")]) not in (name, other)
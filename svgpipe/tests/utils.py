@@ -12,6 +12,8 @@ _EXPECT_SUFFIX = "_expect"
 _RESULT_SUFFIX = "_result"
 _SVG_EXT = ".svg"
 
+SVG_NS = svgpipe.SVGDoc._NS['svg']
+
 def normalise_xml(xmlstr):
     xmlstr = xmlstr.replace("\n", " ")
     xmlstr = xmlstr.replace("\t", " ")
@@ -25,6 +27,18 @@ def assert_xml_equiv(result, expected):
         assert got == exp, ("XML mismatch. \nGOT:\n{:s}\n\n"
                             "EXPECTED:\n{:s}").format(got, exp)
 
+def xml_tree(xmlstr, strip_text=False):
+    """ Nested tuples of tags, attributes and text, for comparing
+    documents regardless of prefixes and quoting (python 3.7 has
+    no `ET.canonicalize`)."""
+    def conv(el):
+        text, tail = el.text or "", el.tail or ""
+        if strip_text:
+            text, tail = text.strip(), tail.strip()
+        return (el.tag, sorted(el.items()), text,
+                [conv(e) for e in el], tail)
+    return conv(svgpipe.ET.fromstring(xmlstr))
+
 # cf. https://stackoverflow.com/questions/251464/
 def this_fname():
     return traceback.extract_stack(None, 2)[0][2]
@@ -1,7 +1,7 @@
 """ Transfer content from one part to another within existing SVG documents."""
 
 def apply_attribs(target_elements, prototype_element,
-                  attribs=None):
+                  attribs=None, doc=None):
     """ Transfer attributes from one element to a list of target elements.
 
     `target_elements`: List of target elements.
@@ -9,6 +9,10 @@ def apply_attribs(target_elements, prototype_element,
         will be transfered to the targets.
     `attribs` (optional): List of attribute names to be transferred.
         If ommitted, a preselected list of attributes will be used.
+    `doc` (optional): The `SVGDocInj` of the targets, which is
+        told about the change, cf. `SVGDocInj.save`. Targets
+        shared with other documents are copied first, cf.
+        `SVGDocInj.own`.
     """
 
     if attribs is None:
@@ -16,5 +20,46 @@ def apply_attribs(target_elements, prototype_element,
     else:
         _attribs = attribs
     for t in target_elements:
+        if doc is not None:
+            t = doc.own(t)
         for a in _attribs:
             t.attrib[a] = prototype_element.attrib[a]
+        if doc is not None:
+            doc._touch(t)
+
+def apply_class(target_elements, prototype_element, attribs=None,
+                doc=None):
+    """ Transfer attributes as a CSS class, cf. `apply_attribs`.
+
+    `doc`: The `SVGDocInj` of the targets; required, the
+        default is only there to match `apply_attribs`.
+
+    The attributes of the prototype become a class in a `style`
+    element of `doc`, which is added to the `class` attribute of
+    the targets. Identical sets of attributes share one class,
+    cf. `SVGDocInj.style_class`.
+    The transferred attributes are removed from the targets,
+    as the class overrides them anyway.
+
+    Returns the name of the class.
+    """
+
+    if doc is None:
+        raise TypeError("apply_class() requires the document `doc`")
+    if attribs is None:
+        _attribs = ['fill', 'stroke', 'stroke-width']
+    else:
+        _attribs = attribs
+    name = doc.style_class([(a, prototype_element.attrib[a])
+                            for a in _attribs])
+    for t in target_elements:
+        t = doc.own(t)
+        for a in _attribs:
+            t.attrib.pop(a, None)
+        classes = t.get('class')
+        if not classes:
+            t.set('class', name)
+        elif name not in classes.split():
+            t.set('class', classes + " " + name)
+        doc._touch(t)
+    return name